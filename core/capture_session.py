@@ -0,0 +1,263 @@
+# core/capture_session.py
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class RoiFrame:
+    img: np.ndarray  # 连续 BGRA (h,w,4)
+    x: int = 0  # 左上角 client x
+    y: int = 0  # 左上角 client y
+
+    @property
+    def offset(self) -> tuple[int, int]:
+        return self.x, self.y
+
+
+def clip_rect(roi, w: int, h: int) -> tuple[int, int, int, int]:
+    x1, y1, x2, y2 = (int(v) for v in roi)
+    x1 = max(0, min(x1, w))
+    x2 = max(x1, min(x2, w))
+    y1 = max(0, min(y1, h))
+    y2 = max(y1, min(y2, h))
+    return x1, y1, x2, y2
+
+
+class CaptureSession:
+    """
+    持久截图会话：后端资源（DC/位图等）常驻，只有客户区尺寸变化时才重建，
+    像素写入预分配的 BGRA 缓冲区。
+
+    grab() 直接返回内部的连续 BGRA 缓冲区（不切 [:, :, :3]，避免后续 cv2 隐式拷贝），
+    下一次 grab() 会覆盖它；需要跨帧保留时请自行 copy()。
+    """
+
+    def __init__(self, hwnd: int, backend=None):
+        if backend is None:
+            from core.capture_win32 import Win32GdiBackend
+
+            backend = Win32GdiBackend()
+        self.hwnd = hwnd
+        self.backend = backend
+        self.size: tuple[int, int] | None = None
+        self._buf: np.ndarray | None = None
+        self._roi_bufs: dict[tuple[int, int, int, int], np.ndarray] = {}
+        self.stats = {"grabs": 0, "rebuilds": 0, "allocs": 0, "roi_grabs": 0, "roi_pixels": 0}
+
+    def _ensure(self, w: int, h: int):
+        if self.size == (w, h) and self._buf is not None:
+            return
+        self.backend.close()
+        self.backend.open(self.hwnd, w, h)
+        self._buf = np.empty((h, w, 4), dtype=np.uint8)
+        self._roi_bufs.clear()
+        self.size = (w, h)
+        self.stats["rebuilds"] += 1
+        self.stats["allocs"] += 1
+
+    def _client_size(self, retries: int) -> tuple[int, int]:
+        last_size = None
+        for _ in range(retries):
+            w, h = self.backend.client_size(self.hwnd)
+            last_size = (w, h)
+            if w > 0 and h > 0:
+                return w, h
+            # 客户区为 0：短暂等待后重试
+            time.sleep(0.1)
+
+        raise RuntimeError(f"窗口客户区尺寸异常（多次重试仍为 0）：client_size={last_size}")
+
+    def grab(self, retries: int = 5) -> np.ndarray:
+        """返回常驻的连续 BGRA 缓冲区 (H,W,4)。"""
+        w, h = self._client_size(retries)
+        self._ensure(w, h)
+        try:
+            self.backend.read(self.hwnd, self._buf)
+        except Exception:
+            # 句柄失效等情况：释放资源，下次强制重建
+            self.close()
+            raise
+        self.stats["grabs"] += 1
+        return self._buf
+
+    def grab_into(self, out: np.ndarray | None, retries: int = 5) -> np.ndarray:
+        """
+        截图直接写入调用方提供的 BGRA 缓冲区（尺寸不符时重新分配并返回新缓冲区）。
+        供后台采集线程把帧写进自己的环形缓冲区，省掉一次拷贝。
+        """
+        w, h = self._client_size(retries)
+        self._ensure(w, h)
+        if out is None or out.shape != (h, w, 4):
+            out = np.empty((h, w, 4), dtype=np.uint8)
+            self.stats["allocs"] += 1
+        try:
+            self.backend.read(self.hwnd, out)
+        except Exception:
+            self.close()
+            raise
+        self.stats["grabs"] += 1
+        return out
+
+    def _roi_buffer(self, rect: tuple[int, int, int, int]) -> np.ndarray:
+        buf = self._roi_bufs.get(rect)
+        if buf is None:
+            x1, y1, x2, y2 = rect
+            buf = np.empty((y2 - y1, x2 - x1, 4), dtype=np.uint8)
+            self._roi_bufs[rect] = buf
+            self.stats["allocs"] += 1
+        return buf
+
+    def grab_rois(self, rois, retries: int = 5) -> list[RoiFrame]:
+        """
+        只拷贝给定矩形（client coords），一次调用完成。
+        每个 ROI 返回独立的连续 BGRA 数组 + 左上角偏移；越界部分会被裁掉。
+        返回的数组是会话常驻缓冲区，下一次 grab_rois 会覆盖。
+        """
+        w, h = self._client_size(retries)
+        self._ensure(w, h)
+
+        rects = [clip_rect(roi, w, h) for roi in rois]
+        todo = [rect for rect in dict.fromkeys(rects) if rect[2] > rect[0] and rect[3] > rect[1]]
+        outs = [self._roi_buffer(rect) for rect in todo]
+        try:
+            if todo:
+                self.backend.read_rects(self.hwnd, todo, outs)
+        except Exception:
+            self.close()
+            raise
+
+        frames = []
+        for rect in rects:
+            x1, y1, x2, y2 = rect
+            if x2 <= x1 or y2 <= y1:
+                frames.append(RoiFrame(np.zeros((0, 0, 4), dtype=np.uint8), x1, y1))
+                continue
+            frames.append(RoiFrame(self._roi_buffer(rect), x1, y1))
+
+        self.stats["roi_grabs"] += 1
+        self.stats["roi_pixels"] += sum((r[2] - r[0]) * (r[3] - r[1]) for r in todo)
+        return frames
+
+    def close(self):
+        self.backend.close()
+        self.size = None
+        self._buf = None
+        self._roi_bufs.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class ReplayBackend:
+    """
+    纯 numpy 回放后端：按顺序循环输出给定帧（np.ndarray 或 PNG 路径），
+    用于在 Linux 上测试/压测 CaptureSession 的逻辑和分配次数。
+    帧在构造时一次性转成 BGRA，grab 时只做 copyto。
+    """
+
+    def __init__(self, frames, loop: bool = True):
+        self.frames = [self._to_bgra(f) for f in frames]
+        if not self.frames:
+            raise RuntimeError("ReplayBackend 至少需要一帧")
+        self.loop = loop
+        self.index = 0
+
+    @classmethod
+    def from_paths(cls, paths: list[str], loop: bool = True) -> "ReplayBackend":
+        frames = []
+        for path in paths:
+            img = cv2.imread(path, cv2.IMREAD_COLOR)
+            if img is None:
+                raise RuntimeError(f"回放帧加载失败: {path}")
+            frames.append(img)
+        return cls(frames, loop=loop)
+
+    @staticmethod
+    def _to_bgra(img: np.ndarray) -> np.ndarray:
+        if img.ndim == 2:
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+        if img.shape[2] == 3:
+            return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+        return np.ascontiguousarray(img)
+
+    def _current(self) -> np.ndarray:
+        return self.frames[min(self.index, len(self.frames) - 1)]
+
+    def client_size(self, hwnd: int) -> tuple[int, int]:
+        h, w = self._current().shape[:2]
+        return w, h
+
+    def open(self, hwnd: int, w: int, h: int):
+        pass
+
+    def read(self, hwnd: int, out: np.ndarray):
+        np.copyto(out, self._current())
+        self._advance()
+
+    def read_rects(self, hwnd: int, rects, outs):
+        frame = self._current()
+        for (x1, y1, x2, y2), out in zip(rects, outs):
+            np.copyto(out, frame[y1:y2, x1:x2])
+        self._advance()
+
+    def _advance(self):
+        self.index += 1
+        if self.index >= len(self.frames) and self.loop:
+            self.index = 0
+
+    def close(self):
+        pass
+
+
+class SyntheticBackend:
+    """
+    合成帧后端：固定噪声底图 + 一个每帧平移的亮块，模拟画面在变化。
+    用于在没有游戏窗口的环境下驱动 CaptureSession / CaptureWorker。
+    """
+
+    def __init__(self, width: int = 1024, height: int = 768, seed: int = 0, block: int = 48, speed: int = 7):
+        rng = np.random.default_rng(seed)
+        base = rng.integers(0, 96, (height, width, 3), dtype=np.uint8)
+        self.base = cv2.cvtColor(base, cv2.COLOR_BGR2BGRA)
+        self.block = block
+        self.speed = speed
+        self.count = 0
+
+    def client_size(self, hwnd: int) -> tuple[int, int]:
+        h, w = self.base.shape[:2]
+        return w, h
+
+    def open(self, hwnd: int, w: int, h: int):
+        pass
+
+    def _block_origin(self) -> tuple[int, int]:
+        h, w = self.base.shape[:2]
+        x = (self.count * self.speed) % max(1, w - self.block)
+        y = (self.count * self.speed // 3) % max(1, h - self.block)
+        return x, y
+
+    def read(self, hwnd: int, out: np.ndarray):
+        np.copyto(out, self.base)
+        x, y = self._block_origin()
+        out[y:y + self.block, x:x + self.block, :3] = 255
+        self.count += 1
+
+    def read_rects(self, hwnd: int, rects, outs):
+        x, y = self._block_origin()
+        for (x1, y1, x2, y2), out in zip(rects, outs):
+            np.copyto(out, self.base[y1:y2, x1:x2])
+            bx1, by1 = max(x, x1), max(y, y1)
+            bx2, by2 = min(x + self.block, x2), min(y + self.block, y2)
+            if bx2 > bx1 and by2 > by1:
+                out[by1 - y1:by2 - y1, bx1 - x1:bx2 - x1, :3] = 255
+        self.count += 1
+
+    def close(self):
+        pass
@@ -1,51 +1,171 @@
 # core/capture_win32.py
-import time
+import ctypes
+from ctypes import wintypes
+from typing import Any
+
+import cv2
 import numpy as np
 import win32gui
-import win32ui
 import win32con
 
-def grab_client(hwnd: int, retries: int = 5) -> np.ndarray:
+from core.capture_session import CaptureSession, RoiFrame
+
+gdi32 = ctypes.windll.gdi32
+
+DIB_RGB_COLORS = 0
+BI_RGB = 0
+
+
+class BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", wintypes.DWORD),
+        ("biWidth", wintypes.LONG),
+        ("biHeight", wintypes.LONG),
+        ("biPlanes", wintypes.WORD),
+        ("biBitCount", wintypes.WORD),
+        ("biCompression", wintypes.DWORD),
+        ("biSizeImage", wintypes.DWORD),
+        ("biXPelsPerMeter", wintypes.LONG),
+        ("biYPelsPerMeter", wintypes.LONG),
+        ("biClrUsed", wintypes.DWORD),
+        ("biClrImportant", wintypes.DWORD),
+    ]
+
+
+class Win32GdiBackend:
     """
-    截取窗口客户区图像，返回 BGR np.ndarray (H,W,3)
-    - 自动重试：应对窗口切换/尺寸瞬时为 0
-    - 使用 GetDC(hwnd)：更贴合“客户区”
+    GDI 截图后端：窗口 DC / 兼容 DC / 位图常驻，
+    BitBlt 后用 GetDIBits 直接写入调用方的 numpy 缓冲区（不经过 bytes）。
+    位图只在 BitBlt 期间选入兼容 DC，GetDIBits 之前换回 DC 原来的位图（文档要求读取的位图不能处于选入状态）。
     """
-    last_rect = None
 
-    for _ in range(retries):
+    def __init__(self):
+        self.hwnd = None
+        self.hwnd_dc = None
+        self.mem_dc = None
+        self.bmp = None
+        self.size = (0, 0)
+        self.bmi = BITMAPINFOHEADER()
+        self.roi_bitmaps: dict[tuple[int, int], tuple[Any, BITMAPINFOHEADER]] = {}
+
+    def client_size(self, hwnd: int) -> tuple[int, int]:
         left, top, right, bottom = win32gui.GetClientRect(hwnd)
-        w, h = right - left, bottom - top
-        last_rect = (left, top, right, bottom)
+        return right - left, bottom - top
+
+    def open(self, hwnd: int, w: int, h: int):
+        # 取客户区 DC（比 GetWindowDC 更稳）
+        self.hwnd = hwnd
+        self.hwnd_dc = win32gui.GetDC(hwnd)
+        self.mem_dc = win32gui.CreateCompatibleDC(self.hwnd_dc)
+        self.bmp = win32gui.CreateCompatibleBitmap(self.hwnd_dc, w, h)
+        self.size = (w, h)
 
-        if w > 0 and h > 0:
-            # 取客户区 DC（比 GetWindowDC 更稳）
-            hwnd_dc = win32gui.GetDC(hwnd)
-            mfc_dc = win32ui.CreateDCFromHandle(hwnd_dc)
-            save_dc = mfc_dc.CreateCompatibleDC()
+        # 负高度 = top-down，行序与 numpy 一致
+        self.bmi.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+        self.bmi.biWidth = w
+        self.bmi.biHeight = -h
+        self.bmi.biPlanes = 1
+        self.bmi.biBitCount = 32
+        self.bmi.biCompression = BI_RGB
 
-            bmp = win32ui.CreateBitmap()
-            bmp.CreateCompatibleBitmap(mfc_dc, w, h)
-            save_dc.SelectObject(bmp)
+    def _blit(self, bmp, w: int, h: int, x: int, y: int):
+        old = win32gui.SelectObject(self.mem_dc, bmp)
+        try:
+            win32gui.BitBlt(self.mem_dc, 0, 0, w, h, self.hwnd_dc, x, y, win32con.SRCCOPY)
+        finally:
+            win32gui.SelectObject(self.mem_dc, old)
 
-            save_dc.BitBlt((0, 0), (w, h), mfc_dc, (0, 0), win32con.SRCCOPY)
+    def read(self, hwnd: int, out: np.ndarray):
+        w, h = self.size
+        self._blit(self.bmp, w, h, 0, 0)
+        lines = gdi32.GetDIBits(
+            int(self.mem_dc),
+            int(self.bmp),
+            0,
+            h,
+            out.ctypes.data_as(ctypes.c_void_p),
+            ctypes.byref(self.bmi),
+            DIB_RGB_COLORS,
+        )
+        if lines != h:
+            raise RuntimeError(f"GetDIBits 失败：lines={lines}, expected={h}")
 
-            bmpinfo = bmp.GetInfo()
-            bmpstr = bmp.GetBitmapBits(True)
+    def _roi_bitmap(self, w: int, h: int):
+        entry = self.roi_bitmaps.get((w, h))
+        if entry is None:
+            bmp = win32gui.CreateCompatibleBitmap(self.hwnd_dc, w, h)
+            bmi = BITMAPINFOHEADER()
+            bmi.biSize = ctypes.sizeof(BITMAPINFOHEADER)
+            bmi.biWidth = w
+            bmi.biHeight = -h
+            bmi.biPlanes = 1
+            bmi.biBitCount = 32
+            bmi.biCompression = BI_RGB
+            entry = (bmp, bmi)
+            self.roi_bitmaps[(w, h)] = entry
+        return entry
 
-            img = np.frombuffer(bmpstr, dtype=np.uint8)
-            img = img.reshape((bmpinfo["bmHeight"], bmpinfo["bmWidth"], 4))
-            img = img[:, :, :3]  # BGRA -> BGR
+    def read_rects(self, hwnd: int, rects, outs):
+        # 每个 ROI 只 BitBlt 自己的像素到同尺寸小位图，再 GetDIBits 到对应缓冲区
+        for (x1, y1, x2, y2), out in zip(rects, outs):
+            w, h = x2 - x1, y2 - y1
+            bmp, bmi = self._roi_bitmap(w, h)
+            self._blit(bmp, w, h, x1, y1)
+            lines = gdi32.GetDIBits(
+                int(self.mem_dc),
+                int(bmp),
+                0,
+                h,
+                out.ctypes.data_as(ctypes.c_void_p),
+                ctypes.byref(bmi),
+                DIB_RGB_COLORS,
+            )
+            if lines != h:
+                raise RuntimeError(f"GetDIBits 失败：lines={lines}, expected={h}")
 
-            # cleanup
-            win32gui.DeleteObject(bmp.GetHandle())
-            save_dc.DeleteDC()
-            mfc_dc.DeleteDC()
-            win32gui.ReleaseDC(hwnd, hwnd_dc)
+    def close(self):
+        for bmp, _bmi in self.roi_bitmaps.values():
+            win32gui.DeleteObject(bmp)
+        self.roi_bitmaps.clear()
+        if self.mem_dc is not None:
+            win32gui.DeleteDC(self.mem_dc)
+        if self.bmp is not None:
+            win32gui.DeleteObject(self.bmp)
+        if self.hwnd_dc is not None:
+            win32gui.ReleaseDC(self.hwnd, self.hwnd_dc)
+        self.hwnd_dc = None
+        self.mem_dc = None
+        self.bmp = None
+        self.size = (0, 0)
 
-            return img
 
-        # 客户区为 0：短暂等待后重试
-        time.sleep(0.1)
+_SESSIONS: dict[int, CaptureSession] = {}
 
-    raise RuntimeError(f"窗口客户区尺寸异常（多次重试仍为 0）：client_rect={last_rect}")
\ No newline at end of file
+
+def get_session(hwnd: int) -> CaptureSession:
+    session = _SESSIONS.get(hwnd)
+    if session is None or not win32gui.IsWindow(hwnd):
+        if session is not None:
+            session.close()
+        session = CaptureSession(hwnd, Win32GdiBackend())
+        _SESSIONS[hwnd] = session
+    return session
+
+
+def grab_client(hwnd: int, retries: int = 5) -> np.ndarray:
+    """
+    截取窗口客户区图像，返回 BGR np.ndarray (H,W,3)
+    - 复用该 hwnd 的常驻 CaptureSession（DC/位图只在尺寸变化时重建）
+    - 返回独立副本，调用方可以跨帧保留
+    - 检测循环请用 core.frames.get_frame（连续 BGRA，无 BGR 中间拷贝）
+    """
+    return cv2.cvtColor(get_session(hwnd).grab(retries=retries), cv2.COLOR_BGRA2BGR)
+
+
+def grab_rois(hwnd: int, rois, retries: int = 5) -> list[RoiFrame]:
+    """
+    只截取若干 ROI（client coords），返回 RoiFrame 列表（连续 BGRA + 偏移）。
+    可直接传给 find_template(..., roi=roi, offset=frame.offset)。
+    """
+    frames = get_session(hwnd).grab_rois(rois, retries=retries)
+    return [RoiFrame(f.img.copy(), f.x, f.y) for f in frames]
@@ -0,0 +1,129 @@
+# core/capture_worker.py
+import threading
+import time
+
+import numpy as np
+
+from core.capture_session import CaptureSession
+
+
+class CaptureWorker:
+    """
+    后台采集线程：按固定 FPS 截图写入 slots 个预分配的 BGRA 帧（环形缓冲区），
+    每帧带递增序号和时间戳，消费者用 latest() 直接拿最新一帧，不在自己的循环里等截图。
+
+    无锁发布：写线程永远写“最新帧之后”的槽位，写之前把槽位 seq 置为 -1，
+    写完后才发布新 seq 并把 _latest 指过去（单次整型赋值，GIL 下原子）。读者拿到的帧在写线程再写满 slots-1 帧之前不会被覆盖；
+    需要更久持有时用 is_current(seq) 校验或自行 copy()。
+    """
+
+    def __init__(self, session: CaptureSession, fps: float = 20.0, slots: int = 3, time_fn=time.monotonic):
+        if slots < 2:
+            raise RuntimeError("CaptureWorker 至少需要 2 个槽位")
+        self.session = session
+        self.period = 1.0 / max(0.1, float(fps))
+        self.slots = int(slots)
+        self.time_fn = time_fn
+
+        self._frames: list[np.ndarray | None] = [None] * self.slots
+        self._seqs = [-1] * self.slots
+        self._stamps = [0.0] * self.slots
+        self._latest = -1  # 槽位下标，-1 表示还没有帧
+        self._last_read_seq = -1
+
+        self._stop = threading.Event()
+        self._first = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.error: Exception | None = None
+        self.stats = {"frames": 0, "reads": 0, "dropped": 0, "overruns": 0, "capture_ms": 0.0}
+
+    def start(self) -> "CaptureWorker":
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"capture-{self.session.hwnd}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 1.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self):
+        seq = 0
+        next_tick = self.time_fn()
+        while not self._stop.is_set():
+            idx = (self._latest + 1) % self.slots
+            t0 = self.time_fn()
+            # 先作废槽位再原地写：读者拷贝途中槽位被改写时 is_current 必然失败
+            self._seqs[idx] = -1
+            try:
+                self._frames[idx] = self.session.grab_into(self._frames[idx])
+            except Exception as exc:
+                # 窗口暂时不可用：记录错误，槽位保持作废，下一拍重试
+                self.error = exc
+                self._stop.wait(self.period)
+                continue
+            ts = self.time_fn()
+            self.stats["capture_ms"] = (ts - t0) * 1000.0
+
+            prev = self._latest
+            if prev >= 0 and self._seqs[prev] > self._last_read_seq:
+                self.stats["dropped"] += 1
+
+            self._seqs[idx] = seq
+            self._stamps[idx] = ts
+            self._latest = idx
+            self.stats["frames"] += 1
+            self._first.set()
+            seq += 1
+
+            next_tick += self.period
+            delay = next_tick - self.time_fn()
+            if delay < 0:
+                # 采集跟不上目标 FPS：不追帧，从当前时间重新计时
+                self.stats["overruns"] += 1
+                next_tick = self.time_fn()
+                delay = 0.0
+            self._stop.wait(delay)
+
+    def wait_first(self, timeout: float = 1.0) -> bool:
+        return self._first.wait(timeout)
+
+    def latest(self) -> tuple[np.ndarray, int, float] | None:
+        """返回 (BGRA 帧, seq, timestamp)；还没有帧时返回 None。"""
+        idx = self._latest
+        if idx < 0:
+            return None
+        frame = self._frames[idx]
+        seq = self._seqs[idx]
+        ts = self._stamps[idx]
+        if frame is None:
+            return None
+        if seq > self._last_read_seq:
+            self._last_read_seq = seq
+        self.stats["reads"] += 1
+        return frame, seq, ts
+
+    def is_current(self, seq: int) -> bool:
+        """seq 对应的槽位是否还没被覆盖。"""
+        return self._seqs[seq % self.slots] == seq
+
+    def frame_age(self) -> float:
+        idx = self._latest
+        if idx < 0:
+            return float("inf")
+        return self.time_fn() - self._stamps[idx]
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"frames={s['frames']} reads={s['reads']} dropped={s['dropped']} "
+            f"overruns={s['overruns']} capture={s['capture_ms']:.1f}ms age={self.frame_age() * 1000:.0f}ms"
+        )
@@ -0,0 +1,125 @@
+# core/color_mask.py
+import threading
+
+import cv2
+import numpy as np
+
+
+class ColorMask:
+    """
+    颜色掩码查找表：把 HSV 范围（可以是多段并集，如红色的 0-12 与 170-179 两段）
+    以及可选的 BGR 规则预先算成“量化 BGR -> 0/255”的表，之后每次只做一次 gather，
+    不再 cvtColor + 多次 inRange + 按位或。
+
+    索引直接取像素的打包值 b | g<<8 | r<<16 右移 (8-bits) 再按位与，BGRA 帧可以零拷贝
+    view 成 uint32；表约 2^(16+bits) 字节（默认 bits=8 时 16MB）。bits=8 时结果与 OpenCV 完全一致，
+    bits 越小表越小，但范围边界附近的颜色按量化格中心判断（有损）。
+    """
+
+    def __init__(self, hsv_ranges, bits: int = 8, bgr_rule=None):
+        self.bits = min(8, max(4, int(bits)))
+        self.hsv_ranges = tuple(
+            (tuple(int(v) for v in lower), tuple(int(v) for v in upper)) for lower, upper in hsv_ranges
+        )
+        self._shift = 8 - self.bits
+        chan = (1 << self.bits) - 1
+        self._index_mask = np.uint32(chan | chan << 8 | chan << 16)
+        self.lut = self._build(bgr_rule)
+
+    def _build(self, bgr_rule) -> np.ndarray:
+        chan = (1 << self.bits) - 1
+        levels = np.arange(chan + 1, dtype=np.uint32)
+        # 只有三个通道都 <= chan 的索引会被用到，其余位置保持 0
+        index = (levels[:, None, None] << 16) | (levels[None, :, None] << 8) | levels[None, None, :]
+        index = index.reshape(-1)
+
+        half = (1 << (self._shift - 1)) if self._shift else 0
+        centre = (levels << self._shift) + half
+        b = centre[index & 0xFF]
+        g = centre[(index >> 8) & 0xFF]
+        r = centre[index >> 16]
+        bgr = np.stack([b, g, r], axis=-1).astype(np.uint8).reshape(-1, 1, 3)
+
+        mask = np.zeros(len(index), dtype=np.uint8)
+        if self.hsv_ranges:
+            hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+            for lower, upper in self.hsv_ranges:
+                mask |= cv2.inRange(hsv, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8)).reshape(-1)
+        if bgr_rule is not None:
+            hit = bgr_rule(b.astype(np.int32), g.astype(np.int32), r.astype(np.int32))
+            mask |= np.asarray(hit, dtype=np.uint8) * 255
+
+        lut = np.zeros(int(self._index_mask) + 1, dtype=np.uint8)
+        lut[index] = mask
+        lut.setflags(write=False)
+        return lut
+
+    def packed(self, img: np.ndarray) -> np.ndarray:
+        """BGR/BGRA -> (h, w) uint32 打包像素；BGRA 且每行像素连续时不拷贝。"""
+        if img.ndim != 3 or img.shape[2] not in (3, 4):
+            raise RuntimeError(f"ColorMask expects BGR/BGRA image, got shape {img.shape}")
+        if img.shape[2] == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+        elif img.strides[1] != 4 or img.strides[2] != 1:
+            img = np.ascontiguousarray(img)
+        try:
+            return img.view(np.uint32)[:, :, 0]
+        except ValueError:
+            return np.ascontiguousarray(img).view(np.uint32)[:, :, 0]
+
+    def apply(self, img: np.ndarray) -> np.ndarray:
+        if img.size == 0:
+            return np.zeros(img.shape[:2], dtype=np.uint8)
+        p = self.packed(img)
+        if self._shift:
+            p = p >> self._shift
+        return self.lut[p & self._index_mask]
+
+
+_MASKS: dict[tuple, ColorMask] = {}
+_LOCK = threading.Lock()
+_SETTINGS = {"enabled": False, "multi_range": True, "bits": 8}
+
+
+def configure_color_masks(enabled: bool = False, multi_range: bool = True, bits: int = 8):
+    """
+    enabled 控制单段 HSV 掩码（mask_hsv_range）是否查表：单段时查表与 OpenCV 速度相当，默认关闭；
+    multi_range 控制多段 HSV + BGR 规则的掩码（如怪物血条红色），查表明显更快，默认打开。
+    关闭时对应调用点回到 cvtColor + inRange。
+    """
+    with _LOCK:
+        _SETTINGS["enabled"] = bool(enabled)
+        _SETTINGS["multi_range"] = bool(multi_range)
+        _SETTINGS["bits"] = int(bits)
+        _MASKS.clear()
+
+
+def color_masks_enabled(multi_range: bool = False) -> bool:
+    return _SETTINGS["multi_range" if multi_range else "enabled"]
+
+
+def color_mask_settings() -> tuple[bool, bool, int]:
+    """(enabled, multi_range, bits)，给进程池子进程的 initializer 用。"""
+    return _SETTINGS["enabled"], _SETTINGS["multi_range"], _SETTINGS["bits"]
+
+
+def compile_color_mask(hsv_ranges, bgr_rule=None, rule_key=None, bits: int | None = None) -> ColorMask:
+    """
+    按 (HSV 范围, rule_key, bits) 缓存编译结果；bgr_rule 是 (b, g, r) int 数组 -> bool 数组的函数，
+    它的参数必须体现在 rule_key 里，否则不同参数会共用同一张表。
+    """
+    bits = int(bits if bits is not None else _SETTINGS["bits"])
+    ranges = tuple((tuple(int(v) for v in lo), tuple(int(v) for v in hi)) for lo, hi in hsv_ranges)
+    key = (ranges, rule_key, bits)
+    mask = _MASKS.get(key)
+    if mask is None:
+        if bgr_rule is not None and rule_key is None:
+            raise RuntimeError("compile_color_mask: bgr_rule requires rule_key")
+        mask = ColorMask(ranges, bits=bits, bgr_rule=bgr_rule)
+        with _LOCK:
+            mask = _MASKS.setdefault(key, mask)
+    return mask
+
+
+def hsv_range_mask(img_bgr: np.ndarray, lower_hsv, upper_hsv) -> np.ndarray:
+    return compile_color_mask(((lower_hsv, upper_hsv),)).apply(img_bgr)
@@ -0,0 +1,111 @@
+# core/coord_tracker.py
+import numpy as np
+
+
+def glyph_key(mask: np.ndarray, box) -> tuple:
+    """字符框内二值像素的指纹；同一位置像素完全一致就认为是同一个字符。"""
+    x, y, w, h = (int(v) for v in box)
+    crop = mask[y:y + h, x:x + w]
+    return crop.shape, np.ascontiguousarray(crop).tobytes()
+
+
+class CoordTracker:
+    """
+    行走中的坐标跟踪：保存上一次读数、逐字符指纹和速度（EMA，单位/秒）。
+    reuse() 找出与上次像素一致的字符直接沿用标签，只有变化的字符需要重新分类；
+    plausible() 用预测值校验拼出来的新坐标，不合理时调用方改走完整 OCR。
+    eta() 按当前速度估计还要多久进入目标容差，用来缩短临近目标时的轮询间隔。
+    """
+
+    def __init__(self, smoothing: float = 0.5, max_speed: float = 30.0):
+        self.smoothing = min(1.0, max(0.0, float(smoothing)))
+        self.max_speed = float(max_speed)
+        self.coord: tuple[int, int] | None = None
+        self.t = 0.0
+        self.velocity = (0.0, 0.0)
+        self._keys: list[list[tuple]] | None = None
+        self._texts: list[str] | None = None
+        self.stats = {"tracked": 0, "full": 0, "rejected": 0}
+
+    def reset_motion(self):
+        """换路线/重试后速度作废，下一次读数重新估计。"""
+        self.velocity = (0.0, 0.0)
+
+    def update(self, t: float, coord: tuple[int, int], glyph_keys=None):
+        t = float(t)
+        if self.coord is not None and t > self.t:
+            dt = t - self.t
+            vx = (coord[0] - self.coord[0]) / dt
+            vy = (coord[1] - self.coord[1]) / dt
+            if self.max_speed > 0 and max(abs(vx), abs(vy)) > self.max_speed:
+                # 传送/读错导致的跳变不计入速度
+                vx, vy = 0.0, 0.0
+                a = 1.0
+            else:
+                a = self.smoothing
+            self.velocity = (
+                self.velocity[0] + a * (vx - self.velocity[0]),
+                self.velocity[1] + a * (vy - self.velocity[1]),
+            )
+        self.coord = (int(coord[0]), int(coord[1]))
+        self.t = t
+        texts = [str(self.coord[0]), str(self.coord[1])]
+        # 只有字符数和数字位数对得上时才记住逐字符指纹
+        if glyph_keys is not None and [len(k) for k in glyph_keys] == [len(s) for s in texts]:
+            self._keys = [list(k) for k in glyph_keys]
+            self._texts = texts
+        else:
+            self._keys = None
+            self._texts = None
+
+    def predict(self, t: float) -> tuple[float, float] | None:
+        if self.coord is None:
+            return None
+        dt = max(0.0, float(t) - self.t)
+        return self.coord[0] + self.velocity[0] * dt, self.coord[1] + self.velocity[1] * dt
+
+    def reuse(self, glyph_keys) -> list[list[str | None]] | None:
+        """
+        与上次读数逐字符比较：像素一致的位置返回上次的数字，变化的位置为 None。
+        分组数或某组字符数变了（如 99 -> 100）返回 None，调用方走完整 OCR。
+        """
+        if self._keys is None or [len(k) for k in glyph_keys] != [len(k) for k in self._keys]:
+            return None
+        return [
+            [digit if key == old else None for key, old, digit in zip(keys, old_keys, text)]
+            for keys, old_keys, text in zip(glyph_keys, self._keys, self._texts)
+        ]
+
+    def plausible(self, t: float, coord: tuple[int, int], max_error: float) -> bool:
+        """新坐标与预测值每轴相差不超过 max_error + 预测位移的一半。"""
+        pred = self.predict(t)
+        if pred is None:
+            return False
+        dt = max(0.0, float(t) - self.t)
+        for axis in (0, 1):
+            slack = float(max_error) + 0.5 * abs(self.velocity[axis]) * dt
+            if abs(coord[axis] - pred[axis]) > slack:
+                return False
+        return True
+
+    def eta(self, target, tolerance: float) -> float | None:
+        """从上次读数起还要多少秒两轴都进入容差；某轴需要移动但没朝目标走时返回 None。"""
+        if self.coord is None:
+            return None
+        worst = 0.0
+        for axis in (0, 1):
+            gap = float(target[axis]) - self.coord[axis]
+            remaining = abs(gap) - float(tolerance)
+            if remaining <= 0:
+                continue
+            speed = self.velocity[axis] * (1.0 if gap > 0 else -1.0)
+            if speed <= 1e-6:
+                return None
+            worst = max(worst, remaining / speed)
+        return worst
+
+    def summary(self) -> str:
+        s = self.stats
+        total = s["tracked"] + s["full"]
+        rate = s["tracked"] / total if total else 0.0
+        return f"coord-track tracked={s['tracked']} full={s['full']} rejected={s['rejected']} track_rate={rate:.1%}"
@@ -0,0 +1,257 @@
+# core/frames.py
+import time
+
+import numpy as np
+
+from core.capture_session import CaptureSession, RoiFrame, clip_rect
+from core.capture_worker import CaptureWorker
+
+
+def _default_session(hwnd: int) -> CaptureSession:
+    return CaptureSession(hwnd)
+
+
+class FrameProvider:
+    """
+    每个 hwnd 一份帧缓存：max_age 秒内的重复读取直接复用上一张截图，
+    同一轮循环里的多个检测器共享一次 BitBlt。
+
+    - frame(hwnd): 整帧 BGRA（连续，vision 函数直接接受 4 通道）
+    - rois(hwnd, rois): 若缓存整帧仍新鲜则直接切片，否则只截这些 ROI
+    返回的数组指向会话缓冲区，只保证在下一次刷新前有效（同一轮循环内使用）。
+
+    worker_fps > 0 时改为每个 hwnd 启一个 CaptureWorker 后台采集，
+    frame()/rois() 取环形缓冲区里的最新帧，不再同步截图。槽位会被后台线程循环覆盖，
+    所以交出去的是拷贝（整帧按 seq 只拷一次，ROI 只拷切片），拷完确认槽位没被覆盖才返回。
+    """
+
+    def __init__(
+        self,
+        max_age: float = 0.05,
+        session_factory=None,
+        time_fn=time.monotonic,
+        worker_fps: float = 0.0,
+        worker_slots: int = 3,
+    ):
+        self.max_age = float(max_age)
+        self.session_factory = session_factory or _default_session
+        self.time_fn = time_fn
+        self.worker_fps = float(worker_fps)
+        self.worker_slots = int(worker_slots)
+        self._sessions: dict[int, CaptureSession] = {}
+        self._workers: dict[int, CaptureWorker] = {}
+        self._frames: dict[int, tuple[float, np.ndarray]] = {}
+        self._roi_frames: dict[tuple[int, tuple[int, int, int, int]], tuple[float, RoiFrame]] = {}
+        self.stats = {"hits": 0, "misses": 0, "roi_hits": 0, "roi_misses": 0, "worker_reads": 0}
+        # 可选 SessionRecorder：检测器通过 rois() 读到的每个 ROI（不论是否命中缓存）都交给它异步落盘；
+        # frame() 整帧只录 recorder.rois 里配置的区域
+        self.recorder = None
+        self._recorded_seq: dict[int, int] = {}
+        self._recorded_rois: dict[tuple, object] = {}
+        self._worker_copies: dict[int, tuple[int, np.ndarray]] = {}
+
+    def session(self, hwnd: int) -> CaptureSession:
+        session = self._sessions.get(hwnd)
+        if session is None:
+            session = self.session_factory(hwnd)
+            self._sessions[hwnd] = session
+        return session
+
+    def _fresh(self, ts: float, now: float) -> bool:
+        return self.max_age > 0 and now - ts <= self.max_age
+
+    def worker(self, hwnd: int) -> CaptureWorker | None:
+        if self.worker_fps <= 0:
+            return None
+        worker = self._workers.get(hwnd)
+        if worker is None:
+            # 后台线程独占自己的会话，不和同步截图共用缓冲区
+            worker = CaptureWorker(
+                self.session_factory(hwnd),
+                fps=self.worker_fps,
+                slots=self.worker_slots,
+                time_fn=self.time_fn,
+            )
+            self._workers[hwnd] = worker
+        if not worker.running:
+            worker.start()
+            worker.wait_first(timeout=1.0)
+        return worker
+
+    def _worker_read(self, hwnd: int, read):
+        """
+        read(slot_img, seq) 返回从槽位拷出的数据；拷完后槽位仍是这个 seq 才有效，
+        否则（读的过程中被后台线程覆盖）换最新帧重试。返回 (seq, 拷贝) 或 None。
+        """
+        worker = self.worker(hwnd)
+        if worker is None:
+            return None
+        # 后台线程卡住/窗口异常时帧会变旧，退回同步截图
+        if worker.frame_age() > max(1.0, worker.period * 5):
+            return None
+        for _attempt in range(3):
+            latest = worker.latest()
+            if latest is None:
+                return None
+            img, seq, _ts = latest
+            out = read(img, seq)
+            if worker.is_current(seq):
+                self.stats["worker_reads"] += 1
+                return seq, out
+        return None
+
+    def _record_rois(self, hwnd: int, frames: list[RoiFrame], stamp):
+        """stamp 标识像素来源（worker seq / 截图时间），同一来源的同一 ROI 只录一次。"""
+        if self.recorder is None:
+            return
+        for frame in frames:
+            rect = (frame.x, frame.y, frame.x + frame.img.shape[1], frame.y + frame.img.shape[0])
+            if self._recorded_rois.get((hwnd, rect)) == stamp:
+                continue
+            self._recorded_rois[(hwnd, rect)] = stamp
+            self.recorder.record_roi(hwnd, rect, frame.img)
+
+    def _new_worker_seq(self, hwnd: int, seq: int) -> bool:
+        if self._recorded_seq.get(hwnd) == seq:
+            return False
+        self._recorded_seq[hwnd] = seq
+        return True
+
+    def _worker_frame_copy(self, img: np.ndarray, seq: int, hwnd: int) -> np.ndarray:
+        cached = self._worker_copies.get(hwnd)
+        if cached is not None and cached[0] == seq:
+            return cached[1]
+        copy = img.copy()
+        self._worker_copies[hwnd] = (seq, copy)
+        return copy
+
+    def frame(self, hwnd: int) -> np.ndarray:
+        got = self._worker_read(hwnd, lambda slot, seq: self._worker_frame_copy(slot, seq, hwnd))
+        if got is not None:
+            seq, img = got
+            if self.recorder is not None and self._new_worker_seq(hwnd, seq):
+                self.recorder.record_frame(hwnd, img)
+            return img
+
+        now = self.time_fn()
+        cached = self._frames.get(hwnd)
+        if cached is not None and self._fresh(cached[0], now):
+            self.stats["hits"] += 1
+            return cached[1]
+
+        self.stats["misses"] += 1
+        img = self.session(hwnd).grab()
+        self._frames[hwnd] = (self.time_fn(), img)
+        if self.recorder is not None:
+            self.recorder.record_frame(hwnd, img)
+        return img
+
+    @staticmethod
+    def _slice_rois(img: np.ndarray, rois, copy: bool) -> list[RoiFrame]:
+        h, w = img.shape[:2]
+        out = []
+        for roi in rois:
+            x1, y1, x2, y2 = clip_rect(roi, w, h)
+            view = img[y1:y2, x1:x2]
+            out.append(RoiFrame(view.copy() if copy else view, x1, y1))
+        return out
+
+    def rois(self, hwnd: int, rois) -> list[RoiFrame]:
+        got = self._worker_read(hwnd, lambda slot, _seq: self._slice_rois(slot, rois, copy=True))
+        if got is not None:
+            seq, out = got
+            self._record_rois(hwnd, out, ("worker", seq))
+            return out
+
+        now = self.time_fn()
+        cached = self._frames.get(hwnd)
+        if cached is not None and self._fresh(cached[0], now):
+            self.stats["roi_hits"] += len(rois)
+            out = self._slice_rois(cached[1], rois, copy=False)
+            self._record_rois(hwnd, out, ("frame", cached[0]))
+            return out
+
+        rects = [tuple(int(v) for v in roi) for roi in rois]
+        result: list[RoiFrame | None] = [None] * len(rects)
+        missing = []
+        for idx, rect in enumerate(rects):
+            entry = self._roi_frames.get((hwnd, rect))
+            if entry is not None and self._fresh(entry[0], now):
+                result[idx] = entry[1]
+                self.stats["roi_hits"] += 1
+            else:
+                missing.append(idx)
+
+        if missing:
+            self.stats["roi_misses"] += len(missing)
+            grabbed = self.session(hwnd).grab_rois([rects[i] for i in missing])
+            ts = self.time_fn()
+            for idx, frame in zip(missing, grabbed):
+                result[idx] = frame
+                self._roi_frames[(hwnd, rects[idx])] = (ts, frame)
+        if self.recorder is not None:
+            for rect, frame in zip(rects, result):
+                self._record_rois(hwnd, [frame], ("roi", self._roi_frames[(hwnd, rect)][0]))
+        return result
+
+    def invalidate(self, hwnd: int | None = None):
+        if hwnd is None:
+            self._frames.clear()
+            self._roi_frames.clear()
+            return
+        self._frames.pop(hwnd, None)
+        for key in [k for k in self._roi_frames if k[0] == hwnd]:
+            del self._roi_frames[key]
+
+    def hit_rate(self) -> float:
+        hits = self.stats["hits"] + self.stats["roi_hits"]
+        total = hits + self.stats["misses"] + self.stats["roi_misses"]
+        return hits / total if total else 0.0
+
+    def close(self):
+        for worker in self._workers.values():
+            worker.stop()
+        self._workers.clear()
+        for session in self._sessions.values():
+            session.close()
+        self._sessions.clear()
+        self.invalidate()
+
+
+_PROVIDER = FrameProvider()
+
+
+def get_provider() -> FrameProvider:
+    return _PROVIDER
+
+
+def set_provider(provider: FrameProvider) -> FrameProvider:
+    global _PROVIDER
+    _PROVIDER = provider
+    return provider
+
+
+def configure_frames(max_age: float = 0.05, worker_fps: float = 0.0, worker_slots: int = 3) -> FrameProvider:
+    _PROVIDER.max_age = float(max_age)
+    _PROVIDER.worker_fps = float(worker_fps)
+    _PROVIDER.worker_slots = int(worker_slots)
+    return _PROVIDER
+
+
+def get_frame(hwnd: int) -> np.ndarray:
+    return _PROVIDER.frame(hwnd)
+
+
+def get_rois(hwnd: int, rois) -> list[RoiFrame]:
+    return _PROVIDER.rois(hwnd, rois)
+
+
+def frame_stats() -> str:
+    s = _PROVIDER.stats
+    text = (
+        f"frames hit={s['hits']} miss={s['misses']} | rois hit={s['roi_hits']} miss={s['roi_misses']} "
+        f"| hit_rate={_PROVIDER.hit_rate():.1%}"
+    )
+    for hwnd, worker in _PROVIDER._workers.items():
+        text += f" | worker[{hwnd}] {worker.summary()}"
+    return text
@@ -0,0 +1,211 @@
+# core/glyphs.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def normalize_glyph(img, canvas_size=(24, 24), pad=2):
+    """二值字形裁掉空白后按比例缩放、居中放到固定画布上；没有前景像素返回 None。"""
+    if img is None or img.size == 0:
+        return None
+
+    ys, xs = (img > 0).nonzero()
+    if len(xs) == 0 or len(ys) == 0:
+        return None
+
+    x1, x2 = xs.min(), xs.max() + 1
+    y1, y2 = ys.min(), ys.max() + 1
+    glyph = img[y1:y2, x1:x2]
+    gh, gw = glyph.shape[:2]
+    if gh <= 0 or gw <= 0:
+        return None
+
+    canvas_w, canvas_h = canvas_size
+    usable_w = max(1, canvas_w - pad * 2)
+    usable_h = max(1, canvas_h - pad * 2)
+    scale = min(usable_w / gw, usable_h / gh)
+    new_w = max(1, int(round(gw * scale)))
+    new_h = max(1, int(round(gh * scale)))
+
+    resized = cv2.resize(glyph, (new_w, new_h), interpolation=cv2.INTER_NEAREST)
+    _, resized = cv2.threshold(resized, 127, 255, cv2.THRESH_BINARY)
+
+    canvas = np.zeros((canvas_h, canvas_w), dtype=np.uint8)
+
+    off_x = (canvas_w - new_w) // 2
+    off_y = (canvas_h - new_h) // 2
+    canvas[off_y:off_y + new_h, off_x:off_x + new_w] = resized
+    return canvas
+
+
+class GlyphClassifier:
+    """
+    预编译字形分类器：模板只做一次二值化+归一化，堆成 (N, H, W)。
+    分类时 M 个字符一次矩阵运算对全部模板打分：IoU * iou_weight + 相关系数 * (1 - iou_weight)，
+    与逐对 bitwise_and/bitwise_or/matchTemplate(TM_CCOEFF_NORMED) 的结果一致。
+    """
+
+    def __init__(self, labels: list[str], glyphs: np.ndarray, iou_weight: float = 0.85):
+        self.labels = list(labels)
+        self.glyphs = glyphs
+        self.canvas_size = (glyphs.shape[2], glyphs.shape[1]) if len(glyphs) else (24, 24)
+        self.iou_weight = float(iou_weight)
+
+        flat = glyphs.reshape(len(glyphs), -1)
+        self._bits = (flat > 0).astype(np.float32)
+        self._area = self._bits.sum(axis=1)
+        centered = flat.astype(np.float32)
+        centered -= centered.mean(axis=1, keepdims=True)
+        self._centered = centered
+        self._norm = np.sqrt((centered * centered).sum(axis=1))
+
+    @classmethod
+    def from_masks(cls, masks: dict[str, np.ndarray], canvas_size=(24, 24), iou_weight: float = 0.85):
+        """masks 为 {标签: 二值模板图}；空模板跳过。"""
+        return cls.from_samples(list(masks.items()), canvas_size, iou_weight)
+
+    @classmethod
+    def from_samples(cls, samples: list[tuple[str, np.ndarray]], canvas_size=(24, 24), iou_weight: float = 0.85):
+        """samples 为 [(标签, 二值字形)]，同一标签可以有多个样本。"""
+        labels = []
+        glyphs = []
+        for label, mask in samples:
+            if mask is None or cv2.countNonZero(mask) == 0:
+                continue
+            norm = normalize_glyph(mask, canvas_size)
+            if norm is None:
+                continue
+            labels.append(str(label))
+            glyphs.append(norm)
+        stack = np.stack(glyphs) if glyphs else np.zeros((0, canvas_size[1], canvas_size[0]), dtype=np.uint8)
+        return cls(labels, stack, iou_weight)
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def scores(self, chars: np.ndarray) -> np.ndarray:
+        """chars: (M, H, W) 已归一化的字形；返回 (M, N) 分数矩阵。"""
+        flat = chars.reshape(len(chars), -1)
+        bits = (flat > 0).astype(np.float32)
+        inter = bits @ self._bits.T
+        union = bits.sum(axis=1)[:, None] + self._area[None, :] - inter
+        iou = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+        centered = flat.astype(np.float32)
+        centered -= centered.mean(axis=1, keepdims=True)
+        denom = np.sqrt((centered * centered).sum(axis=1))[:, None] * self._norm[None, :]
+        corr = np.divide(centered @ self._centered.T, denom, out=np.zeros_like(inter), where=denom > 0)
+        return iou * self.iou_weight + corr * (1.0 - self.iou_weight)
+
+    def classify(self, chars: np.ndarray) -> tuple[list[str], np.ndarray]:
+        """返回每个字形的最佳标签和对应分数。"""
+        labels, scores, _margins = self.classify_with_margin(chars)
+        return labels, scores
+
+    def classify_with_margin(self, chars: np.ndarray) -> tuple[list[str], np.ndarray, np.ndarray]:
+        """额外返回 margin：最佳分数减去其它标签里的最高分（只有一种标签时 margin = 分数）。"""
+        if len(chars) == 0 or len(self.labels) == 0:
+            empty = np.zeros(0, dtype=np.float32)
+            return [], empty, empty
+        scores = self.scores(chars)
+        rows = np.arange(len(scores))
+        best = scores.argmax(axis=1)
+        best_scores = scores[rows, best]
+        label_ids = np.unique(np.asarray(self.labels), return_inverse=True)[1].reshape(-1)
+        others = np.where(label_ids[None, :] == label_ids[best][:, None], -np.inf, scores).max(axis=1)
+        margins = np.where(np.isfinite(others), best_scores - others, best_scores)
+        return [self.labels[i] for i in best], best_scores, margins
+
+    def normalize_boxes(self, mask: np.ndarray, boxes) -> np.ndarray | None:
+        """按 x 排序裁出每个字符框并归一化，堆成 (M, H, W)；任一字符为空返回 None。"""
+        chars = []
+        for bx, by, bw, bh in sorted(boxes, key=lambda item: item[0]):
+            norm = normalize_glyph(mask[by:by + bh, bx:bx + bw], self.canvas_size)
+            if norm is None:
+                return None
+            chars.append(norm)
+        return np.stack(chars) if chars else None
+
+    def read_groups(self, mask: np.ndarray, groups: list[list[tuple]]) -> list[tuple[str | None, np.ndarray]]:
+        """
+        mask 上按 groups（每组若干 (x, y, w, h) 字符框）读字符串，所有组的字符合成一批分类。
+        某组里任一字符归一化失败，该组结果为 None。返回 [(文本, 各字符分数)]。
+        """
+        chars = []
+        spans = []
+        for boxes in groups:
+            start = len(chars)
+            group_chars = self.normalize_boxes(mask, boxes) if boxes else None
+            if group_chars is not None:
+                chars.extend(group_chars)
+            spans.append((start, len(chars), group_chars is not None))
+
+        labels, scores = self.classify(np.stack(chars) if chars else np.zeros((0, 1, 1), dtype=np.uint8))
+        out = []
+        for start, end, ok in spans:
+            if not ok or not labels:
+                out.append((None, np.zeros(0, dtype=np.float32)))
+            else:
+                out.append(("".join(labels[start:end]), scores[start:end]))
+        return out
+
+
+class ReadingCache:
+    """
+    整段 OCR 结果的 LRU 缓存：key 为二值化 ROI 掩码（形状+像素）的哈希，value 为完整读数
+    （读不出来的 None 也缓存）。站着不动或坐标没变时，重复读取只剩一次哈希。
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, int(max_entries))
+        self._entries: OrderedDict[tuple, object] = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0}
+
+    @staticmethod
+    def key(mask: np.ndarray, scope=None) -> tuple:
+        digest = hashlib.blake2b(np.ascontiguousarray(mask).data, digest_size=16).digest()
+        return scope, mask.shape, digest
+
+    def get_or_compute(self, mask: np.ndarray, compute, scope=None):
+        """scope 区分不同的识别器/模板集，避免同一掩码在不同配置下串用结果。"""
+        key = self.key(mask, scope)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return self._entries[key]
+
+        value = compute()
+        with self._lock:
+            self.stats["misses"] += 1
+            self._entries[key] = value
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"ocr-cache hits={s['hits']} misses={s['misses']} size={len(self._entries)} hit_rate={self.hit_rate():.1%}"
+
+
+_READINGS = ReadingCache()
+
+
+def get_reading_cache() -> ReadingCache:
+    return _READINGS
+
+
+def reading_cache_stats() -> str:
+    return _READINGS.summary()
@@ -0,0 +1,234 @@
+# core/hotspots.py
+import json
+import os
+import threading
+
+from core.roi_cache import find_template_cached
+from core.vision import Match, find_template
+
+
+class HotspotWindows:
+    """
+    按检测器记录历史命中中心点，相近的点聚成簇（簇包围盒外扩 cluster_gap 内的点归入同一簇），
+    每簇一个小窗口（包围盒加上模板半尺寸和 margin），按簇内命中数从多到少依次搜索，
+    都没命中再退回完整 ROI，所以召回率不变，只是大多数帧匹配面积更小。
+    目标出现在几个分散位置时也不会因为一个大包围盒覆盖全图而失效。命中点可以保存成 JSON，下次启动直接加载。
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        margin: int = 16,
+        min_hits: int = 3,
+        max_points: int = 64,
+        enabled: bool = True,
+        cluster_gap: int = 32,
+        max_windows: int = 4,
+    ):
+        self.path = path
+        self.margin = int(margin)
+        self.min_hits = max(1, int(min_hits))
+        self.max_points = max(1, int(max_points))
+        self.enabled = bool(enabled)
+        self.cluster_gap = max(0, int(cluster_gap))
+        self.max_windows = max(1, int(max_windows))
+        self._points: dict[str, list[tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats = {"narrow": 0, "narrow_hits": 0, "fallbacks": 0, "full": 0, "area_saved": 0}
+
+    def record(self, detector: str, x: int, y: int):
+        point = (int(x), int(y))
+        with self._lock:
+            points = self._points.setdefault(detector, [])
+            if point in points:
+                return
+            points.append(point)
+            if len(points) > self.max_points:
+                del points[0]
+            self._dirty = True
+
+    def _clusters(self, points) -> list[list[int]]:
+        """贪心聚类，返回 [count, x1, y1, x2, y2]（点坐标包围盒），按 count 从大到小。"""
+        gap = self.cluster_gap
+        clusters: list[list[int]] = []
+        for x, y in points:
+            for c in clusters:
+                if c[1] - gap <= x <= c[3] + gap and c[2] - gap <= y <= c[4] + gap:
+                    c[0] += 1
+                    c[1], c[2], c[3], c[4] = min(c[1], x), min(c[2], y), max(c[3], x), max(c[4], y)
+                    break
+            else:
+                clusters.append([1, x, y, x, y])
+        # 扩张后的簇可能相互重叠，合并到稳定为止
+        merged = True
+        while merged:
+            merged = False
+            for i in range(len(clusters)):
+                for j in range(i + 1, len(clusters)):
+                    a, b = clusters[i], clusters[j]
+                    if a[1] - gap <= b[3] and b[1] - gap <= a[3] and a[2] - gap <= b[4] and b[2] - gap <= a[4]:
+                        clusters[i] = [a[0] + b[0], min(a[1], b[1]), min(a[2], b[2]), max(a[3], b[3]), max(a[4], b[4])]
+                        del clusters[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return sorted(clusters, key=lambda c: -c[0])
+
+    def windows(self, detector: str, bounds, pad) -> list[tuple[int, int, int, int]]:
+        """
+        bounds 为完整 ROI（client coords），pad 为 (半宽, 半高)。返回按命中数排序的窗口列表；
+        记录不足 min_hits，或窗口总面积接近 bounds 时返回空列表（直接全 ROI 搜索）。
+        """
+        if not self.enabled or bounds is None:
+            return []
+        with self._lock:
+            points = list(self._points.get(detector, ()))
+        if len(points) < self.min_hits:
+            return []
+
+        bx1, by1, bx2, by2 = (int(v) for v in bounds)
+        px = int(pad[0]) + self.margin
+        py = int(pad[1]) + self.margin
+        wins = []
+        for _count, x1, y1, x2, y2 in self._clusters(points)[: self.max_windows]:
+            win = (max(bx1, x1 - px), max(by1, y1 - py), min(bx2, x2 + px), min(by2, y2 + py))
+            if win[2] > win[0] and win[3] > win[1]:
+                wins.append(win)
+        if not wins or sum(_area(w) for w in wins) >= 0.8 * _area((bx1, by1, bx2, by2)):
+            return []
+        return wins
+
+    def note(self, bounds, wins, hit: bool):
+        """统计：wins 为本次实际搜索过的窗口，为空表示直接全 ROI 搜索。"""
+        if not wins:
+            self.stats["full"] += 1
+            return
+        self.stats["narrow"] += 1
+        if hit:
+            self.stats["narrow_hits"] += 1
+            self.stats["area_saved"] += _area(bounds) - sum(_area(w) for w in wins)
+        else:
+            self.stats["fallbacks"] += 1
+            self.stats["area_saved"] -= sum(_area(w) for w in wins)
+
+    def search(self, detector: str, roi, bounds, pad, match_fn) -> Match:
+        """match_fn(roi) -> Match；按顺序试各热点窗口，都未命中再用原始 roi。"""
+        wins = self.windows(detector, bounds, pad)
+        for n, win in enumerate(wins, start=1):
+            m = match_fn(win)
+            if m.ok:
+                self.note(bounds, wins[:n], True)
+                self.record(detector, m.x, m.y)
+                return m
+        self.note(bounds, wins, False)
+
+        m = match_fn(roi)
+        if m.ok:
+            self.record(detector, m.x, m.y)
+        return m
+
+    def load(self, path: str | None = None):
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            print(f"[HOTSPOT] ignore unreadable {path}: {exc}")
+            return
+        with self._lock:
+            for detector, points in (data.get("detectors") or {}).items():
+                self._points[str(detector)] = [(int(x), int(y)) for x, y in points][-self.max_points:]
+            self._dirty = False
+
+    def save(self, path: str | None = None):
+        path = path or self.path
+        if not path or not self._dirty:
+            return
+        with self._lock:
+            data = {"version": 1, "detectors": {k: [list(p) for p in v] for k, v in self._points.items()}}
+            self._dirty = False
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"hotspots detectors={len(self._points)} narrow={s['narrow']} narrow_hits={s['narrow_hits']} "
+            f"fallbacks={s['fallbacks']} full={s['full']} saved={s['area_saved'] / 1e6:.1f}Mpx"
+        )
+
+
+def _area(rect) -> int:
+    x1, y1, x2, y2 = rect
+    return max(0, int(x2) - int(x1)) * max(0, int(y2) - int(y1))
+
+
+_HOTSPOTS = HotspotWindows()
+
+
+def get_hotspots() -> HotspotWindows:
+    return _HOTSPOTS
+
+
+def configure_hotspots(
+    path: str | None = None,
+    margin: int = 16,
+    min_hits: int = 3,
+    enabled: bool = True,
+    cluster_gap: int = 32,
+    max_windows: int = 4,
+) -> HotspotWindows:
+    global _HOTSPOTS
+    _HOTSPOTS = HotspotWindows(
+        path=path,
+        margin=margin,
+        min_hits=min_hits,
+        enabled=enabled,
+        cluster_gap=cluster_gap,
+        max_windows=max_windows,
+    )
+    _HOTSPOTS.load()
+    return _HOTSPOTS
+
+
+def save_hotspots():
+    _HOTSPOTS.save()
+
+
+def hotspot_stats() -> str:
+    return _HOTSPOTS.summary()
+
+
+def image_bounds(img, offset=(0, 0)) -> tuple[int, int, int, int]:
+    ox, oy = int(offset[0]), int(offset[1])
+    return ox, oy, ox + img.shape[1], oy + img.shape[0]
+
+
+def find_template_hot(
+    detector: str,
+    img,
+    tpl,
+    threshold=0.2,
+    roi=None,
+    offset=(0, 0),
+    scope=None,
+    cached: bool = True,
+) -> Match:
+    """
+    find_template(_cached) 的热点版本：先在 detector 的历史命中附近找，找不到再扫完整 roi。
+    cached=False 时不走脏区缓存（需要每次真实重匹配的校验场景）。
+    """
+    bounds = roi if roi is not None else image_bounds(img, offset)
+    th, tw = tpl.shape[:2]
+    if cached:
+        match_fn = lambda r: find_template_cached(img, tpl, threshold=threshold, roi=r, offset=offset, scope=scope)
+    else:
+        match_fn = lambda r: find_template(img, tpl, threshold=threshold, roi=r, offset=offset)
+    return _HOTSPOTS.search(detector, roi, bounds, (tw // 2, th // 2), match_fn)
@@ -0,0 +1,77 @@
+# core/hp_bar.py
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+
+def longest_true_run(values) -> int:
+    """布尔序列里最长的连续 True 长度（向量化，不逐元素循环）。"""
+    flags = np.asarray(values, dtype=bool)
+    if flags.size == 0:
+        return 0
+    edges = np.diff(np.concatenate(([0], flags.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return int((ends - starts).max()) if starts.size else 0
+
+
+@dataclass
+class HpBarReading:
+    present: bool
+    fill: float  # 0.0 ~ 1.0，最右侧有效列 / 血条宽度
+    red_pixels: int
+    run_columns: int
+
+
+def analyze_hp_bar(mask: np.ndarray, min_column_pixels: int = 3, min_run_columns: int = 2) -> HpBarReading:
+    """
+    血条掩码 -> 读数。每列红色像素 >= min_column_pixels 视为有效列，
+    最长连续有效列 >= min_run_columns 才算有血条；血量从左往右填充，fill 取最右有效列的位置。
+    """
+    if mask is None or mask.size == 0:
+        return HpBarReading(False, 0.0, 0, 0)
+    per_column = np.count_nonzero(mask, axis=0)
+    columns = per_column >= min_column_pixels
+    run = longest_true_run(columns)
+    red_pixels = int(per_column.sum())
+    if run < min_run_columns:
+        return HpBarReading(False, 0.0, red_pixels, run)
+    right = int(np.flatnonzero(columns)[-1]) + 1
+    return HpBarReading(True, right / columns.size, red_pixels, run)
+
+
+class HpTrend:
+    """
+    最近若干次 (时间, fill) 的线性拟合：rate 为每秒变化量（掉血为负），
+    eta() 估计还要多久降到 0。fill 回升（换了目标/回血）时清空历史重新计。
+    """
+
+    def __init__(self, window: int = 6, reset_jump: float = 0.15):
+        self.samples: deque[tuple[float, float]] = deque(maxlen=max(2, int(window)))
+        self.reset_jump = float(reset_jump)
+
+    def reset(self):
+        self.samples.clear()
+
+    def add(self, t: float, fill: float):
+        if self.samples and fill > self.samples[-1][1] + self.reset_jump:
+            self.samples.clear()
+        self.samples.append((float(t), float(fill)))
+
+    def rate(self) -> float:
+        if len(self.samples) < 2:
+            return 0.0
+        data = np.asarray(self.samples, dtype=np.float64)
+        t = data[:, 0] - data[0, 0]
+        if t[-1] <= 0:
+            return 0.0
+        slope, _intercept = np.polyfit(t, data[:, 1], 1)
+        return float(slope)
+
+    def eta(self) -> float | None:
+        """按当前掉血速度还要多少秒归零；没在掉血或样本不足时返回 None。"""
+        rate = self.rate()
+        if rate >= 0 or not self.samples:
+            return None
+        return max(0.0, self.samples[-1][1] / -rate)
@@ -0,0 +1,68 @@
+# core/motion.py
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class MotionReading:
+    energy: float  # 各格平均绝对差的均值
+    moving_cells: int
+    moving_fraction: float
+    still: bool
+
+
+class GridMotion:
+    """
+    低分辨率网格运动检测：灰度 ROI 先 INTER_AREA 缩到 (grid_w*cell, grid_h*cell)，
+    帧差按格求均值得到每格运动能量。每格阈值 = cell_threshold + noise_gain * 该格噪声。
+    噪声用 EMA 学习，条件是各格能量的中位数低于 cell_threshold：镜头移动会让大多数格子变化，
+    而水面、动画 UI 只占一部分格子，不影响中位数，所以即使它们超过 still_fraction 也照样学习、
+    抬高自己的阈值。超阈值格子占比 <= still_fraction 即判为静止。
+    """
+
+    def __init__(
+        self,
+        grid=(16, 12),
+        cell: int = 4,
+        cell_threshold: float = 6.0,
+        noise_gain: float = 2.0,
+        noise_alpha: float = 0.1,
+        still_fraction: float = 0.08,
+    ):
+        self.grid_w, self.grid_h = (max(1, int(v)) for v in grid)
+        self.cell = max(1, int(cell))
+        self.cell_threshold = float(cell_threshold)
+        self.noise_gain = float(noise_gain)
+        self.noise_alpha = min(1.0, max(0.0, float(noise_alpha)))
+        self.still_fraction = float(still_fraction)
+        self.noise = np.zeros((self.grid_h, self.grid_w), dtype=np.float32)
+        self._prev: np.ndarray | None = None
+
+    def reset(self):
+        """丢掉上一帧（噪声保留），下一次 update 只记录基准帧。"""
+        self._prev = None
+
+    def _shrink(self, gray: np.ndarray) -> np.ndarray:
+        size = (self.grid_w * self.cell, self.grid_h * self.cell)
+        return cv2.resize(gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def update(self, gray: np.ndarray) -> MotionReading | None:
+        """返回与上一帧相比的读数；第一帧（或 reset 之后）返回 None。"""
+        if gray is None or gray.size == 0:
+            return None
+        small = self._shrink(gray)
+        prev, self._prev = self._prev, small
+        if prev is None:
+            return None
+
+        diff = np.abs(small - prev)
+        cells = diff.reshape(self.grid_h, self.cell, self.grid_w, self.cell).mean(axis=(1, 3))
+        moving = cells > self.cell_threshold + self.noise_gain * self.noise
+        count = int(np.count_nonzero(moving))
+        fraction = count / moving.size
+        still = fraction <= self.still_fraction
+        if float(np.median(cells)) <= self.cell_threshold:
+            self.noise += self.noise_alpha * (cells - self.noise)
+        return MotionReading(float(cells.mean()), count, fraction, still)
@@ -0,0 +1,155 @@
+# core/orchestrator.py
+import threading
+import time
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+
+class Baton:
+    """
+    公平接力棒（FIFO 票号锁）：同一时刻只有一个客户端“醒着”——截图、识别、发输入；
+    其余客户端要么在 sleep，要么按到达顺序排队。
+    多窗口共用前台/鼠标，输入必须串行；识别串行也避免多个线程抢 cv2 的内部线程池。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+
+    def acquire(self):
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while self._serving != ticket:
+                self._cond.wait()
+
+    def release(self):
+        with self._cond:
+            self._serving += 1
+            self._cond.notify_all()
+
+
+@dataclass
+class ClientStats:
+    title: str
+    slices: int = 0  # 醒着的次数（两次 sleep 之间算一次）
+    awake_s: float = 0.0
+    wait_s: float = 0.0
+    started: float = 0.0
+    finished: float = 0.0
+    error: str = ""
+
+    def summary(self, now: float) -> str:
+        wall = max(1e-6, (self.finished or now) - self.started)
+        text = (
+            f"slices={self.slices} ({self.slices / wall * 60:.0f}/min) "
+            f"awake={self.awake_s:.1f}s ({self.awake_s / wall:.0%}) wait={self.wait_s:.1f}s"
+        )
+        if self.error:
+            text += f" error={self.error}"
+        return text
+
+
+class BatonClock:
+    """
+    包装 HumanClock：sleep 期间交出接力棒，醒来后重新排队，
+    因此各 feature 循环不用改代码，每个 ctx.clock.sleep 就是一个让出点。
+    """
+
+    def __init__(self, clock, baton: Baton, stats: ClientStats, time_fn=time.perf_counter):
+        self._clock = clock
+        self._baton = baton
+        self._stats = stats
+        self._time_fn = time_fn
+        self._since = 0.0
+
+    def __getattr__(self, name):
+        return getattr(self._clock, name)
+
+    def enter(self):
+        t0 = self._time_fn()
+        self._baton.acquire()
+        self._since = self._time_fn()
+        self._stats.wait_s += self._since - t0
+
+    def leave(self):
+        self._stats.awake_s += self._time_fn() - self._since
+        self._stats.slices += 1
+        self._baton.release()
+
+    def sleep(self, base: float):
+        self.leave()
+        try:
+            self._clock.sleep(base)
+        finally:
+            self.enter()
+
+
+@dataclass
+class ClientSpec:
+    title: str
+    mode: str
+    profile_name: str
+    profile: dict
+    run: Callable[[Any], None]
+    binder: Any = None
+    clock: Any = None
+    stats: ClientStats = field(init=False)
+
+    def __post_init__(self):
+        self.stats = ClientStats(self.title)
+
+
+class Orchestrator:
+    """
+    一个进程驱动多个游戏窗口：每个客户端一个线程跑自己的 feature 循环，
+    通过 Baton 协作式轮流执行。截图走全局 FrameProvider（按 hwnd 区分会话），
+    模板走 core.templates 的进程级缓存，只加载一次。
+    """
+
+    def __init__(self, clients: list[ClientSpec], make_ctx: Callable[[ClientSpec, Any], Any], time_fn=time.perf_counter):
+        if not clients:
+            raise RuntimeError("Orchestrator 至少需要一个客户端")
+        self.clients = clients
+        self.make_ctx = make_ctx
+        self.time_fn = time_fn
+        self.baton = Baton()
+        self._threads: list[threading.Thread] = []
+
+    def _run_client(self, spec: ClientSpec):
+        clock = BatonClock(spec.clock, self.baton, spec.stats, time_fn=self.time_fn)
+        ctx = self.make_ctx(spec, clock)
+        spec.stats.started = self.time_fn()
+        clock.enter()
+        try:
+            spec.run(ctx)
+        except Exception as exc:
+            spec.stats.error = f"{type(exc).__name__}: {exc}"
+            print(f"[ORCH] {spec.title} crashed:\n{traceback.format_exc()}")
+        finally:
+            clock.leave()
+            spec.stats.finished = self.time_fn()
+
+    def start(self):
+        for spec in self.clients:
+            thread = threading.Thread(target=self._run_client, args=(spec,), name=f"client-{spec.title}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def join(self, timeout: float | None = None):
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def run(self):
+        self.start()
+        self.join()
+        print(self.summary())
+
+    def summary(self) -> str:
+        now = self.time_fn()
+        lines = ["[ORCH] per-client stats:"]
+        for spec in self.clients:
+            lines.append(f"  {spec.title} [{spec.mode}/{spec.profile_name}] {spec.stats.summary(now)}")
+        return "\n".join(lines)
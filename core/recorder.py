@@ -0,0 +1,244 @@
+# core/recorder.py
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+import numpy as np
+
+MAGIC = b"YTLREC1\n"
+# 记录头：kind(4s) + meta 长度 + payload 长度
+_RECORD = struct.Struct("<4sII")
+
+KIND_META = b"META"
+KIND_FRAME = b"FRAM"
+KIND_INPUT = b"INPT"
+
+
+class SessionRecorder:
+    """
+    会话录制：把 bot 实际消费的帧（只存 ROI 裁剪）和发出的输入写进一个分块文件。
+
+    - 同一 ROI 与上一帧完全相同：只写一条 "same" 记录，无像素
+    - 有变化：与上一帧做 XOR 差分后 zlib 压缩（未变化区域全 0，压缩后几乎不占空间）
+    - 每 keyframe_every 帧写一次完整关键帧，方便从中间开始回放
+    - 压缩和写盘都在后台线程，热循环只做一次小拷贝 + 入队；队列满时丢帧并计数
+    """
+
+    def __init__(
+        self,
+        path: str,
+        rois=None,
+        keyframe_every: int = 100,
+        level: int = 1,
+        max_queue: int = 256,
+        time_fn=time.time,
+    ):
+        self.path = path
+        self.rois = [tuple(int(v) for v in roi) for roi in (rois or [])]
+        self.keyframe_every = max(1, int(keyframe_every))
+        self.level = int(level)
+        self.time_fn = time_fn
+        self.stats = {"frames": 0, "same": 0, "delta": 0, "key": 0, "inputs": 0, "dropped": 0, "bytes": 0}
+
+        out_dir = os.path.dirname(path)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        self._fh = open(path, "wb")
+        self._fh.write(MAGIC)
+        self._prev: dict[tuple, np.ndarray] = {}
+        self._since_key: dict[tuple, int] = {}
+        self._queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="session-recorder", daemon=True)
+        self._thread.start()
+        self._put(KIND_META, {"t": self.time_fn(), "version": 1, "rois": self.rois}, None)
+
+    # ---- 热循环侧 ----
+
+    def _put(self, kind: bytes, meta: dict, arr: np.ndarray | None):
+        try:
+            self._queue.put_nowait((kind, meta, arr))
+        except queue.Full:
+            self.stats["dropped"] += 1
+
+    def record_roi(self, hwnd: int, roi, img: np.ndarray, ts: float | None = None):
+        """img 为该 ROI 的像素（会被拷贝，调用方缓冲区可立即复用）。"""
+        if img is None or img.size == 0:
+            return
+        meta = {"t": self.time_fn() if ts is None else ts, "hwnd": int(hwnd), "roi": [int(v) for v in roi]}
+        self._put(KIND_FRAME, meta, np.ascontiguousarray(img).copy())
+
+    def record_frame(self, hwnd: int, img: np.ndarray, ts: float | None = None):
+        """整帧：只存配置的 rois 区域（没有配置时不存，整帧太大；rois() 读到的 ROI 另行记录）。"""
+        for x1, y1, x2, y2 in self.rois:
+            self.record_roi(hwnd, (x1, y1, x2, y2), img[y1:y2, x1:x2], ts)
+
+    def record_input(self, target: str, action: str, args, kwargs):
+        meta = {
+            "t": self.time_fn(),
+            "target": target,
+            "action": action,
+            "args": [_jsonable(a) for a in args],
+            "kwargs": {k: _jsonable(v) for k, v in kwargs.items()},
+        }
+        self._put(KIND_INPUT, meta, None)
+
+    # ---- 后台写盘 ----
+
+    def _encode_frame(self, meta: dict, arr: np.ndarray) -> bytes:
+        key = (meta["hwnd"], tuple(meta["roi"]), arr.shape)
+        prev = self._prev.get(key)
+        since_key = self._since_key.get(key, self.keyframe_every)
+        meta["shape"] = list(arr.shape)
+
+        if prev is not None and since_key < self.keyframe_every and np.array_equal(prev, arr):
+            meta["enc"] = "same"
+            payload = b""
+            self.stats["same"] += 1
+            self._since_key[key] = since_key + 1
+        elif prev is not None and since_key < self.keyframe_every:
+            meta["enc"] = "delta"
+            payload = zlib.compress(np.bitwise_xor(prev, arr).tobytes(), self.level)
+            self.stats["delta"] += 1
+            self._since_key[key] = since_key + 1
+        else:
+            meta["enc"] = "key"
+            payload = zlib.compress(arr.tobytes(), self.level)
+            self.stats["key"] += 1
+            self._since_key[key] = 1
+        self._prev[key] = arr
+        self.stats["frames"] += 1
+        return payload
+
+    def _write(self, kind: bytes, meta: dict, payload: bytes):
+        meta_raw = json.dumps(meta, separators=(",", ":")).encode("utf-8")
+        self._fh.write(_RECORD.pack(kind, len(meta_raw), len(payload)))
+        self._fh.write(meta_raw)
+        if payload:
+            self._fh.write(payload)
+        self.stats["bytes"] += _RECORD.size + len(meta_raw) + len(payload)
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            kind, meta, arr = item
+            payload = b""
+            if kind == KIND_FRAME:
+                payload = self._encode_frame(meta, arr)
+            elif kind == KIND_INPUT:
+                self.stats["inputs"] += 1
+            self._write(kind, meta, payload)
+        self._fh.flush()
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._fh.close()
+
+    def summary(self) -> str:
+        s = self.stats
+        return (
+            f"frames={s['frames']} (key={s['key']} delta={s['delta']} same={s['same']}) "
+            f"inputs={s['inputs']} dropped={s['dropped']} size={s['bytes'] / 1024:.1f}KiB"
+        )
+
+
+def _jsonable(value):
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    return repr(value)
+
+
+def read_session(path: str):
+    """
+    逐条读取录制文件，yield (kind, meta, img)。
+    kind 为 "META"/"FRAM"/"INPT"；帧记录的 img 是还原后的完整 ROI 像素，其余为 None。
+    """
+    prev: dict[tuple, np.ndarray] = {}
+    with open(path, "rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise RuntimeError(f"不是会话录制文件: {path}")
+        while True:
+            head = fh.read(_RECORD.size)
+            if len(head) < _RECORD.size:
+                break
+            kind, meta_len, payload_len = _RECORD.unpack(head)
+            meta = json.loads(fh.read(meta_len).decode("utf-8"))
+            payload = fh.read(payload_len) if payload_len else b""
+
+            img = None
+            if kind == KIND_FRAME:
+                shape = tuple(meta["shape"])
+                key = (meta["hwnd"], tuple(meta["roi"]), shape)
+                enc = meta["enc"]
+                if enc == "key":
+                    img = np.frombuffer(zlib.decompress(payload), dtype=np.uint8).reshape(shape)
+                elif enc == "delta":
+                    if key not in prev:
+                        continue  # 从中间截断的文件：等下一个关键帧
+                    delta = np.frombuffer(zlib.decompress(payload), dtype=np.uint8).reshape(shape)
+                    img = np.bitwise_xor(prev[key], delta)
+                else:
+                    if key not in prev:
+                        continue
+                    img = prev[key]
+                prev[key] = img
+            yield kind.decode("ascii"), meta, img
+
+
+class RecordingProxy:
+    """包一层 InputController / HumanClicker：每次调用先记一条输入记录再转发。"""
+
+    def __init__(self, inner, recorder: SessionRecorder, target: str):
+        self._inner = inner
+        self._recorder = recorder
+        self._target = target
+
+    def __getattr__(self, name):
+        attr = getattr(self._inner, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            self._recorder.record_input(self._target, name, args, kwargs)
+            return attr(*args, **kwargs)
+
+        return call
+
+
+_ACTIVE: SessionRecorder | None = None
+
+
+def start_recording(path: str, rois=None, **kwargs) -> SessionRecorder:
+    global _ACTIVE
+    if _ACTIVE is not None:
+        _ACTIVE.close()
+    _ACTIVE = SessionRecorder(path, rois=rois, **kwargs)
+    return _ACTIVE
+
+
+def active_recorder() -> SessionRecorder | None:
+    return _ACTIVE
+
+
+def stop_recording():
+    global _ACTIVE
+    if _ACTIVE is not None:
+        _ACTIVE.close()
+        print(f"[REC] session saved: {_ACTIVE.path} | {_ACTIVE.summary()}")
+        _ACTIVE = None
+
+
+def maybe_record(obj, target: str):
+    """录制开启时返回记录代理，否则原样返回。"""
+    if _ACTIVE is None:
+        return obj
+    return RecordingProxy(obj, _ACTIVE, target)
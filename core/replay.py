@@ -0,0 +1,261 @@
+# core/replay.py
+import importlib
+import sys
+import time as _real_time
+import types
+from contextlib import contextmanager
+
+import numpy as np
+
+from core.capture_session import CaptureSession, clip_rect
+from core.frames import FrameProvider, get_provider, set_provider
+from core.recorder import read_session
+from core.timing import VirtualClock
+
+
+class SessionReplayBackend:
+    """
+    按虚拟时间回放录制文件的截图后端：
+    每次 read 时把时间戳 <= 当前虚拟时间的帧记录贴到画布上，再输出画布。
+    录制只保存 ROI 时，画布其余区域为黑色（检测器本来也只看 ROI）。
+    """
+
+    def __init__(self, path: str, time_fn, size: tuple[int, int] | None = None, hwnd: int | None = None):
+        self.time_fn = time_fn
+        self.records: list[tuple[float, tuple[int, int, int, int], np.ndarray]] = []
+        t0 = None
+        for kind, meta, img in read_session(path):
+            if kind != "FRAM":
+                continue
+            if hwnd is None:
+                hwnd = meta["hwnd"]
+            if meta["hwnd"] != hwnd:
+                continue
+            t0 = meta["t"] if t0 is None else t0
+            self.records.append((meta["t"] - t0, tuple(meta["roi"]), img))
+        if not self.records:
+            raise RuntimeError(f"录制文件里没有帧记录: {path}")
+
+        if size is None:
+            size = (max(r[1][2] for r in self.records), max(r[1][3] for r in self.records))
+        w, h = size
+        self.canvas = np.zeros((h, w, 4), dtype=np.uint8)
+        self.duration = self.records[-1][0]
+        self.cursor = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.time_fn() > self.duration
+
+    def _catch_up(self):
+        now = self.time_fn()
+        h, w = self.canvas.shape[:2]
+        while self.cursor < len(self.records) and self.records[self.cursor][0] <= now:
+            _t, roi, img = self.records[self.cursor]
+            x1, y1, x2, y2 = clip_rect(roi, w, h)
+            self.canvas[y1:y2, x1:x2] = img[: y2 - y1, : x2 - x1]
+            self.cursor += 1
+
+    def client_size(self, hwnd: int) -> tuple[int, int]:
+        h, w = self.canvas.shape[:2]
+        return w, h
+
+    def open(self, hwnd: int, w: int, h: int):
+        pass
+
+    def read(self, hwnd: int, out: np.ndarray):
+        self._catch_up()
+        np.copyto(out, self.canvas)
+
+    def read_rects(self, hwnd: int, rects, outs):
+        self._catch_up()
+        for (x1, y1, x2, y2), out in zip(rects, outs):
+            np.copyto(out, self.canvas[y1:y2, x1:x2])
+
+    def close(self):
+        pass
+
+
+class ActionLog:
+    """回放中所有输入动作：(虚拟秒, target, action, args)。"""
+
+    def __init__(self, clock: VirtualClock):
+        self.clock = clock
+        self.actions: list[tuple[float, str, str, tuple]] = []
+
+    def add(self, target: str, action: str, *args):
+        self.actions.append((self.clock.elapsed(), target, action, args))
+
+    def counts(self) -> dict[str, int]:
+        out: dict[str, int] = {}
+        for _t, target, action, _args in self.actions:
+            key = f"{target}.{action}"
+            out[key] = out.get(key, 0) + 1
+        return out
+
+
+class FakeInput:
+    """替代 InputController：只记录动作，按键时长计入虚拟时间。"""
+
+    def __init__(self, log: ActionLog):
+        self.log = log
+
+    def press(self, hwnd: int, key, hold: float = 0.05):
+        self.log.add("input", "press", key)
+        self.log.clock.advance(hold)
+
+    def press_combo(self, hwnd: int, key, modifiers: list = None, hold: float = 0.05):
+        self.log.add("input", "press_combo", key, tuple(modifiers or []))
+        self.log.clock.advance(hold)
+
+    def key_down(self, hwnd: int, key):
+        self.log.add("input", "key_down", key)
+
+    def key_up(self, hwnd: int, key):
+        self.log.add("input", "key_up", key)
+
+    def type_text(self, hwnd: int, text: str, gap: float = 0.01):
+        self.log.add("input", "type_text", text)
+        self.log.clock.advance(gap * len(text))
+
+    def key_press(self, hwnd: int, vk_name: str, hold: float = 0.02):
+        self.press(hwnd, vk_name, hold=hold)
+
+
+class FakeClicker:
+    """替代 HumanClicker：记录点击坐标，移动/悬停/按住的平均耗时计入虚拟时间。"""
+
+    def __init__(self, log: ActionLog, move_time=(0.15, 0.28), hover=(0.04, 0.10), hold_mean=0.10, gap=(0.08, 0.18), **_kwargs):
+        self.log = log
+        self.move_time = move_time
+        self.hover = hover
+        self.hold_mean = hold_mean
+        self.gap = gap
+
+    def click(self, hwnd: int, cx: int, cy: int, times: int = 1, long_hold: float | None = None):
+        self.log.add("clicker", "click", int(cx), int(cy), times)
+        hold = self.hold_mean if long_hold is None else long_hold
+        cost = sum(self.move_time) / 2 + sum(self.hover) / 2 + hold * times + sum(self.gap) / 2 * (times - 1)
+        self.log.clock.advance(cost)
+
+
+class FakeForegroundBlock:
+    def __init__(self, hwnd_target: int, max_wait: float = 0.8, raise_on_fail: bool = False):
+        self.hwnd_target = hwnd_target
+        self.activated = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class FakeBinder:
+    def __init__(self, hwnd: int):
+        self.hwnd = hwnd
+
+    def ensure(self, retry_interval=1.0) -> int:
+        return self.hwnd
+
+
+class ReplayControl:
+    """RunControl 的回放版：一直处于运行状态，虚拟时长用完或帧源耗尽时 stop。"""
+
+    def __init__(self, clock: VirtualClock, max_seconds: float = 0.0, backend=None):
+        self.clock = clock
+        self.max_seconds = float(max_seconds)
+        self.backend = backend
+        self.running = True
+        self._stop = False
+
+    @property
+    def stop(self) -> bool:
+        if self._stop:
+            return True
+        if self.max_seconds > 0 and self.clock.elapsed() >= self.max_seconds:
+            self._stop = True
+        elif getattr(self.backend, "finished", False):
+            self._stop = True
+        return self._stop
+
+    def request_stop(self):
+        self._stop = True
+
+
+def virtual_time_module(clock: VirtualClock) -> types.ModuleType:
+    """给 feature 模块替换 `time`：time()/sleep()/strftime()/localtime() 全部走虚拟时间。"""
+    mod = types.ModuleType("time")
+    mod.time = clock.time
+    mod.monotonic = clock.monotonic
+    mod.perf_counter = clock.monotonic
+    mod.sleep = clock.advance
+    mod.localtime = lambda secs=None: _real_time.localtime(clock.now if secs is None else secs)
+    mod.strftime = lambda fmt, t=None: _real_time.strftime(fmt, _real_time.localtime(clock.now) if t is None else t)
+    mod.struct_time = _real_time.struct_time
+    return mod
+
+
+def _fake_keyboard() -> types.ModuleType:
+    mod = types.ModuleType("keyboard")
+    mod.is_pressed = lambda key: False
+    mod.add_hotkey = lambda *args, **kwargs: None
+    return mod
+
+
+def _fake_clicker_module() -> types.ModuleType:
+    mod = types.ModuleType("core.clicker_human")
+    mod.ForegroundBlock = FakeForegroundBlock
+    mod.HumanClicker = FakeClicker
+    return mod
+
+
+def import_feature(name: str):
+    """
+    导入 feature 模块；非 Windows 环境下 win32/keyboard 依赖不可用时，
+    先放入假的 core.clicker_human / keyboard 模块再导入。
+    """
+    try:
+        return importlib.import_module(name)
+    except ImportError:
+        sys.modules.setdefault("keyboard", _fake_keyboard())
+        sys.modules["core.clicker_human"] = _fake_clicker_module()
+        return importlib.import_module(name)
+
+
+@contextmanager
+def replay_feature(module, clock: VirtualClock, log: ActionLog, backend, max_age: float = 0.05):
+    """
+    在回放期间替换 feature 模块里的时间/键盘/点击器/前台切换，并把全局 FrameProvider
+    换成读 backend、用虚拟时间判断缓存新鲜度的实例；退出时全部还原。
+    backend 也可以是 hwnd -> backend 的函数（多窗口回放时每个 hwnd 一个帧源）。
+    """
+    backend_for = backend if callable(backend) else (lambda hwnd: backend)
+    patches = {
+        "time": virtual_time_module(clock),
+        "keyboard": _fake_keyboard(),
+        "ForegroundBlock": FakeForegroundBlock,
+        "HumanClicker": lambda *args, **kwargs: FakeClicker(log, *args, **kwargs),
+    }
+    saved = {name: getattr(module, name) for name in patches if hasattr(module, name)}
+    for name, value in patches.items():
+        setattr(module, name, value)
+
+    prev_provider = get_provider()
+    provider = set_provider(
+        FrameProvider(
+            max_age=max_age,
+            session_factory=lambda hwnd: CaptureSession(hwnd, backend_for(hwnd)),
+            time_fn=clock.monotonic,
+        )
+    )
+    try:
+        yield provider
+    finally:
+        provider.close()
+        set_provider(prev_provider)
+        for name in patches:
+            if name in saved:
+                setattr(module, name, saved[name])
+            else:
+                delattr(module, name)
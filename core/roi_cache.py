@@ -0,0 +1,118 @@
+# core/roi_cache.py
+import hashlib
+
+import cv2
+import numpy as np
+
+from core.vision import Match, _roi_view, find_template, to_gray
+
+
+class DirtyRoiCache:
+    """
+    按 ROI 缓存检测结果：ROI 像素和上一次检测时相比没有变化，就直接返回上次的结果。
+
+    tolerance=0（默认）时比较完整 ROI 的哈希，任何一个像素变化都会重新计算；
+    tolerance>0 时比较 INTER_AREA 缩小 step 倍的灰度图，平均绝对差 <= tolerance 视为未变化
+    （面积平均，细笔画不会因为隔点采样被整行跳过）。
+    """
+
+    def __init__(self, step: int = 2, tolerance: float = 0.0, enabled: bool = True, max_entries: int = 256):
+        self.step = max(1, int(step))
+        self.tolerance = float(tolerance)
+        self.enabled = bool(enabled)
+        self.max_entries = int(max_entries)
+        self._entries: dict[tuple, tuple[object, object]] = {}
+        self.stats = {"checks": 0, "skipped": 0, "computed": 0}
+
+    def signature(self, view: np.ndarray):
+        if self.tolerance <= 0:
+            data = np.ascontiguousarray(view)
+            return data.shape, data.dtype.str, hashlib.blake2b(data.data, digest_size=16).digest()
+        gray = to_gray(np.ascontiguousarray(view))
+        if self.step > 1:
+            h, w = gray.shape[:2]
+            size = (max(1, w // self.step), max(1, h // self.step))
+            gray = cv2.resize(gray, size, interpolation=cv2.INTER_AREA)
+        return np.ascontiguousarray(gray)
+
+    def _unchanged(self, prev, sig) -> bool:
+        if isinstance(sig, tuple) or isinstance(prev, tuple):
+            return prev == sig
+        if prev.shape != sig.shape:
+            return False
+        return cv2.norm(prev, sig, cv2.NORM_L1) <= self.tolerance * sig.size
+
+    def get_or_compute(self, key, view: np.ndarray, compute):
+        """view 未变化时返回缓存值，否则调用 compute() 并缓存。"""
+        if not self.enabled or view.size == 0:
+            return compute()
+
+        self.stats["checks"] += 1
+        sig = self.signature(view)
+        entry = self._entries.get(key)
+        if entry is not None and self._unchanged(entry[0], sig):
+            self.stats["skipped"] += 1
+            return entry[1]
+
+        value = compute()
+        self.stats["computed"] += 1
+        if entry is None and len(self._entries) >= self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (sig, value)
+        return value
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def skip_rate(self) -> float:
+        checks = self.stats["checks"]
+        return self.stats["skipped"] / checks if checks else 0.0
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"roi-cache checks={s['checks']} skipped={s['skipped']} computed={s['computed']} skip_rate={self.skip_rate():.1%}"
+
+
+_CACHE = DirtyRoiCache()
+
+
+def get_roi_cache() -> DirtyRoiCache:
+    return _CACHE
+
+
+def configure_roi_cache(step: int = 2, tolerance: float = 0.0, enabled: bool = True) -> DirtyRoiCache:
+    _CACHE.step = max(1, int(step))
+    _CACHE.tolerance = float(tolerance)
+    _CACHE.enabled = bool(enabled)
+    _CACHE.invalidate()
+    return _CACHE
+
+
+def find_template_cached(
+    img_bgr: np.ndarray,
+    tpl_bgr: np.ndarray,
+    threshold=0.2,
+    roi=None,
+    offset=(0, 0),
+    key=None,
+    scope=None,
+) -> Match:
+    """
+    find_template 的脏区版本：ROI 内像素与上次相同则直接返回上次的 Match。
+    key 默认由 scope（通常传 hwnd，多开时各窗口互不覆盖）/roi/offset/模板/阈值组成。
+    """
+    view, offx, offy = _roi_view(img_bgr, roi, offset)
+    if key is None:
+        key = ("find_template", scope, roi, offx, offy, id(tpl_bgr), tpl_bgr.shape, float(threshold))
+    return _CACHE.get_or_compute(
+        key,
+        view,
+        lambda: find_template(view, tpl_bgr, threshold=threshold, offset=(offx, offy)),
+    )
+
+
+def roi_cache_stats() -> str:
+    return _CACHE.summary()
@@ -0,0 +1,135 @@
+# core/scenes.py
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+from core.vision import _roi_view, template_gray, to_gray
+
+
+@dataclass
+class SceneResult:
+    scene: str | None  # 得分最高且 >= threshold、领先 >= min_margin 的场景；否则 None
+    score: float
+    margin: float  # 第一名与第二名的分差
+    scores: dict[str, float] = field(default_factory=dict)
+    exact: bool = False  # 命中了像素完全一致的哈希快速路径
+
+
+def _digest(gray: np.ndarray) -> tuple:
+    return gray.shape, hashlib.blake2b(np.ascontiguousarray(gray).data, digest_size=16).digest()
+
+
+class SceneClassifier:
+    """
+    一次识别当前地图：scene_roi 只转一次灰度，对所有场景模板打分，返回 (场景, 分数, 领先分差)。
+    ROI 与模板同尺寸时（小地图地名条的常见情况），TM_CCOEFF_NORMED 就是两图的相关系数，
+    所有模板堆成矩阵一次点积算完；尺寸不同的模板再逐个 matchTemplate。
+    ROI 灰度与某个模板逐像素相同、或与之前高置信度识别过的画面相同时，直接查哈希返回。
+    """
+
+    def __init__(
+        self,
+        templates: dict,
+        threshold: float = 0.85,
+        min_margin: float = 0.0,
+        learn_score: float = 0.97,
+        max_learned: int = 64,
+    ):
+        self.names = list(templates)
+        self.threshold = float(threshold)
+        self.min_margin = float(min_margin)
+        self.learn_score = float(learn_score)
+        self.max_learned = max(1, int(max_learned))
+        self._grays = [np.ascontiguousarray(template_gray(templates[name])) for name in self.names]
+
+        # 同尺寸模板按形状分组，预先减均值、算范数
+        self._groups: dict[tuple, tuple[list[int], np.ndarray, np.ndarray]] = {}
+        by_shape: dict[tuple, list[int]] = {}
+        for idx, gray in enumerate(self._grays):
+            by_shape.setdefault(gray.shape, []).append(idx)
+        for shape, indices in by_shape.items():
+            flat = np.stack([self._grays[i].reshape(-1) for i in indices]).astype(np.float32)
+            flat -= flat.mean(axis=1, keepdims=True)
+            self._groups[shape] = (indices, flat, np.sqrt((flat * flat).sum(axis=1)))
+
+        self._lock = threading.Lock()
+        self.stats = {"exact": 0, "scored": 0}
+        # 模板自身：用同样的打分路径算一次，得到各模板之间的真实分差
+        self._exact: dict[tuple, SceneResult] = {}
+        for gray in self._grays:
+            result = self._score(gray)
+            result.exact = True
+            self._exact.setdefault(_digest(gray), result)
+        # 运行中高置信度识别过的画面（LRU）
+        self._learned: OrderedDict[tuple, SceneResult] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _score(self, gray: np.ndarray) -> SceneResult:
+        scores = np.full(len(self.names), -1.0, dtype=np.float32)
+        gh, gw = gray.shape[:2]
+        for shape, (indices, flat, norms) in self._groups.items():
+            if shape == gray.shape:
+                probe = gray.reshape(-1).astype(np.float32)
+                probe -= probe.mean()
+                denom = norms * float(np.sqrt(probe @ probe))
+                corr = np.divide(flat @ probe, denom, out=np.zeros(len(indices), dtype=np.float32), where=denom > 0)
+                scores[indices] = corr
+            elif shape[0] <= gh and shape[1] <= gw:
+                for i in indices:
+                    res = cv2.matchTemplate(gray, self._grays[i], cv2.TM_CCOEFF_NORMED)
+                    scores[i] = float(res.max())
+
+        order = np.argsort(-scores)
+        best = float(scores[order[0]]) if len(order) else 0.0
+        second = float(scores[order[1]]) if len(order) > 1 else 0.0
+        margin = best - max(second, 0.0)
+        scene = None
+        if len(order) and best >= self.threshold and margin >= self.min_margin:
+            scene = self.names[int(order[0])]
+        return SceneResult(
+            scene,
+            max(best, 0.0),
+            max(margin, 0.0),
+            {name: float(max(s, 0.0)) for name, s in zip(self.names, scores)},
+        )
+
+    def classify_gray(self, gray: np.ndarray) -> SceneResult:
+        if gray.size == 0 or not self.names:
+            return SceneResult(None, 0.0, 0.0)
+        key = _digest(gray)
+        with self._lock:
+            cached = self._exact.get(key)
+            if cached is None:
+                cached = self._learned.get(key)
+                if cached is not None:
+                    self._learned.move_to_end(key)
+            if cached is not None:
+                self.stats["exact"] += 1
+                return cached
+
+        result = self._score(gray)
+        self.stats["scored"] += 1
+        if result.scene is not None and result.score >= self.learn_score:
+            with self._lock:
+                self._learned[key] = SceneResult(result.scene, result.score, result.margin, result.scores, exact=True)
+                if len(self._learned) > self.max_learned:
+                    self._learned.popitem(last=False)
+        return result
+
+    def classify(self, img: np.ndarray, roi=None, offset=(0, 0)) -> SceneResult:
+        view, _offx, _offy = _roi_view(img, roi, offset)
+        if view.size == 0:
+            return SceneResult(None, 0.0, 0.0)
+        return self.classify_gray(np.ascontiguousarray(to_gray(view)))
+
+    def summary(self) -> str:
+        s = self.stats
+        total = s["exact"] + s["scored"]
+        rate = s["exact"] / total if total else 0.0
+        return f"scenes templates={len(self.names)} exact={s['exact']} scored={s['scored']} exact_rate={rate:.1%}"
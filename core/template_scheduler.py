@@ -0,0 +1,161 @@
+# core/template_scheduler.py
+import json
+import os
+import threading
+from dataclasses import asdict, dataclass
+
+
+@dataclass
+class TemplateStat:
+    tries: int = 0
+    hits: int = 0
+    score_ema: float = 0.0
+
+    def payoff(self) -> float:
+        """命中率的拉普拉斯估计：新模板从 0.5 起步，先被试几次。"""
+        return (self.hits + 1) / (self.tries + 2)
+
+
+class TemplateScheduler:
+    """
+    按检测器记录每个模板的尝试次数、命中次数和分数 EMA，匹配前给出本轮的模板顺序：
+    期望命中率高的排前面（配合调用方的“命中即停”），未淘汰的模板每轮都会匹配；
+    max_active > 0 时每轮最多 max_active 个（默认 0 不限，限额会让排名靠后的模板很久才轮到一次）。
+    另加一个轮转的探索位，其余模板（包括被淘汰的）轮流补上，不会永久漏掉。
+    统计按“轮”提交：只有本轮有模板命中（画面里确实有目标）时，才给本轮试过的模板计尝试次数，
+    画面里没有目标的空轮不算未命中；排在命中者之后、本轮没试的模板也不计。
+    目标在场时试了 retire_after 次却从未命中的模板视为淘汰，只在探索位出现，一旦命中就恢复。
+    统计可以保存成 JSON。
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        max_active: int = 0,
+        retire_after: int = 200,
+        ema: float = 0.2,
+        enabled: bool = True,
+    ):
+        self.path = path
+        self.max_active = max(0, int(max_active))
+        self.retire_after = max(1, int(retire_after))
+        self.ema = min(1.0, max(0.0, float(ema)))
+        self.enabled = bool(enabled)
+        self._stats: dict[str, dict[str, TemplateStat]] = {}
+        self._cursor: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats = {"plans": 0, "planned": 0, "skipped": 0}
+
+    def _stat(self, detector: str, key: str) -> TemplateStat:
+        return self._stats.setdefault(detector, {}).setdefault(key, TemplateStat())
+
+    def retired(self, stat: TemplateStat) -> bool:
+        return stat.hits == 0 and stat.tries >= self.retire_after
+
+    def plan(self, detector: str, keys: list[str]) -> list[str]:
+        """返回本轮要匹配的模板 key（按期望收益排序）；关闭时原样返回。"""
+        keys = list(keys)
+        if not self.enabled or len(keys) <= 1:
+            return keys
+        with self._lock:
+            stats = [self._stat(detector, key) for key in keys]
+            ranked = sorted(
+                range(len(keys)),
+                key=lambda i: (self.retired(stats[i]), -stats[i].payoff(), -stats[i].score_ema, i),
+            )
+            active = [i for i in ranked if not self.retired(stats[i])]
+            if self.max_active:
+                active = active[: self.max_active]
+            chosen = set(active)
+            rest = [i for i in ranked if i not in chosen]
+            if rest:
+                cursor = self._cursor.get(detector, 0)
+                active.append(rest[cursor % len(rest)])
+                self._cursor[detector] = cursor + 1
+            self.stats["plans"] += 1
+            self.stats["planned"] += len(active)
+            self.stats["skipped"] += len(keys) - len(active)
+        return [keys[i] for i in active]
+
+    def record_poll(self, detector: str, results):
+        """results 为本轮实际匹配过的 [(key, score, hit)]；没有任何命中的轮次整轮忽略。"""
+        results = list(results)
+        if not any(hit for _key, _score, hit in results):
+            return
+        with self._lock:
+            for key, score, hit in results:
+                stat = self._stat(detector, key)
+                stat.tries += 1
+                stat.hits += int(bool(hit))
+                score = max(0.0, float(score))
+                stat.score_ema = score if stat.tries == 1 else stat.score_ema + self.ema * (score - stat.score_ema)
+            self._dirty = True
+
+    def load(self, path: str | None = None):
+        path = path or self.path
+        if not path or not os.path.exists(path):
+            return
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as exc:
+            print(f"[SCHED] ignore unreadable {path}: {exc}")
+            return
+        with self._lock:
+            for detector, entries in (data.get("detectors") or {}).items():
+                bucket = self._stats.setdefault(str(detector), {})
+                for key, entry in entries.items():
+                    bucket[str(key)] = TemplateStat(
+                        int(entry.get("tries", 0)), int(entry.get("hits", 0)), float(entry.get("score_ema", 0.0))
+                    )
+            self._dirty = False
+
+    def save(self, path: str | None = None):
+        path = path or self.path
+        if not path or not self._dirty:
+            return
+        with self._lock:
+            data = {
+                "version": 1,
+                "detectors": {d: {k: asdict(s) for k, s in v.items()} for d, v in self._stats.items()},
+            }
+            self._dirty = False
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def summary(self) -> str:
+        s = self.stats
+        retired = sum(self.retired(stat) for bucket in self._stats.values() for stat in bucket.values())
+        avg = s["planned"] / s["plans"] if s["plans"] else 0.0
+        return f"template-sched plans={s['plans']} avg_planned={avg:.1f} skipped={s['skipped']} retired={retired}"
+
+
+_SCHEDULER = TemplateScheduler()
+
+
+def get_template_scheduler() -> TemplateScheduler:
+    return _SCHEDULER
+
+
+def configure_template_scheduler(
+    path: str | None = None,
+    max_active: int = 0,
+    retire_after: int = 200,
+    enabled: bool = True,
+) -> TemplateScheduler:
+    global _SCHEDULER
+    _SCHEDULER = TemplateScheduler(path=path, max_active=max_active, retire_after=retire_after, enabled=enabled)
+    _SCHEDULER.load()
+    return _SCHEDULER
+
+
+def save_template_scheduler():
+    _SCHEDULER.save()
+
+
+def template_scheduler_stats() -> str:
+    return _SCHEDULER.summary()
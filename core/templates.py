@@ -0,0 +1,121 @@
+# core/templates.py
+import os
+import threading
+from dataclasses import dataclass, field
+
+import cv2
+import numpy as np
+
+from core.vision import mask_hsv_range, to_gray
+
+# 进程级模板缓存：多个客户端/feature 加载同一张 PNG 时只解码一次，共享同一个数组
+_CACHE: dict[tuple[str, int], tuple[float, np.ndarray]] = {}
+_LOCK = threading.Lock()
+STATS = {"loads": 0, "hits": 0}
+
+
+def load_template(path: str, flags: int = cv2.IMREAD_COLOR) -> np.ndarray | None:
+    """
+    与 cv2.imread 相同的语义（读失败返回 None），但按 (路径, flags) 缓存；
+    文件 mtime 变化时重新加载。返回的数组是只读共享的，需要修改请先 copy()。
+    """
+    key = (os.path.normcase(os.path.abspath(str(path))), int(flags))
+    try:
+        mtime = os.path.getmtime(key[0])
+    except OSError:
+        return None
+
+    with _LOCK:
+        entry = _CACHE.get(key)
+        if entry is not None and entry[0] == mtime:
+            STATS["hits"] += 1
+            return entry[1]
+
+    img = cv2.imread(str(path), flags)
+    if img is None:
+        return None
+    img.setflags(write=False)
+    with _LOCK:
+        _CACHE[key] = (mtime, img)
+        STATS["loads"] += 1
+    return img
+
+
+def template_stats() -> str:
+    total = sum(img.nbytes for _mtime, img in _CACHE.values())
+    return f"templates loaded={STATS['loads']} shared_hits={STATS['hits']} size={total / 1024:.0f}KiB"
+
+
+def clear_templates():
+    with _LOCK:
+        _CACHE.clear()
+
+
+@dataclass(eq=False)
+class CompiledTemplate:
+    """
+    预编译模板：灰度图加载时算好，HSV 掩码及其非零像素数按 HSV 范围惰性计算并缓存。
+    vision 的匹配函数直接接受它（也仍然接受普通 ndarray）。
+    """
+
+    path: str
+    bgr: np.ndarray
+    gray: np.ndarray
+    _masks: dict = field(default_factory=dict, repr=False)
+
+    @property
+    def shape(self) -> tuple:
+        return self.bgr.shape
+
+    def mask(self, lower_hsv, upper_hsv) -> tuple[np.ndarray, int]:
+        key = (tuple(int(v) for v in lower_hsv), tuple(int(v) for v in upper_hsv))
+        entry = self._masks.get(key)
+        if entry is None:
+            mask = mask_hsv_range(self.bgr, key[0], key[1])
+            mask.setflags(write=False)
+            entry = (mask, int(cv2.countNonZero(mask)))
+            self._masks[key] = entry
+        return entry
+
+
+def compile_image(img: np.ndarray, name: str = "") -> CompiledTemplate:
+    gray = to_gray(img)
+    if gray is img:
+        gray = img.copy()
+    gray.setflags(write=False)
+    return CompiledTemplate(name, img, gray)
+
+
+class TemplateStore:
+    """按路径缓存 CompiledTemplate；底层 BGR 走 load_template，文件更新后自动重新编译。"""
+
+    def __init__(self):
+        self._compiled: dict[str, CompiledTemplate] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> CompiledTemplate | None:
+        img = load_template(path)
+        if img is None:
+            return None
+        key = os.path.normcase(os.path.abspath(str(path)))
+        with self._lock:
+            compiled = self._compiled.get(key)
+            if compiled is None or compiled.bgr is not img:
+                compiled = compile_image(img, str(path))
+                self._compiled[key] = compiled
+            return compiled
+
+    def __len__(self) -> int:
+        return len(self._compiled)
+
+
+_STORE = TemplateStore()
+
+
+def get_template_store() -> TemplateStore:
+    return _STORE
+
+
+def compile_template(path: str) -> CompiledTemplate | None:
+    """读失败返回 None（与 load_template 一致）。"""
+    return _STORE.get(path)
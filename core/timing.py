@@ -13,4 +13,38 @@ class HumanClock:
         if base <= 0:
             return
         factor = 1.0 + random.uniform(-self.jitter, self.jitter)
-        time.sleep(max(0, base * factor))
\ No newline at end of file
+        time.sleep(max(0, base * factor))
+
+
+class VirtualClock(HumanClock):
+    """
+    虚拟时钟：sleep 不真正等待，只把虚拟时间往前推（离线回放用）。
+    jitter 用独立的 seeded Random，同一 seed 回放结果可复现。
+    """
+
+    def __init__(self, jitter: float = 0.10, start: float | None = None, seed: int = 0):
+        super().__init__(jitter=jitter)
+        self.start = time.time() if start is None else float(start)
+        self.now = self.start
+        self.rng = random.Random(seed)
+        self.slept = 0.0
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            self.now += seconds
+            self.slept += seconds
+
+    def sleep(self, base: float):
+        if base <= 0:
+            return
+        factor = 1.0 + self.rng.uniform(-self.jitter, self.jitter)
+        self.advance(max(0, base * factor))
+
+    def time(self) -> float:
+        return self.now
+
+    def monotonic(self) -> float:
+        return self.now - self.start
+
+    def elapsed(self) -> float:
+        return self.now - self.start
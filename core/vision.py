@@ -2,6 +2,8 @@ from dataclasses import dataclass
 import cv2
 import numpy as np
 
+from core.color_mask import color_masks_enabled, hsv_range_mask
+
 @dataclass
 class Match:
     ok: bool
@@ -10,44 +12,154 @@ class Match:
     score: float = 0.0
 
 
+def to_gray(img: np.ndarray) -> np.ndarray:
+    """BGR / BGRA / 灰度 -> 灰度；BGRA 直接走 BGRA2GRAY，不先生成 BGR。"""
+    if img.ndim == 2:
+        return img
+    code = cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(img, code)
+
+
+def to_hsv(img: np.ndarray) -> np.ndarray:
+    # OpenCV 没有 BGRA2HSV，但 BGR2HSV 原生接受 4 通道输入（忽略 alpha），无需中间 BGR
+    return cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+
+
+def to_bgr(img: np.ndarray) -> np.ndarray:
+    """保存调试图用：GDI 的 alpha 通常为 0，直接写 BGRA 的 PNG 会是全透明。"""
+    if img.ndim == 3 and img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img
+
+
 def mask_hsv_range(img_bgr: np.ndarray, lower_hsv, upper_hsv) -> np.ndarray:
-    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
+    # 打开 color_lut_enabled 时走预编译的 BGR 查找表（core.color_mask），默认 cvtColor + inRange
+    if color_masks_enabled():
+        return hsv_range_mask(img_bgr, lower_hsv, upper_hsv)
+    hsv = to_hsv(img_bgr)
     lower = np.array(lower_hsv, dtype=np.uint8)
     upper = np.array(upper_hsv, dtype=np.uint8)
     return cv2.inRange(hsv, lower, upper)
 
-def find_template(img_bgr: np.ndarray, tpl_bgr: np.ndarray, threshold=0.2, roi=None) -> Match:
+def template_gray(tpl) -> np.ndarray:
+    """tpl 可以是 ndarray 或预编译模板（core.templates.CompiledTemplate）。"""
+    gray = getattr(tpl, "gray", None)
+    return gray if gray is not None else to_gray(tpl)
+
+
+def template_mask(tpl, lower_hsv, upper_hsv) -> tuple[np.ndarray, int]:
+    """返回 (模板 HSV 掩码, 非零像素数)；预编译模板直接取缓存。"""
+    if hasattr(tpl, "mask"):
+        return tpl.mask(lower_hsv, upper_hsv)
+    mask = mask_hsv_range(tpl, lower_hsv, upper_hsv)
+    return mask, int(cv2.countNonZero(mask)) if mask.size else 0
+
+
+def _roi_view(img: np.ndarray, roi=None, offset=(0, 0)):
     """
-    roi: (x1,y1,x2,y2) in client coords; None means full image
-    返回匹配中心点坐标（client coords）
+    img 的左上角对应 client 坐标 offset（整帧时为 (0,0)，ROI 截图时为 RoiFrame.offset）。
+    roi 始终是 client coords；返回 (view, offx, offy)，offx/offy 为 view 左上角的 client 坐标。
     """
-    if roi is not None:
-        x1, y1, x2, y2 = roi
-        view = img_bgr[y1:y2, x1:x2]
-        offx, offy = x1, y1
-    else:
-        view = img_bgr
-        offx, offy = 0, 0
+    ox, oy = int(offset[0]), int(offset[1])
+    if roi is None:
+        return img, ox, oy
 
-    if view.size == 0:
-        return Match(False)
+    x1, y1, x2, y2 = roi
+    h, w = img.shape[:2]
+    lx1 = max(0, x1 - ox)
+    ly1 = max(0, y1 - oy)
+    lx2 = min(w, x2 - ox)
+    ly2 = min(h, y2 - oy)
+    if lx2 <= lx1 or ly2 <= ly1:
+        return img[0:0, 0:0], ox + lx1, oy + ly1
+    return img[ly1:ly2, lx1:lx2], ox + lx1, oy + ly1
 
-    # 灰度匹配更稳
-    img_g = cv2.cvtColor(view, cv2.COLOR_BGR2GRAY)
-    tpl_g = cv2.cvtColor(tpl_bgr, cv2.COLOR_BGR2GRAY)
 
-    res = cv2.matchTemplate(img_g, tpl_g, cv2.TM_CCOEFF_NORMED)
+def _match_prepared(prepared: np.ndarray, tpl_img: np.ndarray, threshold, offx: int, offy: int) -> Match:
+    """prepared/tpl_img 已是同类型单通道图（灰度或掩码）。"""
+    res = cv2.matchTemplate(prepared, tpl_img, cv2.TM_CCOEFF_NORMED)
     _, max_val, _, max_loc = cv2.minMaxLoc(res)
 
     if max_val < threshold:
         return Match(False, score=float(max_val))
 
-    th, tw = tpl_g.shape[:2]
+    th, tw = tpl_img.shape[:2]
     cx = offx + max_loc[0] + tw // 2
     cy = offy + max_loc[1] + th // 2
     return Match(True, cx, cy, float(max_val))
 
 
+def _downscale(img: np.ndarray, scale: int) -> np.ndarray:
+    h, w = img.shape[:2]
+    return cv2.resize(img, (w // scale, h // scale), interpolation=cv2.INTER_AREA)
+
+
+def _match_pyramid(
+    prepared: np.ndarray,
+    tpl_img: np.ndarray,
+    threshold,
+    offx: int,
+    offy: int,
+    scale: int = 2,
+    candidates: int = 3,
+    small: np.ndarray | None = None,
+    near_band: float = 0.1,
+) -> Match:
+    """
+    由粗到细：先在 1/scale 分辨率上匹配取前 candidates 个峰，
+    再只在每个峰附近的小窗口里做全分辨率匹配，分数与全图匹配同口径。
+    只有真实峰落在粗匹配的前 candidates 个候选里时，结果才与全图匹配相同；
+    精修后的分数落在 threshold ± near_band 内（最容易因漏峰判错的区间）时改做一次全分辨率匹配。
+    模板缩小后太小（< 6px）时退回全分辨率。small 为调用方预先缩好的 prepared（多模板共用）。
+    """
+    th, tw = tpl_img.shape[:2]
+    ph, pw = prepared.shape[:2]
+    if scale <= 1 or th // scale < 6 or tw // scale < 6:
+        return _match_prepared(prepared, tpl_img, threshold, offx, offy)
+
+    if small is None:
+        small = _downscale(prepared, scale)
+    small_tpl = cv2.resize(tpl_img, (tw // scale, th // scale), interpolation=cv2.INTER_AREA)
+    sh, sw = small_tpl.shape[:2]
+    if sh > small.shape[0] or sw > small.shape[1]:
+        return _match_prepared(prepared, tpl_img, threshold, offx, offy)
+
+    res = cv2.matchTemplate(small, small_tpl, cv2.TM_CCOEFF_NORMED)
+    margin = scale * 2
+    best = None
+    for _ in range(max(1, candidates)):
+        _, _, _, loc = cv2.minMaxLoc(res)
+        x0, y0 = loc[0] * scale, loc[1] * scale
+        wx1, wy1 = max(0, x0 - margin), max(0, y0 - margin)
+        wx2, wy2 = min(pw, x0 + tw + margin), min(ph, y0 + th + margin)
+        if wy2 - wy1 >= th and wx2 - wx1 >= tw:
+            m = _match_prepared(prepared[wy1:wy2, wx1:wx2], tpl_img, threshold, offx + wx1, offy + wy1)
+            if best is None or m.score > best.score:
+                best = m
+        # 抑制这个峰附近，下一轮取次高峰
+        res[max(0, loc[1] - sh // 2):loc[1] + sh // 2 + 1, max(0, loc[0] - sw // 2):loc[0] + sw // 2 + 1] = -1.0
+
+    if best is None or abs(float(best.score) - float(threshold)) <= near_band:
+        return _match_prepared(prepared, tpl_img, threshold, offx, offy)
+    return best
+
+
+def find_template(img_bgr: np.ndarray, tpl_bgr: np.ndarray, threshold=0.2, roi=None, offset=(0, 0), pyramid: int = 1) -> Match:
+    """
+    roi: (x1,y1,x2,y2) in client coords; None means full image
+    offset: img_bgr 左上角的 client 坐标（传 grab_rois 的裁剪图时使用）
+    pyramid: 2/4 时先在缩小图上找候选峰再全分辨率精修（大 ROI 提速），1 为关闭
+    返回匹配中心点坐标（client coords）
+    """
+    view, offx, offy = _roi_view(img_bgr, roi, offset)
+
+    if view.size == 0:
+        return Match(False)
+
+    # 灰度匹配更稳
+    return _match_pyramid(to_gray(view), template_gray(tpl_bgr), threshold, offx, offy, scale=pyramid)
+
+
 def find_template_masked(
     img_bgr: np.ndarray,
     tpl_bgr: np.ndarray,
@@ -55,34 +167,191 @@ def find_template_masked(
     roi=None,
     lower_hsv=(15, 80, 140),
     upper_hsv=(40, 255, 255),
+    offset=(0, 0),
+    pyramid: int = 1,
 ) -> Match:
-    if roi is not None:
-        x1, y1, x2, y2 = roi
-        view = img_bgr[y1:y2, x1:x2]
-        offx, offy = x1, y1
-    else:
-        view = img_bgr
-        offx, offy = 0, 0
+    view, offx, offy = _roi_view(img_bgr, roi, offset)
 
     if view.size == 0:
         return Match(False)
 
     img_mask = mask_hsv_range(view, lower_hsv, upper_hsv)
-    tpl_mask = mask_hsv_range(tpl_bgr, lower_hsv, upper_hsv)
+    tpl_mask, tpl_nonzero = template_mask(tpl_bgr, lower_hsv, upper_hsv)
 
     if img_mask.size == 0 or tpl_mask.size == 0:
         return Match(False)
 
-    if cv2.countNonZero(tpl_mask) == 0:
+    if tpl_nonzero == 0:
         return Match(False)
 
-    res = cv2.matchTemplate(img_mask, tpl_mask, cv2.TM_CCOEFF_NORMED)
-    _, max_val, _, max_loc = cv2.minMaxLoc(res)
+    return _match_pyramid(img_mask, tpl_mask, threshold, offx, offy, scale=pyramid)
 
-    if max_val < threshold:
-        return Match(False, score=float(max_val))
 
-    th, tw = tpl_mask.shape[:2]
-    cx = offx + max_loc[0] + tw // 2
-    cy = offy + max_loc[1] + th // 2
-    return Match(True, cx, cy, float(max_val))
+@dataclass
+class MultiMatch:
+    best: Match  # 过阈值的最高分；都没过时 ok=False、score 为最高分
+    best_index: int  # best 对应的模板下标，没有过阈值时为 -1
+    matches: list[Match]  # 与 templates 一一对应
+    scores: list[float]
+
+
+def iter_match_many(
+    img_bgr: np.ndarray,
+    templates,
+    threshold=0.2,
+    roi=None,
+    offset=(0, 0),
+    masked: bool = False,
+    lower_hsv=(15, 80, 140),
+    upper_hsv=(40, 255, 255),
+    pyramid: int = 1,
+):
+    """
+    match_many 的惰性版本：ROI 仍只预处理一次，但按模板顺序逐个 yield Match，
+    调用方拿到满意的结果后停止迭代，剩下的模板就不再 matchTemplate。
+    """
+    view, offx, offy = _roi_view(img_bgr, roi, offset)
+    if view.size == 0:
+        for _tpl in templates:
+            yield Match(False)
+        return
+
+    prepared = mask_hsv_range(view, lower_hsv, upper_hsv) if masked else to_gray(view)
+    ph, pw = prepared.shape[:2]
+    small = _downscale(prepared, pyramid) if pyramid > 1 else None
+    for tpl in templates:
+        if masked:
+            tpl_img, tpl_nonzero = template_mask(tpl, lower_hsv, upper_hsv)
+            if tpl_nonzero == 0:
+                yield Match(False)
+                continue
+        else:
+            tpl_img = template_gray(tpl)
+        th, tw = tpl_img.shape[:2]
+        if th > ph or tw > pw:
+            yield Match(False)
+            continue
+        yield _match_pyramid(prepared, tpl_img, threshold, offx, offy, scale=pyramid, small=small)
+
+
+def match_many(
+    img_bgr: np.ndarray,
+    templates,
+    threshold=0.2,
+    roi=None,
+    offset=(0, 0),
+    masked: bool = False,
+    lower_hsv=(15, 80, 140),
+    upper_hsv=(40, 255, 255),
+    pyramid: int = 1,
+) -> MultiMatch:
+    """
+    多模板匹配：ROI 只做一次灰度转换（masked=True 时为一次 HSV + inRange），
+    每个模板只剩 matchTemplate 的开销。比 ROI 还大的模板、掩码为空的模板记为未命中。
+    pyramid > 1 时缩小图也只算一次，各模板共用。
+    """
+    matches = list(
+        iter_match_many(img_bgr, templates, threshold, roi, offset, masked, lower_hsv, upper_hsv, pyramid)
+    )
+    scores = [m.score for m in matches]
+    best_index = -1
+    for idx, m in enumerate(matches):
+        if m.ok and (best_index < 0 or m.score > matches[best_index].score):
+            best_index = idx
+    if best_index >= 0:
+        best = matches[best_index]
+    else:
+        best = Match(False, score=max(scores, default=0.0))
+    return MultiMatch(best, best_index, matches, scores)
+
+
+def nms_boxes(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float = 0.35, max_results: int = 0) -> list[int]:
+    """
+    贪心 NMS（每轮对剩余框做一次向量化 IoU）：boxes 为 (N,4) 的 x1,y1,x2,y2，
+    返回保留框的下标（按分数从高到低）。
+    """
+    if len(boxes) == 0:
+        return []
+    boxes = boxes.astype(np.float32, copy=False)
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(-np.asarray(scores, dtype=np.float32), kind="stable")
+    keep: list[int] = []
+    while order.size:
+        i = int(order[0])
+        keep.append(i)
+        if max_results and len(keep) >= max_results:
+            break
+        rest = order[1:]
+        iw = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        ih = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        inter = iw * ih
+        iou = inter / (areas[i] + areas[rest] - inter + 1e-6)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+
+def _peaks(res: np.ndarray, threshold: float, tw: int, th: int, max_candidates: int = 2000):
+    """响应图里 >= threshold 的局部极大值（膨胀比较），候选过多时只留分数最高的一批。"""
+    kernel = np.ones((max(3, (th // 2) | 1), max(3, (tw // 2) | 1)), dtype=np.uint8)
+    local_max = res >= cv2.dilate(res, kernel)
+    ys, xs = np.nonzero(local_max & (res >= threshold))
+    scores = res[ys, xs]
+    if scores.size > max_candidates:
+        top = np.argpartition(-scores, max_candidates)[:max_candidates]
+        ys, xs, scores = ys[top], xs[top], scores[top]
+    return xs, ys, scores
+
+
+def find_all_templates(
+    img_bgr: np.ndarray,
+    tpl_bgr,
+    threshold=0.8,
+    roi=None,
+    offset=(0, 0),
+    masked: bool = False,
+    lower_hsv=(15, 80, 140),
+    upper_hsv=(40, 255, 255),
+    iou_threshold: float = 0.35,
+    max_results: int = 20,
+) -> list[Match]:
+    """
+    返回所有 >= threshold 的命中（client 坐标中心点），按分数从高到低，重叠框做 NMS。
+    用于画面里同时出现多个目标（如多个 NPC 标签）时一次扫描拿到全部位置。
+    """
+    view, offx, offy = _roi_view(img_bgr, roi, offset)
+    if view.size == 0:
+        return []
+
+    if masked:
+        prepared = mask_hsv_range(view, lower_hsv, upper_hsv)
+        tpl_img, tpl_nonzero = template_mask(tpl_bgr, lower_hsv, upper_hsv)
+        if tpl_nonzero == 0:
+            return []
+    else:
+        prepared = to_gray(view)
+        tpl_img = template_gray(tpl_bgr)
+
+    th, tw = tpl_img.shape[:2]
+    if th > prepared.shape[0] or tw > prepared.shape[1]:
+        return []
+
+    res = cv2.matchTemplate(prepared, tpl_img, cv2.TM_CCOEFF_NORMED)
+    xs, ys, scores = _peaks(res, float(threshold), tw, th)
+    if scores.size == 0:
+        return []
+
+    boxes = np.stack([xs, ys, xs + tw, ys + th], axis=1)
+    keep = nms_boxes(boxes, scores, iou_threshold=iou_threshold, max_results=max_results)
+    return [
+        Match(True, int(offx + xs[i] + tw // 2), int(offy + ys[i] + th // 2), float(scores[i]))
+        for i in keep
+    ]
+
+
+def nearest_match(matches: list[Match], point) -> Match | None:
+    """离 point（client 坐标）最近的命中。"""
+    if not matches:
+        return None
+    px, py = point
+    return min(matches, key=lambda m: (m.x - px) ** 2 + (m.y - py) ** 2)
@@ -0,0 +1,208 @@
+# core/vision_pool.py
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from core.color_mask import color_mask_settings, configure_color_masks
+from core.templates import compile_template
+from core.vision import Match, _roi_view, match_many
+
+
+@dataclass(frozen=True)
+class VisionJob:
+    """跨进程只传模板路径（模板 ID）和参数，模板在子进程里按路径加载并缓存。"""
+
+    template: str
+    kind: str = "plain"  # "plain" / "masked"
+    threshold: float = 0.8
+    lower_hsv: tuple = (15, 80, 140)
+    upper_hsv: tuple = (40, 255, 255)
+    pyramid: int = 1
+
+
+# ---- 子进程侧 ----
+
+_ATTACHED: dict[str, shared_memory.SharedMemory] = {}
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = _ATTACHED.get(name)
+    if shm is None:
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13 没有 track 参数：手动取消 resource_tracker 登记，避免子进程退出时误删
+            from multiprocessing import resource_tracker
+
+            shm = shared_memory.SharedMemory(name=name)
+            try:
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        if len(_ATTACHED) >= 16:
+            _ATTACHED.pop(next(iter(_ATTACHED))).close()
+        _ATTACHED[name] = shm
+    return shm
+
+
+def _worker_match(shm_name: str, shape: tuple, offset: tuple, jobs: list[VisionJob]) -> list[tuple]:
+    shm = _attach(shm_name)
+    img = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    out: list[tuple | None] = [None] * len(jobs)
+
+    # 参数相同的 job 合成一批 match_many，ROI 的灰度/掩码只算一次
+    groups: dict[tuple, list[int]] = {}
+    for idx, job in enumerate(jobs):
+        key = (job.kind, job.threshold, tuple(job.lower_hsv), tuple(job.upper_hsv), job.pyramid)
+        groups.setdefault(key, []).append(idx)
+
+    for (kind, threshold, lower_hsv, upper_hsv, pyramid), indices in groups.items():
+        loaded = [(idx, compile_template(jobs[idx].template)) for idx in indices]
+        for idx, tpl in loaded:
+            if tpl is None:
+                out[idx] = (False, 0, 0, 0.0)
+        valid = [(idx, tpl) for idx, tpl in loaded if tpl is not None]
+        result = match_many(
+            img,
+            [tpl for _idx, tpl in valid],
+            threshold=threshold,
+            offset=offset,
+            masked=kind == "masked",
+            lower_hsv=lower_hsv,
+            upper_hsv=upper_hsv,
+            pyramid=pyramid,
+        )
+        for (idx, _tpl), m in zip(valid, result.matches):
+            out[idx] = (m.ok, m.x, m.y, m.score)
+    del img
+    return out
+
+
+def _worker_ping() -> bool:
+    return True
+
+
+# ---- 主进程侧 ----
+
+
+class _Slot:
+    def __init__(self, nbytes: int):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(1, nbytes))
+
+    @property
+    def size(self) -> int:
+        return self.shm.size
+
+    def close(self):
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class VisionPool:
+    """
+    进程池识别后端：ROI 像素写入共享内存槽位，跨进程只传 (槽位名, 形状, 偏移, 模板路径, 参数)，
+    不 pickle 整帧。多个模板按 workers 分块并行 matchTemplate，结果按 jobs 顺序返回 Match。
+    同一时刻可以有多个调用方（多开线程），每次调用独占一个槽位直到结果返回。
+    """
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(1, int(workers))
+        # 子进程的颜色掩码设置与主进程一致，模板/帧掩码才会逐像素相同
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=configure_color_masks,
+            initargs=color_mask_settings(),
+        )
+        self._free: list[_Slot] = []
+        self._all: list[_Slot] = []
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "jobs": 0, "bytes": 0, "slots": 0}
+
+    def warm_up(self):
+        """预先拉起子进程（Windows spawn 启动较慢，别放在第一次识别时）。"""
+        for fut in [self._executor.submit(_worker_ping) for _ in range(self.workers)]:
+            fut.result()
+
+    def _take_slot(self, nbytes: int) -> _Slot:
+        with self._lock:
+            for idx, slot in enumerate(self._free):
+                if slot.size >= nbytes:
+                    return self._free.pop(idx)
+            slot = _Slot(nbytes)
+            self._all.append(slot)
+            self.stats["slots"] += 1
+            return slot
+
+    def _give_slot(self, slot: _Slot):
+        with self._lock:
+            self._free.append(slot)
+
+    def match(self, img: np.ndarray, jobs: list[VisionJob], roi=None, offset=(0, 0)) -> list[Match]:
+        if not jobs:
+            return []
+        view, offx, offy = _roi_view(img, roi, offset)
+        if view.size == 0:
+            return [Match(False) for _ in jobs]
+
+        slot = self._take_slot(view.nbytes)
+        try:
+            shared = np.ndarray(view.shape, dtype=np.uint8, buffer=slot.shm.buf)
+            np.copyto(shared, view)
+            del shared
+
+            chunk = (len(jobs) + self.workers - 1) // self.workers
+            futures = [
+                self._executor.submit(_worker_match, slot.shm.name, view.shape, (offx, offy), jobs[i:i + chunk])
+                for i in range(0, len(jobs), chunk)
+            ]
+            results = []
+            for fut in futures:
+                results.extend(fut.result())
+        finally:
+            self._give_slot(slot)
+
+        self.stats["calls"] += 1
+        self.stats["jobs"] += len(jobs)
+        self.stats["bytes"] += view.nbytes
+        return [Match(bool(ok), int(x), int(y), float(score)) for ok, x, y, score in results]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            for slot in self._all:
+                slot.close()
+            self._all.clear()
+            self._free.clear()
+
+    def summary(self) -> str:
+        s = self.stats
+        return f"vision-pool workers={self.workers} calls={s['calls']} jobs={s['jobs']} shm={s['bytes'] / 1024:.0f}KiB slots={s['slots']}"
+
+
+_POOL: VisionPool | None = None
+
+
+def configure_vision_pool(workers: int = 0) -> VisionPool | None:
+    """workers <= 0 关闭进程池（默认），识别在调用线程里同步执行。"""
+    global _POOL
+    if _POOL is not None:
+        _POOL.close()
+        _POOL = None
+    if workers > 0:
+        _POOL = VisionPool(workers)
+        _POOL.warm_up()
+    return _POOL
+
+
+def get_vision_pool() -> VisionPool | None:
+    return _POOL
+
+
+def close_vision_pool():
+    configure_vision_pool(0)
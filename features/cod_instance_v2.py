@@ -9,11 +9,29 @@ from typing import Any
 
 import cv2
 import keyboard
-import numpy as np
 
-from core.capture_win32 import grab_client
+from core.frames import frame_stats, get_frame, get_rois
+from core.glyphs import GlyphClassifier, get_reading_cache, normalize_glyph, reading_cache_stats
+from core.hotspots import find_template_hot, get_hotspots, hotspot_stats, image_bounds
+from core.motion import GridMotion
+from core.recorder import maybe_record
+from core.roi_cache import get_roi_cache, roi_cache_stats
+from core.scenes import SceneClassifier, SceneResult
+from core.template_scheduler import get_template_scheduler, template_scheduler_stats
+from core.templates import compile_template, load_template
+from core.vision_pool import VisionJob, get_vision_pool
 from core.clicker_human import ForegroundBlock, HumanClicker
-from core.vision import find_template, find_template_masked
+from core.coord_tracker import CoordTracker, glyph_key
+from core.vision import (
+    find_all_templates,
+    find_template,
+    iter_match_many,
+    mask_hsv_range,
+    match_many,
+    nearest_match,
+    to_bgr,
+    to_gray,
+)
 
 
 @dataclass
@@ -124,7 +142,7 @@ def _normalize_scene_routes(routes: dict[str, list[tuple[int, int]]], aliases: d
 def _load_templates(paths: list[str]) -> list[Any]:
     templates = []
     for path in paths:
-        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        img = compile_template(path)
         if img is None:
             raise RuntimeError(f"failed to load template: {path}")
         templates.append((path, img))
@@ -179,7 +197,7 @@ def _discover_interact_success_templates(cfg: dict) -> list[str]:
 def _load_named_templates(path_map: dict[str, str]) -> dict[str, Any]:
     templates: dict[str, Any] = {}
     for name, path in path_map.items():
-        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        img = compile_template(path)
         if img is None:
             raise RuntimeError(f"failed to load template: {path}")
         templates[name] = img
@@ -189,7 +207,7 @@ def _load_named_templates(path_map: dict[str, str]) -> dict[str, Any]:
 def _load_optional_templates(path_map: dict[str, str]) -> dict[str, Any]:
     templates: dict[str, Any] = {}
     for name, path in (path_map or {}).items():
-        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        img = load_template(path)
         if img is None:
             print(f"[COORD] Skip unreadable template: {path}")
             continue
@@ -259,7 +277,7 @@ def _discover_instance_kill_templates(cfg: dict) -> dict[int, str]:
 def _load_instance_kill_templates(path_map: dict[int, str]) -> dict[int, Any]:
     templates: dict[int, Any] = {}
     for count, path in path_map.items():
-        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        img = load_template(path)
         if img is None:
             print(f"[INSTANCE] Skip unreadable kill-count template: {path}")
             continue
@@ -270,13 +288,20 @@ def _load_instance_kill_templates(path_map: dict[int, str]) -> dict[int, Any]:
 def _load_single_template(path: str | None):
     if not path:
         return None
-    img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    img = compile_template(str(path))
     if img is None:
         print(f"[WARN] failed to load template: {path}")
         return None
     return img
 
 
+def _grab_for_roi(hwnd: int, roi):
+    if roi is None:
+        return get_frame(hwnd), (0, 0)
+    frame = get_rois(hwnd, [roi])[0]
+    return frame.img, frame.offset
+
+
 def _click_point(clicks: dict, name: str) -> tuple[int, int]:
     if name not in clicks:
         raise RuntimeError(f"missing clicks.{name}")
@@ -305,7 +330,7 @@ def _save_npc_candidate(img, match, cfg: dict):
     out_dir = cfg.get("npc_candidate_dir", "debug/npc_matches")
     os.makedirs(out_dir, exist_ok=True)
     path = os.path.join(out_dir, f"npc_candidate_{time.strftime('%Y%m%d_%H%M%S')}.png")
-    cv2.imwrite(path, crop)
+    cv2.imwrite(path, to_bgr(crop))
 
     LAST_NPC_CANDIDATE["path"] = path
     LAST_NPC_CANDIDATE["adopted"] = False
@@ -331,21 +356,20 @@ def _save_npc_search_debug(img, roi, cfg: dict, label: str):
     ts = time.strftime("%Y%m%d_%H%M%S")
 
     crop_path = os.path.join(out_dir, f"{label}_{ts}_crop.png")
-    cv2.imwrite(crop_path, crop)
+    cv2.imwrite(crop_path, to_bgr(crop))
     print(f"[NPC] Saved search ROI crop: {crop_path}")
 
     if bool(cfg.get("npc_use_yellow_mask", True)):
         lower_hsv = tuple(int(v) for v in cfg.get("npc_text_hsv_lower", [15, 80, 140]))
         upper_hsv = tuple(int(v) for v in cfg.get("npc_text_hsv_upper", [40, 255, 255]))
-        hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
-        mask = cv2.inRange(hsv, lower_hsv, upper_hsv)
+        mask = mask_hsv_range(crop, lower_hsv, upper_hsv)
         mask_path = os.path.join(out_dir, f"{label}_{ts}_mask.png")
         cv2.imwrite(mask_path, mask)
         print(f"[NPC] Saved search ROI mask: {mask_path}")
 
 
 def _save_npc_rejected_debug(hwnd: int, cfg: dict, label: str):
-    img = grab_client(hwnd)
+    img = get_frame(hwnd)
     roi = cfg.get("npc_label_roi") or cfg.get("npc_roi")
     if roi is not None:
         x1, y1, x2, y2 = tuple(int(v) for v in roi)
@@ -357,7 +381,7 @@ def _save_npc_rejected_debug(hwnd: int, cfg: dict, label: str):
     os.makedirs(out_dir, exist_ok=True)
     ts = time.strftime("%Y%m%d_%H%M%S")
     path = os.path.join(out_dir, f"{label}_{ts}.png")
-    cv2.imwrite(path, crop)
+    cv2.imwrite(path, to_bgr(crop))
     print(f"[NPC] Saved rejected detection: {path}")
 
 
@@ -365,16 +389,14 @@ def _save_interact_success_roi(hwnd: int, cfg: dict, label: str):
     roi = cfg.get("npc_interact_success_roi")
     if not roi:
         return None
-    x1, y1, x2, y2 = [int(v) for v in roi]
-    img = grab_client(hwnd)
-    crop = img[y1:y2, x1:x2]
+    crop = get_rois(hwnd, [roi])[0].img
     if crop.size == 0:
         return None
     out_dir = cfg.get("npc_interact_debug_dir", "debug/npc_interact")
     os.makedirs(out_dir, exist_ok=True)
     ts = time.strftime("%Y%m%d_%H%M%S")
     path = os.path.join(out_dir, f"{label}_{ts}.png")
-    cv2.imwrite(path, crop)
+    cv2.imwrite(path, to_bgr(crop))
     print(f"[NPC] Saved interact ROI: {path}")
     return path
 
@@ -430,9 +452,9 @@ def _wait_for_interact_success(
         return False
 
     while elapsed <= timeout and not ctx.control.stop:
-        img = grab_client(hwnd)
+        img, offset = _grab_for_roi(hwnd, roi)
         for path, tpl in success_templates:
-            m = find_template(img, tpl, threshold=threshold, roi=roi)
+            m = find_template(img, tpl, threshold=threshold, roi=roi, offset=offset)
             if m.ok:
                 print(f"[NPC] Interact success matched {os.path.basename(path)} score={m.score:.3f}")
                 if bool(cfg.get("npc_save_success_hit_debug", True)):
@@ -504,8 +526,8 @@ def _match_scene_template(ctx: BotContext, hwnd: int, scene_name: str, scene_tem
     interval = float(cfg.get("scene_match_interval", 2.0))
 
     for attempt in range(1, retries + 1):
-        img = grab_client(hwnd)
-        match = find_template(img, tpl, threshold=threshold, roi=roi)
+        img, offset = _grab_for_roi(hwnd, roi)
+        match = find_template_hot(f"scene:{scene_name}", img, tpl, threshold=threshold, roi=roi, offset=offset, cached=False)
         if match.ok:
             print(f"[SCENE] Verified {scene_name} score={match.score:.3f}")
             return True
@@ -532,8 +554,8 @@ def _wait_for_scene_verification(ctx: BotContext, hwnd: int, scene_name: str, sc
 
     elapsed = 0.0
     while not ctx.control.stop:
-        img = grab_client(hwnd)
-        match = find_template(img, tpl, threshold=threshold, roi=roi)
+        img, offset = _grab_for_roi(hwnd, roi)
+        match = find_template_hot(f"scene:{scene_name}", img, tpl, threshold=threshold, roi=roi, offset=offset, scope=hwnd)
         if match.ok:
             print(f"[SCENE] Verified {scene_name} score={match.score:.3f} after {elapsed:.1f}s")
             return True
@@ -555,19 +577,35 @@ def _wait_for_scene_verification(ctx: BotContext, hwnd: int, scene_name: str, sc
     return False
 
 
-def _match_scene_once(hwnd: int, scene_name: str, scene_templates: dict[str, Any], cfg: dict) -> tuple[bool, float]:
-    tpl = scene_templates.get(scene_name)
-    if tpl is None:
-        return False, 0.0
+_SCENE_CLASSIFIERS: dict[tuple, tuple[dict, SceneClassifier]] = {}
+
+
+def _scene_classifier(scene_templates: dict[str, Any], cfg: dict) -> SceneClassifier:
+    key = (id(scene_templates), float(cfg.get("scene_threshold", 0.85)), float(cfg.get("scene_min_margin", 0.0)))
+    entry = _SCENE_CLASSIFIERS.get(key)
+    if entry is None or entry[0] is not scene_templates:
+        classifier = SceneClassifier(scene_templates, threshold=key[1], min_margin=key[2])
+        entry = (scene_templates, classifier)
+        _SCENE_CLASSIFIERS[key] = entry
+    return entry[1]
 
+
+def _classify_scene(hwnd: int, scene_templates: dict[str, Any], cfg: dict) -> SceneResult:
+    """当前地图：所有场景模板一次打分；地名条与已知画面逐像素相同时直接查哈希。"""
     roi = cfg.get("scene_roi")
     if roi is not None:
         roi = tuple(int(v) for v in roi)
+    img, offset = _grab_for_roi(hwnd, roi)
+    return _scene_classifier(scene_templates, cfg).classify(img, roi=roi, offset=offset)
 
-    threshold = float(cfg.get("scene_threshold", 0.85))
-    img = grab_client(hwnd)
-    match = find_template(img, tpl, threshold=threshold, roi=roi)
-    return bool(match.ok), float(match.score)
+
+def _match_scene_once(hwnd: int, scene_name: str, scene_templates: dict[str, Any], cfg: dict) -> tuple[bool, float]:
+    if scene_name not in scene_templates:
+        return False, 0.0
+
+    # 只有当 scene_name 是所有场景里得分最高的那个才算匹配，避免相似地名误判
+    result = _classify_scene(hwnd, scene_templates, cfg)
+    return result.scene == scene_name, float(result.scores.get(scene_name, 0.0))
 
 
 def _wait_for_instance_entry_by_map_change(
@@ -592,12 +630,10 @@ def _wait_for_instance_entry_by_map_change(
 
 
 def _motion_roi_gray(hwnd: int, roi) -> Any:
-    img = grab_client(hwnd)
-    x1, y1, x2, y2 = roi
-    crop = img[y1:y2, x1:x2]
+    crop = get_rois(hwnd, [roi])[0].img
     if crop.size == 0:
         return None
-    return cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    return to_gray(crop)
 
 
 def _mask_coord_text(img_bgr, cfg: dict):
@@ -606,10 +642,9 @@ def _mask_coord_text(img_bgr, cfg: dict):
     if mode == "hsv":
         lower = tuple(int(v) for v in cfg.get("coord_text_hsv_lower", [15, 0, 180]))
         upper = tuple(int(v) for v in cfg.get("coord_text_hsv_upper", [179, 80, 255]))
-        hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
-        return cv2.inRange(hsv, lower, upper)
+        return mask_hsv_range(img_bgr, lower, upper)
 
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
+    gray = to_gray(img_bgr)
     threshold = int(cfg.get("coord_gray_threshold", 185))
     _, mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
     return mask
@@ -640,99 +675,73 @@ def _extract_coord_groups(mask):
     return groups
 
 
-def _normalize_binary_glyph(img, canvas_size=(24, 24), pad=2):
-    if img is None or img.size == 0:
-        return None
+_DIGIT_CLASSIFIERS: dict[tuple, tuple[dict, GlyphClassifier]] = {}
 
-    ys, xs = (img > 0).nonzero()
-    if len(xs) == 0 or len(ys) == 0:
-        return None
 
-    x1, x2 = xs.min(), xs.max() + 1
-    y1, y2 = ys.min(), ys.max() + 1
-    glyph = img[y1:y2, x1:x2]
-    gh, gw = glyph.shape[:2]
-    if gh <= 0 or gw <= 0:
-        return None
-
-    canvas_w, canvas_h = canvas_size
-    usable_w = max(1, canvas_w - pad * 2)
-    usable_h = max(1, canvas_h - pad * 2)
-    scale = min(usable_w / gw, usable_h / gh)
-    new_w = max(1, int(round(gw * scale)))
-    new_h = max(1, int(round(gh * scale)))
-
-    resized = cv2.resize(glyph, (new_w, new_h), interpolation=cv2.INTER_NEAREST)
-    _, resized = cv2.threshold(resized, 127, 255, cv2.THRESH_BINARY)
-
-    canvas = np.zeros((canvas_h, canvas_w), dtype=np.uint8)
-
-    off_x = (canvas_w - new_w) // 2
-    off_y = (canvas_h - new_h) // 2
-    canvas[off_y:off_y + new_h, off_x:off_x + new_w] = resized
-    return canvas
+def _digit_classifier(digit_templates: dict[str, Any], cfg: dict) -> GlyphClassifier:
+    """数字模板按当前坐标掩码参数编译一次（二值化+归一化成 (10, 24, 24)），之后复用。"""
+    key = (
+        id(digit_templates),
+        str(cfg.get("coord_mask_mode", "gray")).lower(),
+        int(cfg.get("coord_gray_threshold", 185)),
+        tuple(cfg.get("coord_text_hsv_lower", [15, 0, 180])),
+        tuple(cfg.get("coord_text_hsv_upper", [179, 80, 255])),
+    )
+    entry = _DIGIT_CLASSIFIERS.get(key)
+    if entry is None or entry[0] is not digit_templates:
+        masks = {digit: _mask_coord_text(tpl, cfg) for digit, tpl in digit_templates.items()}
+        entry = (digit_templates, GlyphClassifier.from_masks(masks))
+        _DIGIT_CLASSIFIERS[key] = entry
+    return entry[1]
 
 
-def _recognize_group_digits(mask, group_boxes, digit_templates: dict[str, Any], cfg: dict):
-    if not group_boxes or not digit_templates:
-        return None
+def _recognize_coord_groups(mask, groups, digit_templates: dict[str, Any], cfg: dict) -> list[str | None]:
+    """两组坐标（或任意多组）的字符合成一批，对全部数字模板一次打分。"""
+    if not digit_templates:
+        return [None for _ in groups]
+    classifier = _digit_classifier(digit_templates, cfg)
+    if len(classifier) == 0:
+        return [None for _ in groups]
 
-    char_boxes = sorted(group_boxes, key=lambda item: item[0])
-    digits = []
-    for idx, box in enumerate(char_boxes, start=1):
-        bx, by, bw, bh = box
-        char = mask[by:by + bh, bx:bx + bw]
-        if char.size == 0:
-            return None
-        norm_char = _normalize_binary_glyph(char)
-        if norm_char is None:
-            return None
-        best_digit = None
-        best_score = -1.0
-        for digit, tpl in digit_templates.items():
-            tpl_mask = _mask_coord_text(tpl, cfg)
-            if cv2.countNonZero(tpl_mask) == 0:
-                continue
-            norm_tpl = _normalize_binary_glyph(tpl_mask)
-            if norm_tpl is None:
-                continue
-            resized_bin = norm_char
-            tpl_bin = norm_tpl
-
-            # IoU is much better than plain template correlation for similar digits like 6/8.
-            inter = cv2.countNonZero(cv2.bitwise_and(resized_bin, tpl_bin))
-            union = cv2.countNonZero(cv2.bitwise_or(resized_bin, tpl_bin))
-            iou = (inter / union) if union else 0.0
-
-            # Keep a small correlation component as a tiebreaker.
-            corr = float(cv2.matchTemplate(resized_bin, tpl_bin, cv2.TM_CCOEFF_NORMED)[0][0])
-            score = iou * 0.85 + corr * 0.15
-            if score > best_score:
-                best_score = float(score)
-                best_digit = digit
-        if best_digit is None:
-            return None
-        if bool(cfg.get("coord_debug_digit_scores", False)):
-            print(f"[COORD] digit#{idx} -> {best_digit} score={best_score:.3f}")
-        digits.append(best_digit)
-    return "".join(digits)
+    results = classifier.read_groups(mask, groups)
+    if bool(cfg.get("coord_debug_digit_scores", False)):
+        for text, scores in results:
+            for idx, (digit, score) in enumerate(zip(text or "", scores), start=1):
+                print(f"[COORD] digit#{idx} -> {digit} score={float(score):.3f}")
+    return [text for text, _scores in results]
 
 
 def _read_current_coord(ctx: BotContext, hwnd: int, cfg: dict, digit_templates: dict[str, Any]):
     roi = tuple(int(v) for v in cfg.get("current_coord_roi", [894, 33, 948, 46]))
-    img = grab_client(hwnd)
-    x1, y1, x2, y2 = roi
-    crop = img[y1:y2, x1:x2]
+    crop = get_rois(hwnd, [roi])[0].img
     if crop.size == 0:
         return None
 
     mask = _mask_coord_text(crop, cfg)
+    return _read_coord_mask(mask, digit_templates, cfg)
+
+
+def _read_coord_mask(mask, digit_templates: dict[str, Any], cfg: dict) -> tuple[int, int] | None:
+    """
+    坐标掩码 -> (x, y)。整段读数按掩码哈希做 LRU 缓存：坐标文字没变时不再分割+分类。
+    打开 coord_debug_digit_scores 时绕过缓存，保证每次都打印逐字分数。
+    """
+    if (
+        not digit_templates
+        or not bool(cfg.get("coord_ocr_cache_enabled", True))
+        or bool(cfg.get("coord_debug_digit_scores", False))
+    ):
+        return _ocr_coord_mask(mask, digit_templates, cfg)
+    scope = id(_digit_classifier(digit_templates, cfg))
+    return get_reading_cache().get_or_compute(mask, lambda: _ocr_coord_mask(mask, digit_templates, cfg), scope=scope)
+
+
+def _ocr_coord_mask(mask, digit_templates: dict[str, Any], cfg: dict) -> tuple[int, int] | None:
     groups = _extract_coord_groups(mask)
     if len(groups) < 2:
         return None
 
-    x_str = _recognize_group_digits(mask, groups[0], digit_templates, cfg)
-    y_str = _recognize_group_digits(mask, groups[1], digit_templates, cfg)
+    x_str, y_str = _recognize_coord_groups(mask, groups[:2], digit_templates, cfg)
     if not x_str or not y_str:
         return None
 
@@ -742,13 +751,46 @@ def _read_current_coord(ctx: BotContext, hwnd: int, cfg: dict, digit_templates:
         return None
 
 
+def _track_coord_mask(mask, tracker: CoordTracker, t: float, digit_templates: dict[str, Any], cfg: dict):
+    """
+    行走中读坐标：与上次读数像素一致的字符直接沿用，只对变化的字符分类，
+    拼出的坐标再用速度预测校验；字符数变化、分类失败或校验不过时走完整 OCR 并重置跟踪。
+    """
+    groups = _extract_coord_groups(mask)[:2]
+    keys = [[glyph_key(mask, box) for box in group] for group in groups] if len(groups) == 2 else None
+    labels = tracker.reuse(keys) if keys is not None else None
+    if labels is not None:
+        changed = [box for group, row in zip(groups, labels) for box, digit in zip(group, row) if digit is None]
+        if changed:
+            classifier = _digit_classifier(digit_templates, cfg)
+            chars = classifier.normalize_boxes(mask, changed) if len(classifier) else None
+            fresh = iter(classifier.classify(chars)[0] if chars is not None else [])
+            labels = [[digit if digit is not None else next(fresh, None) for digit in row] for row in labels]
+        if all(digit is not None for row in labels for digit in row):
+            try:
+                coord = int("".join(labels[0])), int("".join(labels[1]))
+            except ValueError:
+                coord = None
+            if coord is not None and (not changed or tracker.plausible(t, coord, float(cfg.get("coord_track_max_error", 4)))):
+                tracker.update(t, coord, keys)
+                tracker.stats["tracked"] += 1
+                return coord
+        tracker.stats["rejected"] += 1
+
+    coord = _read_coord_mask(mask, digit_templates, cfg)
+    tracker.stats["full"] += 1
+    if coord is not None:
+        tracker.update(t, coord, keys)
+    return coord
+
+
 def _save_coord_debug(crop, mask, label: str):
     out_dir = os.path.join("debug", "coord_read")
     os.makedirs(out_dir, exist_ok=True)
     ts = time.strftime("%Y%m%d_%H%M%S")
     crop_path = os.path.join(out_dir, f"{label}_{ts}_crop.png")
     mask_path = os.path.join(out_dir, f"{label}_{ts}_mask.png")
-    cv2.imwrite(crop_path, crop)
+    cv2.imwrite(crop_path, to_bgr(crop))
     cv2.imwrite(mask_path, mask)
     print(f"[COORD] saved debug crop: {crop_path}")
     print(f"[COORD] saved debug mask: {mask_path}")
@@ -786,24 +828,30 @@ def _wait_for_target_coordinate(
     scan_threshold = float(cfg.get("npc_scan_during_move_threshold", cfg.get("npc_threshold", 0.82)))
     scan_plain_threshold = float(cfg.get("npc_scan_during_move_plain_threshold", cfg.get("npc_plain_threshold", scan_threshold)))
     scan_confirm_hits = int(cfg.get("npc_scan_during_move_confirm_hits", 2))
+    # 跟踪模式只对变化的字符分类；按 ETA 缩短临近目标时的轮询间隔（不低于 coord_verify_min_poll_interval）
+    track_enabled = bool(cfg.get("coord_track_enabled", True)) and not bool(cfg.get("coord_debug_digit_scores", False))
+    eta_poll_enabled = bool(cfg.get("coord_eta_poll_enabled", True))
+    min_interval = min(interval, float(cfg.get("coord_verify_min_poll_interval", 0.3)))
+    tracker = CoordTracker(max_speed=float(cfg.get("coord_track_max_speed", 30.0)))
 
     while (max_wait <= 0 or elapsed <= max_wait) and not ctx.control.stop:
         roi = tuple(int(v) for v in cfg.get("current_coord_roi", [894, 33, 948, 46]))
-        img = grab_client(hwnd)
-        x1, y1, x2, y2 = roi
-        crop = img[y1:y2, x1:x2]
+        scan_due = scan_enabled and elapsed >= scan_min_elapsed
+        if scan_due:
+            # NPC 扫描需要整帧；否则只截坐标 ROI
+            img = get_frame(hwnd)
+            x1, y1, x2, y2 = roi
+            crop = img[y1:y2, x1:x2]
+        else:
+            img = None
+            crop = get_rois(hwnd, [roi])[0].img
         mask = _mask_coord_text(crop, cfg) if crop.size else None
         current = None
         if crop.size and mask is not None:
-            groups = _extract_coord_groups(mask)
-            if len(groups) >= 2:
-                x_str = _recognize_group_digits(mask, groups[0], digit_templates, cfg)
-                y_str = _recognize_group_digits(mask, groups[1], digit_templates, cfg)
-                if x_str and y_str:
-                    try:
-                        current = (int(x_str), int(y_str))
-                    except ValueError:
-                        current = None
+            if track_enabled:
+                current = _track_coord_mask(mask, tracker, elapsed, digit_templates, cfg)
+            else:
+                current = _read_coord_mask(mask, digit_templates, cfg)
 
         if current is not None:
             if last_coord is None or current != last_coord:
@@ -814,7 +862,7 @@ def _wait_for_target_coordinate(
             dy = abs(current[1] - int(target[1]))
             print(f"[COORD] {label} current={current} target={target} delta=({dx},{dy})")
             if dx <= tolerance and dy <= tolerance:
-                print(f"[COORD] {label} arrived by coordinate check")
+                print(f"[COORD] {label} arrived by coordinate check | {tracker.summary()}")
                 return True, None
 
             if (
@@ -830,6 +878,7 @@ def _wait_for_target_coordinate(
                     f"({retry_count}/{retry_max})"
                 )
                 retry_route()
+                tracker.reset_motion()
                 last_coord_change_elapsed = elapsed
                 move_npc_hits = 0
                 moving_npc = None
@@ -838,7 +887,7 @@ def _wait_for_target_coordinate(
             if bool(cfg.get("coord_debug_on_fail", True)):
                 _save_coord_debug(crop, mask, label)
 
-        if scan_enabled and elapsed >= scan_min_elapsed:
+        if scan_due:
             m = _scan_npc_once(img, npc_templates, cfg, threshold=scan_threshold, plain_threshold=scan_plain_threshold)
             if m is not None:
                 move_npc_hits += 1
@@ -854,13 +903,18 @@ def _wait_for_target_coordinate(
                 move_npc_hits = 0
                 moving_npc = None
 
-        sleep_for = interval if max_wait <= 0 else min(interval, max_wait - elapsed)
+        poll = interval
+        if eta_poll_enabled and current is not None:
+            eta = tracker.eta(target, tolerance)
+            if eta is not None:
+                poll = min(interval, max(min_interval, eta))
+        sleep_for = poll if max_wait <= 0 else min(poll, max_wait - elapsed)
         if sleep_for <= 0 and max_wait > 0:
             break
         ctx.clock.sleep(sleep_for)
         elapsed += sleep_for
 
-    print(f"[COORD] {label} coordinate check timed out")
+    print(f"[COORD] {label} coordinate check timed out | {tracker.summary()}")
     return False, moving_npc
 
 
@@ -901,7 +955,79 @@ def _wait_for_coordinate_stable(
     return False
 
 
+_MOTION_DETECTORS: dict[tuple, GridMotion] = {}
+
+
+def _motion_detector(hwnd: int, roi, cfg: dict) -> GridMotion:
+    """按窗口、ROI 和参数缓存检测器，各格学到的噪声（水面/动画 UI）跨次移动保留；多开时各窗口互不干扰。"""
+    grid = tuple(int(v) for v in cfg.get("move_motion_grid", [16, 12]))
+    key = (
+        hwnd,
+        roi,
+        grid,
+        int(cfg.get("move_motion_cell_px", 4)),
+        float(cfg.get("move_motion_cell_threshold", 6.0)),
+        float(cfg.get("move_motion_noise_gain", 2.0)),
+        float(cfg.get("move_motion_still_fraction", 0.08)),
+    )
+    detector = _MOTION_DETECTORS.get(key)
+    if detector is None:
+        detector = GridMotion(grid, key[3], key[4], key[5], still_fraction=key[6])
+        _MOTION_DETECTORS[key] = detector
+    return detector
+
+
 def _wait_for_motion_to_settle(ctx: BotContext, hwnd: int, cfg: dict, label: str):
+    """
+    grid（默认）：缩小网格上的逐格运动能量，短间隔轮询，静止持续 move_settle_window 秒即判定到达；
+    连续 move_motion_walk_polls 次超过 move_motion_walk_fraction 的格子在动（确认角色已经走起来）之后
+    不再等 move_min_wait。mean：原来的整 ROI 平均帧差 + 连续 move_stable_count 次。
+    """
+    if str(cfg.get("move_motion_mode", "grid")).lower() != "grid":
+        return _wait_for_motion_to_settle_mean(ctx, hwnd, cfg, label)
+
+    roi = tuple(int(v) for v in cfg.get("move_verify_roi", [320, 180, 704, 520]))
+    interval = float(cfg.get("move_motion_poll_interval", 0.25))
+    max_wait = float(cfg.get("move_to_xy_max_wait", cfg.get("move_to_xy_wait", 10)))
+    min_wait = float(cfg.get("move_min_wait", 4.0))
+    window = float(cfg.get("move_settle_window", 0.75))
+    walk_fraction = float(cfg.get("move_motion_walk_fraction", 0.3))
+    walk_polls = int(cfg.get("move_motion_walk_polls", 2))
+
+    detector = _motion_detector(hwnd, roi, cfg)
+    detector.reset()
+    elapsed = 0.0
+    still_since = None
+    walk_streak = 0
+    seen_motion = False
+
+    print(f"[MOVE] Waiting for arrival at {label}, max {max_wait:.1f}s")
+    while elapsed <= max_wait and not ctx.control.stop:
+        reading = detector.update(_motion_roi_gray(hwnd, roi))
+        if reading is not None:
+            walk_streak = walk_streak + 1 if reading.moving_fraction >= walk_fraction else 0
+            if walk_streak >= walk_polls:
+                seen_motion = True
+            if reading.still:
+                if still_since is None:
+                    still_since = elapsed
+                    print(f"[MOVE] {label} looks stable energy={reading.energy:.2f} moving={reading.moving_fraction:.0%}")
+                if (seen_motion or elapsed >= min_wait) and elapsed - still_since >= window:
+                    print(f"[MOVE] {label} settled after {elapsed:.1f}s")
+                    return True
+            else:
+                if still_since is not None:
+                    print(f"[MOVE] {label} still moving energy={reading.energy:.2f} moving={reading.moving_fraction:.0%}")
+                still_since = None
+
+        ctx.clock.sleep(interval)
+        elapsed += interval
+
+    print(f"[MOVE] Arrival check timed out for {label}, continue anyway")
+    return False
+
+
+def _wait_for_motion_to_settle_mean(ctx: BotContext, hwnd: int, cfg: dict, label: str):
     roi = tuple(int(v) for v in cfg.get("move_verify_roi", [320, 180, 704, 520]))
     interval = float(cfg.get("move_verify_poll_interval", 2.0))
     max_wait = float(cfg.get("move_to_xy_max_wait", cfg.get("move_to_xy_wait", 10)))
@@ -1150,57 +1276,45 @@ def _find_npc(ctx: BotContext, hwnd: int, templates: list[Any], cfg: dict, label
     while elapsed <= timeout and not ctx.control.stop:
         attempts += 1
         _maybe_adopt_latest_candidate(cfg)
-        img = grab_client(hwnd)
+        img = get_frame(hwnd)
         if not debug_saved:
             _save_npc_search_debug(img, roi, cfg, "npc_search")
             debug_saved = True
-        for path, tpl in templates:
-            if use_yellow_mask:
-                match = find_template_masked(
-                    img,
-                    tpl,
-                    threshold=threshold,
-                    roi=roi,
-                    lower_hsv=lower_hsv,
-                    upper_hsv=upper_hsv,
-                )
-            else:
-                match = find_template(img, tpl, threshold=plain_threshold, roi=roi)
+        for path, mode, match in _iter_npc_matches(
+            img, templates, roi, cfg, threshold, plain_threshold, use_yellow_mask, lower_hsv, upper_hsv
+        ):
             best_seen = max(best_seen, float(match.score))
+            if not match.ok:
+                continue
 
-            if match.ok:
-                mode = "masked" if use_yellow_mask else "plain"
-                print(f"[NPC] Matched {os.path.basename(path)} via {mode} score={match.score:.3f}")
-                # _save_npc_candidate(img, match, cfg)
-                # _append_npc_score_log(
-                #     cfg,
-                #     label=label,
-                #     result="success",
-                #     score=float(match.score),
-                #     elapsed=float(elapsed),
-                #     attempts=int(attempts),
-                #     mode=mode,
-                #     template_name=os.path.basename(path),
-                # )
-                return match
-
-            if use_yellow_mask and bool(cfg.get("npc_enable_plain_fallback", False)):
-                plain_match = find_template(img, tpl, threshold=plain_threshold, roi=roi)
-                best_seen = max(best_seen, float(plain_match.score))
-                if plain_match.ok:
-                    print(f"[NPC] Matched {os.path.basename(path)} via plain fallback score={plain_match.score:.3f}")
-                    _save_npc_candidate(img, plain_match, cfg)
-                    _append_npc_score_log(
-                        cfg,
-                        label=label,
-                        result="success",
-                        score=float(plain_match.score),
-                        elapsed=float(elapsed),
-                        attempts=int(attempts),
-                        mode="plain_fallback",
-                        template_name=os.path.basename(path),
-                    )
-                    return plain_match
+            if mode == "plain_fallback":
+                print(f"[NPC] Matched {os.path.basename(path)} via plain fallback score={match.score:.3f}")
+                _save_npc_candidate(img, match, cfg)
+                _append_npc_score_log(
+                    cfg,
+                    label=label,
+                    result="success",
+                    score=float(match.score),
+                    elapsed=float(elapsed),
+                    attempts=int(attempts),
+                    mode="plain_fallback",
+                    template_name=os.path.basename(path),
+                )
+                return _pick_nearest_npc(img, templates, path, mode, match, roi, cfg, threshold, plain_threshold, lower_hsv, upper_hsv)
+
+            print(f"[NPC] Matched {os.path.basename(path)} via {mode} score={match.score:.3f}")
+            # _save_npc_candidate(img, match, cfg)
+            # _append_npc_score_log(
+            #     cfg,
+            #     label=label,
+            #     result="success",
+            #     score=float(match.score),
+            #     elapsed=float(elapsed),
+            #     attempts=int(attempts),
+            #     mode=mode,
+            #     template_name=os.path.basename(path),
+            # )
+            return _pick_nearest_npc(img, templates, path, mode, match, roi, cfg, threshold, plain_threshold, lower_hsv, upper_hsv)
 
         if (
             very_fast_fail_enabled
@@ -1296,32 +1410,203 @@ def _scan_npc_once(img, templates: list[Any], cfg: dict, threshold: float | None
         else cfg.get("npc_plain_threshold", cfg.get("npc_threshold", 0.82))
     )
 
+    # 分数达到 npc_confident_score 就不再试剩下的模板
+    confident = float(cfg.get("npc_confident_score", 0.9))
     best_ok = None
     best_score = -1.0
-    for _path, tpl in templates:
-        if use_yellow_mask:
-            m = find_template_masked(
-                img,
-                tpl,
-                threshold=masked_threshold,
-                roi=roi,
-                lower_hsv=lower_hsv,
-                upper_hsv=upper_hsv,
-            )
-        else:
-            m = find_template(img, tpl, threshold=plain_threshold_v, roi=roi)
-
+    best_from = None
+    for path, mode, m in _iter_npc_matches(
+        img, templates, roi, cfg, masked_threshold, plain_threshold_v, use_yellow_mask, lower_hsv, upper_hsv
+    ):
         if m.ok and float(m.score) > best_score:
             best_ok = m
             best_score = float(m.score)
+            best_from = (path, mode)
+            if best_score >= confident:
+                break
 
-        if use_yellow_mask and bool(cfg.get("npc_enable_plain_fallback", False)):
-            p = find_template(img, tpl, threshold=plain_threshold_v, roi=roi)
-            if p.ok and float(p.score) > best_score:
-                best_ok = p
-                best_score = float(p.score)
+    if best_ok is None:
+        return None
+    return _pick_nearest_npc(
+        img, templates, best_from[0], best_from[1], best_ok, roi, cfg, masked_threshold, plain_threshold_v, lower_hsv, upper_hsv
+    )
+
+
+def _pick_nearest_npc(
+    img,
+    templates: list[Any],
+    path: str,
+    mode: str,
+    match,
+    roi,
+    cfg: dict,
+    masked_threshold: float,
+    plain_threshold: float,
+    lower_hsv,
+    upper_hsv,
+):
+    """
+    画面里同时有多个 NPC 标签时，用命中的模板在同一帧上取全部命中（NMS 去重），
+    返回离角色锚点最近的一个；不用再等下一轮扫描。npc_pick_nearest 关闭时原样返回。
+    """
+    if not bool(cfg.get("npc_pick_nearest", False)):
+        return match
+    tpl = dict(templates).get(path)
+    if tpl is None:
+        return match
+
+    masked = mode == "masked"
+    hits = find_all_templates(
+        img,
+        tpl,
+        threshold=masked_threshold if masked else plain_threshold,
+        roi=roi,
+        masked=masked,
+        lower_hsv=lower_hsv,
+        upper_hsv=upper_hsv,
+        iou_threshold=float(cfg.get("npc_nms_iou", 0.35)),
+        max_results=int(cfg.get("npc_max_hits", 8)),
+    )
+    if len(hits) <= 1:
+        return match
+
+    anchor = cfg.get("npc_player_anchor")
+    if anchor is None:
+        anchor = (img.shape[1] // 2, img.shape[0] // 2)
+    nearest = nearest_match(hits, (int(anchor[0]), int(anchor[1])))
+    print(
+        f"[NPC] {len(hits)} visible hits for {os.path.basename(path)}, "
+        f"picked nearest ({nearest.x},{nearest.y}) score={nearest.score:.3f}"
+    )
+    return nearest
+
+
+def _iter_npc_matches(
+    img,
+    templates: list[Any],
+    roi,
+    cfg: dict,
+    masked_threshold: float,
+    plain_threshold: float,
+    use_yellow_mask: bool,
+    lower_hsv,
+    upper_hsv,
+):
+    """
+    模板按调度器给出的期望命中率排序（淘汰的模板只占一个轮转探索位），
+    调用方拿到命中即可停止迭代，后面的模板不再匹配。
+    先在 NPC 标签的历史命中热点簇附近逐个窗口搜索，某个窗口内有命中就只返回该窗口结果；
+    否则（或热点还不够）按完整 ROI 搜索，召回率与不开热点时一致。
+    """
+    args = (cfg, masked_threshold, plain_threshold, use_yellow_mask, lower_hsv, upper_hsv)
+    sched = get_template_scheduler()
+    by_path = dict(templates)
+    templates = [(path, by_path[path]) for path in sched.plan("npc", [path for path, _tpl in templates])]
+
+    observed = []
+
+    def emit(path, mode, m):
+        if mode != "plain_fallback":
+            observed.append((path, m.score, m.ok))
+        if m.ok:
+            hot.record("npc", m.x, m.y)
+        return path, mode, m
+
+    hot = get_hotspots()
+    bounds = roi if roi is not None else image_bounds(img)
+    pad = (
+        max((tpl.shape[1] for _path, tpl in templates), default=0) // 2,
+        max((tpl.shape[0] for _path, tpl in templates), default=0) // 2,
+    )
+    try:
+        yield from _iter_npc_matches_hot(img, templates, roi, bounds, pad, hot, emit, args)
+    finally:
+        # 调用方提前停止迭代时生成器被关闭，本轮实际匹配过的模板照样提交
+        sched.record_poll("npc", observed)
+
+
+def _iter_npc_matches_hot(img, templates: list[Any], roi, bounds, pad, hot, emit, args):
+    wins = hot.windows("npc", bounds, pad)
+    for n, win in enumerate(wins, start=1):
+        pending = []
+        hit = False
+        for path, mode, m in _iter_npc_matches_in(img, templates, win, *args):
+            if hit:
+                yield emit(path, mode, m)
+                continue
+            pending.append((path, mode, m))
+            if m.ok:
+                hit = True
+                hot.note(bounds, wins[:n], True)
+                for item in pending:
+                    yield emit(*item)
+        if hit:
+            return
+    hot.note(bounds, wins, False)
+
+    for path, mode, m in _iter_npc_matches_in(img, templates, roi, *args):
+        yield emit(path, mode, m)
+
+
+def _iter_npc_matches_in(
+    img,
+    templates: list[Any],
+    roi,
+    cfg: dict,
+    masked_threshold: float,
+    plain_threshold: float,
+    use_yellow_mask: bool,
+    lower_hsv,
+    upper_hsv,
+):
+    """
+    按模板顺序 yield (path, mode, Match)，mode 为 masked / plain / plain_fallback。
+    本地模式用 iter_match_many：ROI 每帧只做一次 HSV 掩码 / 灰度转换，所有模板共享，逐个惰性匹配；
+    plain 回退只在第一次需要时才整批计算。开启 vision pool 时交给子进程并行算完再按原顺序返回。
+    """
+    with_fallback = use_yellow_mask and bool(cfg.get("npc_enable_plain_fallback", False))
+    # 1 = 全分辨率；2/4 = 先在缩小图上找候选再精修（大 npc_label_roi 时明显更快）
+    pyramid = max(1, int(cfg.get("npc_pyramid_scale", 1)))
+    pool = get_vision_pool()
+    if pool is not None:
+        labels = []
+        jobs = []
+        for path, _tpl in templates:
+            if use_yellow_mask:
+                labels.append((path, "masked"))
+                jobs.append(VisionJob(path, "masked", masked_threshold, lower_hsv, upper_hsv, pyramid))
+            else:
+                labels.append((path, "plain"))
+                jobs.append(VisionJob(path, "plain", plain_threshold, pyramid=pyramid))
+            if with_fallback:
+                labels.append((path, "plain_fallback"))
+                jobs.append(VisionJob(path, "plain", plain_threshold, pyramid=pyramid))
+        for (path, mode), match in zip(labels, pool.match(img, jobs, roi=roi)):
+            yield path, mode, match
+        return
+
+    tpls = [tpl for _path, tpl in templates]
+    if use_yellow_mask:
+        primary = iter_match_many(
+            img,
+            tpls,
+            threshold=masked_threshold,
+            roi=roi,
+            masked=True,
+            lower_hsv=lower_hsv,
+            upper_hsv=upper_hsv,
+            pyramid=pyramid,
+        )
+    else:
+        primary = iter_match_many(img, tpls, threshold=plain_threshold, roi=roi, pyramid=pyramid)
 
-    return best_ok
+    fallback = None
+    for index, ((path, _tpl), match) in enumerate(zip(templates, primary)):
+        yield path, "masked" if use_yellow_mask else "plain", match
+        if with_fallback:
+            if fallback is None:
+                fallback = match_many(img, tpls, threshold=plain_threshold, roi=roi, pyramid=pyramid).matches
+            yield path, "plain_fallback", fallback[index]
 
 
 def _execute_actions(ctx: BotContext, hwnd: int, clicker: HumanClicker, cfg: dict, actions: list[dict], tag: str):
@@ -1371,8 +1656,7 @@ def _execute_actions(ctx: BotContext, hwnd: int, clicker: HumanClicker, cfg: dic
 def _mask_blue_digits(img_bgr, cfg: dict):
     lower = tuple(int(v) for v in cfg.get("instance_kill_hsv_lower", [90, 80, 80]))
     upper = tuple(int(v) for v in cfg.get("instance_kill_hsv_upper", [135, 255, 255]))
-    hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
-    return cv2.inRange(hsv, lower, upper)
+    return mask_hsv_range(img_bgr, lower, upper)
 
 
 def _save_instance_kill_debug(crop, mask, cfg: dict, label: str):
@@ -1390,7 +1674,7 @@ def _save_instance_kill_debug(crop, mask, cfg: dict, label: str):
     ts = time.strftime("%Y%m%d_%H%M%S")
     ms = int((now - int(now)) * 1000)
     suffix = f"{label}_{ts}_{ms:03d}" if label else f"{ts}_{ms:03d}"
-    cv2.imwrite(os.path.join(out_dir, f"{suffix}_crop.png"), crop)
+    cv2.imwrite(os.path.join(out_dir, f"{suffix}_crop.png"), to_bgr(crop))
     cv2.imwrite(os.path.join(out_dir, f"{suffix}_mask.png"), mask)
 
 
@@ -1400,32 +1684,53 @@ def _read_instance_kill_count(
     kill_templates: dict[int, Any],
     label: str = "",
 ) -> tuple[int | None, float, float]:
-    roi = cfg.get("instance_kill_roi", [552, 80, 568, 96])
-    x1, y1, x2, y2 = (int(v) for v in roi)
-
-    img = grab_client(hwnd)
-    crop = img[y1:y2, x1:x2]
+    roi = tuple(int(v) for v in cfg.get("instance_kill_roi", [552, 80, 568, 96]))
+    crop = get_rois(hwnd, [roi])[0].img
     if crop.size == 0:
-        return None, 0.0
+        return None, 0.0, 0.0
+    # 击杀数没变时跳过掩码 + 逐模板匹配；模板集合和读数配置变了不能复用旧结果
+    return get_roi_cache().get_or_compute(
+        ("instance_kill", hwnd, roi) + _kill_result_key(kill_templates, cfg),
+        crop,
+        lambda: _match_instance_kill_count(crop, cfg, kill_templates, label),
+    )
+
 
+def _match_instance_kill_count(
+    crop,
+    cfg: dict,
+    kill_templates: dict[int, Any],
+    label: str = "",
+) -> tuple[int | None, float, float]:
     use_blue_mask = bool(cfg.get("instance_kill_use_blue_mask", True))
-    target = _mask_blue_digits(crop, cfg) if use_blue_mask else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    target = _mask_blue_digits(crop, cfg) if use_blue_mask else to_gray(crop)
     _save_instance_kill_debug(crop, target, cfg, label)
-    target_h, target_w = target.shape[:2]
     min_target_nonzero = int(cfg.get("instance_kill_min_nonzero_pixels_target", 6))
     target_nonzero = int(cv2.countNonZero(target))
     if target_nonzero < min_target_nonzero:
         return None, 0.0, 0.0
 
+    # glyph（默认）：按字符分割后逐位识别，任意 target_kill 都不用再做整图模板；
+    # 只在字形样本覆盖了所有可能出现的数字时启用（样本用 scripts/capture_kill_digits.py 制作），
+    # 否则以及任一字符分数/领先不够时回退整图模板
+    reader = str(cfg.get("instance_kill_reader", "glyph")).lower()
+    if reader == "glyph" and use_blue_mask:
+        classifier = _kill_digit_classifier(kill_templates, cfg)
+        if _kill_glyphs_cover(classifier, kill_templates, cfg):
+            value, score, margin = _ocr_instance_kill_count(target, cfg, classifier)
+            if value is not None or not bool(cfg.get("instance_kill_template_fallback", True)):
+                return value, score, margin
+
+    return _match_instance_kill_templates(target, cfg, kill_templates)
+
+
+def _match_instance_kill_templates(target, cfg: dict, kill_templates: dict[int, Any]) -> tuple[int | None, float, float]:
+    target_h, target_w = target.shape[:2]
     best_value = None
     best_score = -1.0
     second_best = -1.0
-    min_tpl_nonzero = int(cfg.get("instance_kill_min_nonzero_pixels_template", 6))
 
-    for value, tpl in kill_templates.items():
-        probe = _mask_blue_digits(tpl, cfg) if use_blue_mask else cv2.cvtColor(tpl, cv2.COLOR_BGR2GRAY)
-        if int(cv2.countNonZero(probe)) < min_tpl_nonzero:
-            continue
+    for value, probe in _kill_template_probes(kill_templates, cfg):
         th, tw = probe.shape[:2]
         if th > target_h or tw > target_w:
             continue
@@ -1448,6 +1753,148 @@ def _read_instance_kill_count(
     return best_value, best_score, max(margin, 0.0)
 
 
+_KILL_READERS: dict[tuple, tuple[dict, Any]] = {}
+
+
+def _kill_reader_key(kind: str, kill_templates: dict[int, Any], cfg: dict) -> tuple:
+    return (
+        kind,
+        id(kill_templates),
+        bool(cfg.get("instance_kill_use_blue_mask", True)),
+        tuple(cfg.get("instance_kill_hsv_lower", [90, 80, 80])),
+        tuple(cfg.get("instance_kill_hsv_upper", [135, 255, 255])),
+        int(cfg.get("instance_kill_min_nonzero_pixels_template", 6)),
+        str(cfg.get("instance_kill_digit_dir", "templates/kill_digits")),
+    )
+
+
+def _kill_result_key(kill_templates: dict[int, Any], cfg: dict) -> tuple:
+    """ROI 缓存键里区分读数结果的部分：模板集合、掩码/字形配置和读数方式、阈值。"""
+    return _kill_reader_key("result", kill_templates, cfg) + (
+        tuple(sorted(int(v) for v in kill_templates)),
+        str(cfg.get("instance_kill_reader", "glyph")).lower(),
+        bool(cfg.get("instance_kill_template_fallback", True)),
+        int(cfg.get("instance_kill_max_over_target", 3)),
+        int(cfg.get("instance_kill_min_nonzero_pixels_target", 6)),
+        float(cfg.get("instance_kill_threshold", 0.70)),
+        float(cfg.get("instance_kill_min_score_margin", 0.03)),
+        float(cfg.get("instance_kill_glyph_threshold", 0.80)),
+        float(cfg.get("instance_kill_glyph_min_margin", 0.10)),
+    )
+
+
+def _kill_template_probes(kill_templates: dict[int, Any], cfg: dict) -> list[tuple[int, Any]]:
+    """整图模板的掩码/灰度只算一次（之前每次轮询都对每张模板重新做掩码）。"""
+    key = _kill_reader_key("probes", kill_templates, cfg)
+    entry = _KILL_READERS.get(key)
+    if entry is None or entry[0] is not kill_templates:
+        use_blue_mask = bool(cfg.get("instance_kill_use_blue_mask", True))
+        min_tpl_nonzero = int(cfg.get("instance_kill_min_nonzero_pixels_template", 6))
+        probes = []
+        for value, tpl in kill_templates.items():
+            probe = _mask_blue_digits(tpl, cfg) if use_blue_mask else to_gray(tpl)
+            if int(cv2.countNonZero(probe)) >= min_tpl_nonzero:
+                probes.append((int(value), probe))
+        entry = (kill_templates, probes)
+        _KILL_READERS[key] = entry
+    return entry[1]
+
+
+def _kill_glyph_boxes(mask, cfg: dict) -> list[tuple[int, int, int, int]]:
+    """击杀数掩码的连通域，去掉面积太小/明显矮于数字的碎片，按 x 排序。"""
+    min_area = int(cfg.get("instance_kill_glyph_min_area", 3))
+    min_height_ratio = float(cfg.get("instance_kill_glyph_min_height_ratio", 0.6))
+    _num, _labels, stats, _ = cv2.connectedComponentsWithStats(mask, 8)
+    boxes = [(int(x), int(y), int(w), int(h)) for x, y, w, h, area in stats[1:] if area >= min_area]
+    if not boxes:
+        return []
+    max_h = max(h for _x, _y, _w, h in boxes)
+    return sorted((b for b in boxes if b[3] >= max_h * min_height_ratio), key=lambda b: b[0])
+
+
+def _kill_digit_classifier(kill_templates: dict[int, Any], cfg: dict) -> GlyphClassifier:
+    """
+    击杀数字形：instance_kill_digit_dir 下的 0-9.png（若有），再加上把 numberN 模板
+    按连通域切开、按 N 的各位数字标注得到的样本。只编译一次。
+    """
+    key = _kill_reader_key("glyphs", kill_templates, cfg)
+    entry = _KILL_READERS.get(key)
+    if entry is not None and entry[0] is kill_templates:
+        return entry[1]
+
+    samples = []
+    digit_dir = str(cfg.get("instance_kill_digit_dir", "templates/kill_digits"))
+    for digit in "0123456789":
+        img = load_template(os.path.join(digit_dir, f"{digit}.png"))
+        if img is not None:
+            samples.append((digit, _mask_blue_digits(img, cfg), f"{digit}.png"))
+
+    for value, tpl in sorted(kill_templates.items()):
+        mask = _mask_blue_digits(tpl, cfg)
+        boxes = _kill_glyph_boxes(mask, cfg)
+        text = str(int(value))
+        if len(boxes) != len(text):
+            continue
+        for digit, (bx, by, bw, bh) in zip(text, boxes):
+            samples.append((digit, mask[by:by + bh, bx:bx + bw], f"number{value}"))
+
+    # 模板文件名和画面内容对不上时（切出来的字形和已有的另一个数字几乎一样），丢掉这个样本
+    conflict = float(cfg.get("instance_kill_glyph_conflict_score", 0.95))
+    accepted: list[tuple[str, Any]] = []
+    for digit, glyph, source in samples:
+        norm = normalize_glyph(glyph)
+        if norm is None:
+            continue
+        if accepted:
+            labels, scores = GlyphClassifier.from_samples(accepted).classify(norm[None])
+            if labels[0] != digit and float(scores[0]) >= conflict:
+                print(f"[INSTANCE] kill-count glyph '{digit}' from {source} looks like '{labels[0]}', skipped")
+                continue
+        accepted.append((digit, glyph))
+
+    classifier = GlyphClassifier.from_samples(accepted)
+    print(f"[INSTANCE] kill-count glyphs: samples={len(classifier)} digits={''.join(sorted(set(classifier.labels)))}")
+    _KILL_READERS[key] = (kill_templates, classifier)
+    return classifier
+
+
+def _kill_glyphs_cover(classifier: GlyphClassifier, kill_templates: dict[int, Any], cfg: dict) -> bool:
+    """
+    等待击杀数时可能读到 0 ~ 最大目标数 + instance_kill_max_over_target 之间的任何值，
+    这些值用到的每个数字都要有字形样本；缺样本的数字会被当成最像的已知数字，宁可不用 glyph。
+    """
+    key = _kill_reader_key("coverage", kill_templates, cfg) + (int(cfg.get("instance_kill_max_over_target", 3)),)
+    entry = _KILL_READERS.get(key)
+    if entry is not None and entry[0] is kill_templates:
+        return entry[1]
+
+    top = max((int(v) for v in kill_templates), default=0) + int(cfg.get("instance_kill_max_over_target", 3))
+    required = {digit for value in range(top + 1) for digit in str(value)}
+    missing = "".join(sorted(required - set(classifier.labels)))
+    if missing:
+        print(f"[INSTANCE] kill-count glyphs missing digits {missing}, use template reader")
+    _KILL_READERS[key] = (kill_templates, not missing)
+    return not missing
+
+
+def _ocr_instance_kill_count(mask, cfg: dict, classifier: GlyphClassifier) -> tuple[int | None, float, float]:
+    boxes = _kill_glyph_boxes(mask, cfg)
+    if not boxes or len(boxes) > int(cfg.get("instance_kill_max_digits", 3)):
+        return None, 0.0, 0.0
+    chars = classifier.normalize_boxes(mask, boxes)
+    if chars is None:
+        return None, 0.0, 0.0
+
+    digits, scores, margins = classifier.classify_with_margin(chars)
+    score = float(scores.min())
+    margin = float(margins.min())
+    threshold = float(cfg.get("instance_kill_glyph_threshold", 0.80))
+    min_margin = float(cfg.get("instance_kill_glyph_min_margin", 0.10))
+    if score < threshold or margin < min_margin:
+        return None, max(score, 0.0), max(margin, 0.0)
+    return int("".join(digits)), score, margin
+
+
 def _wait_for_instance_kill_target(
     ctx: BotContext,
     hwnd: int,
@@ -1544,8 +1991,8 @@ def _wait_for_instance_end_marker(ctx: BotContext, hwnd: int, cfg: dict, end_tem
 
     elapsed = 0.0
     while elapsed <= max_wait and not ctx.control.stop:
-        img = grab_client(hwnd)
-        m = find_template(img, end_template, threshold=threshold, roi=roi)
+        img, offset = _grab_for_roi(hwnd, roi)
+        m = find_template_hot("end_marker", img, end_template, threshold=threshold, roi=roi, offset=offset, scope=hwnd)
         if m.ok:
             print(f"[INSTANCE] {label} end-marker detected score={m.score:.3f} at {elapsed:.1f}s")
             return True
@@ -1594,8 +2041,8 @@ def _watch_instance_end_and_return(
 
         # End marker is now a helper signal, not a blocking gate.
         if (not i_pressed) and end_template is not None:
-            img = grab_client(hwnd)
-            m = find_template(img, end_template, threshold=end_threshold, roi=end_roi)
+            img, offset = _grab_for_roi(hwnd, end_roi)
+            m = find_template_hot("end_marker", img, end_template, threshold=end_threshold, roi=end_roi, offset=offset, scope=hwnd)
             if m.ok:
                 with ForegroundBlock(hwnd, max_wait=0.6):
                     ctx.input.press(hwnd, "i", hold=float(cfg.get("instance_start_follow_hold", 0.05)))
@@ -1885,7 +2332,7 @@ def _handle_coordinate(
             static_interval = float(cfg.get("npc_moving_static_confirm_interval", 0.3))
             elapsed = 0.0
             while elapsed <= static_timeout and not ctx.control.stop:
-                img = grab_client(hwnd)
+                img = get_frame(hwnd)
                 m = _scan_npc_once(img, npc_templates, cfg)
                 if m is not None:
                     npc_match = m
@@ -1996,10 +2443,13 @@ def run(ctx: BotContext):
     instance_end_template_path = cfg.get("templates", {}).get("instance_end", "templates/end.png")
     instance_end_template = _load_single_template(instance_end_template_path)
 
-    clicker = HumanClicker(
-        hold_mean=float(cfg.get("hold_mean", 0.10)),
-        hold_jitter=float(cfg.get("hold_jitter", 0.02)),
-        hover=(float(cfg.get("hover_min", 0.04)), float(cfg.get("hover_max", 0.10))),
+    clicker = maybe_record(
+        HumanClicker(
+            hold_mean=float(cfg.get("hold_mean", 0.10)),
+            hold_jitter=float(cfg.get("hold_jitter", 0.02)),
+            hover=(float(cfg.get("hover_min", 0.04)), float(cfg.get("hover_max", 0.10))),
+        ),
+        "clicker",
     )
 
     print(f"[*] cod_instance start | maps={map_order}")
@@ -2100,3 +2550,8 @@ def run(ctx: BotContext):
                     coord,
                     do_travel=True,
                 )
+
+    print(
+        f"[*] cod_instance stopped | {frame_stats()} | {roi_cache_stats()} | {hotspot_stats()} | "
+        f"{reading_cache_stats()} | {template_scheduler_stats()}"
+    )
@@ -4,7 +4,10 @@ from typing import Any
 import cv2
 import numpy as np
 
-from core.capture_win32 import grab_client
+from core.frames import get_rois
+from core.hp_bar import HpBarReading, HpTrend, analyze_hp_bar
+from core.color_mask import color_masks_enabled, compile_color_mask
+from core.vision import to_hsv
 
 
 @dataclass
@@ -16,50 +19,45 @@ class BotContext:
     config: dict
 
 
-def _longest_true_run(values) -> int:
-    best = 0
-    current = 0
-    for value in values:
-        if value:
-            current += 1
-            best = max(best, current)
-        else:
-            current = 0
-    return best
-
-
-def _has_monster_hp(hwnd: int, cfg: dict) -> tuple[bool, int, int]:
-    x1, y1, x2, y2 = [int(v) for v in cfg.get("monster_hp_roi", [276, 23, 404, 34])]
-    img = grab_client(hwnd)
-    h, w = img.shape[:2]
-    x1 = max(0, min(x1, w))
-    x2 = max(0, min(x2, w))
-    y1 = max(0, min(y1, h))
-    y2 = max(0, min(y2, h))
-    if x2 <= x1 or y2 <= y1:
-        return False, 0, 0
-
-    crop = img[y1:y2, x1:x2]
-    hsv = cv2.cvtColor(crop, cv2.COLOR_BGR2HSV)
-
-    lower1 = np.array(cfg.get("monster_hp_red_lower_1", [0, 80, 80]), dtype=np.uint8)
-    upper1 = np.array(cfg.get("monster_hp_red_upper_1", [12, 255, 255]), dtype=np.uint8)
-    lower2 = np.array(cfg.get("monster_hp_red_lower_2", [170, 80, 80]), dtype=np.uint8)
-    upper2 = np.array(cfg.get("monster_hp_red_upper_2", [179, 255, 255]), dtype=np.uint8)
-    hsv_mask = cv2.inRange(hsv, lower1, upper1) | cv2.inRange(hsv, lower2, upper2)
-
-    b, g, r = cv2.split(crop)
+def _red_hp_mask(crop, cfg: dict):
+    lower1 = cfg.get("monster_hp_red_lower_1", [0, 80, 80])
+    upper1 = cfg.get("monster_hp_red_upper_1", [12, 255, 255])
+    lower2 = cfg.get("monster_hp_red_lower_2", [170, 80, 80])
+    upper2 = cfg.get("monster_hp_red_upper_2", [179, 255, 255])
     red_delta = int(cfg.get("monster_hp_red_delta", 35))
     red_min = int(cfg.get("monster_hp_red_min_value", 90))
+
+    if color_masks_enabled(multi_range=True):
+        # 两段红色 HSV + BGR 红色规则编译进同一张查找表，每帧一次 gather
+        lut = compile_color_mask(
+            ((lower1, upper1), (lower2, upper2)),
+            bgr_rule=lambda b, g, r: (r >= red_min) & (r > g + red_delta) & (r > b + red_delta),
+            rule_key=("monster_hp_red", red_min, red_delta),
+        )
+        return lut.apply(crop)
+
+    hsv = to_hsv(crop)
+    hsv_mask = cv2.inRange(hsv, np.array(lower1, dtype=np.uint8), np.array(upper1, dtype=np.uint8)) | cv2.inRange(
+        hsv, np.array(lower2, dtype=np.uint8), np.array(upper2, dtype=np.uint8)
+    )
+
+    # 直接取通道视图（兼容 BGR/BGRA），不做 split 拷贝；转 int16 避免 g + delta 在 uint8 上溢出
+    b, g, r = crop[:, :, 0].astype(np.int16), crop[:, :, 1].astype(np.int16), crop[:, :, 2].astype(np.int16)
     bgr_mask = ((r >= red_min) & (r > g + red_delta) & (r > b + red_delta)).astype(np.uint8) * 255
-    mask = hsv_mask | bgr_mask
+    return hsv_mask | bgr_mask
+
 
-    red_pixels = int(cv2.countNonZero(mask))
-    min_column_pixels = int(cfg.get("monster_hp_min_red_pixels_per_column", 3))
-    min_run_columns = int(cfg.get("monster_hp_min_red_run_columns", 2))
-    red_per_column = np.count_nonzero(mask, axis=0)
-    red_run_columns = _longest_true_run(red_per_column >= min_column_pixels)
-    return red_run_columns >= min_run_columns, red_pixels, red_run_columns
+def _read_monster_hp(hwnd: int, cfg: dict) -> HpBarReading:
+    roi = [int(v) for v in cfg.get("monster_hp_roi", [276, 23, 404, 34])]
+    crop = get_rois(hwnd, [roi])[0].img
+    if crop.size == 0:
+        return HpBarReading(False, 0.0, 0, 0)
+
+    return analyze_hp_bar(
+        _red_hp_mask(crop, cfg),
+        min_column_pixels=int(cfg.get("monster_hp_min_red_pixels_per_column", 3)),
+        min_run_columns=int(cfg.get("monster_hp_min_red_run_columns", 2)),
+    )
 
 
 def run(ctx: BotContext):
@@ -72,36 +70,69 @@ def run(ctx: BotContext):
     key_hold = float(cfg.get("combat_key_hold", 0.06))
     log_interval = int(cfg.get("hp_debug_log_interval", 20))
     empty_confirm_hits = int(cfg.get("monster_hp_empty_confirm_hits", 3))
+    # 按血量下降速度预测击杀：预计在下一次攻击间隔内归零时，提前在归零时刻复查，
+    # 并且只需 predicted_confirm_hits 次空血就切目标
+    predict_enabled = bool(cfg.get("monster_hp_predict_enabled", True))
+    predict_max_fill = float(cfg.get("monster_hp_predict_max_fill", 0.25))
+    predict_lead = float(cfg.get("monster_hp_predict_lead", 0.05))
+    predicted_confirm_hits = int(cfg.get("monster_hp_predicted_confirm_hits", 1))
+    predict_min_sleep = float(cfg.get("monster_hp_predict_min_sleep", 0.15))
+    trend = HpTrend(window=int(cfg.get("monster_hp_trend_window", 6)))
 
     print("[*] kill_switch_combat started: F8/Pause start-pause, F9 stop")
     print(f"[*] hp_roi={cfg.get('monster_hp_roi', [276, 23, 404, 34])}")
 
+    # 血量趋势的时间轴用累计的 sleep 时长（与 ctx.clock 一致，回放的虚拟时钟下同样成立）
+    elapsed = 0.0
+    last_attack = None
     ticks = 0
     empty_hits = 0
+    predicted_kill = False
     while not ctx.control.stop:
         if not ctx.control.running:
             ctx.clock.sleep(0.05)
+            elapsed += 0.05
             continue
 
         hwnd = ctx.binder.ensure()
-        has_hp, red_pixels, red_run_columns = _has_monster_hp(hwnd, cfg)
+        hp = _read_monster_hp(hwnd, cfg)
         ticks += 1
+        if hp.present:
+            trend.add(elapsed, hp.fill)
+        eta = trend.eta() if hp.present else None
         if log_interval > 0 and ticks % log_interval == 1:
+            eta_text = f"{eta:.2f}s" if eta is not None else "-"
             print(
-                f"[COMBAT] hp_red_pixels={red_pixels}, red_run_columns={red_run_columns}, "
-                f"has_hp={has_hp}, "
+                f"[COMBAT] hp_red_pixels={hp.red_pixels}, red_run_columns={hp.run_columns}, "
+                f"has_hp={hp.present}, fill={hp.fill:.2f}, rate={trend.rate():+.3f}/s, eta={eta_text}, "
                 f"empty_hits={empty_hits}/{empty_confirm_hits}"
             )
 
-        if has_hp:
+        if hp.present:
             empty_hits = 0
-            ctx.input.press(hwnd, attack_key, hold=key_hold)
-            ctx.clock.sleep(attack_gap)
+            # 预测复查会缩短轮询间隔，攻击键仍按 attack_gap 限频，不会在残血时连按
+            if last_attack is None or elapsed - last_attack >= attack_gap:
+                ctx.input.press(hwnd, attack_key, hold=key_hold)
+                last_attack = elapsed
+            predicted_kill = (
+                predict_enabled and eta is not None and hp.fill <= predict_max_fill and eta <= attack_gap
+            )
+            if predicted_kill:
+                wait = min(attack_gap, max(predict_min_sleep, eta + predict_lead))
+                print(f"[COMBAT] kill predicted in {eta:.2f}s (fill={hp.fill:.2f}), re-check in {wait:.2f}s")
+            else:
+                wait = attack_gap
         else:
             empty_hits += 1
-            if empty_hits < empty_confirm_hits:
-                ctx.clock.sleep(switch_gap)
-                continue
-            ctx.input.press(hwnd, switch_key, hold=key_hold)
-            empty_hits = 0
-            ctx.clock.sleep(switch_settle)
+            needed = predicted_confirm_hits if predicted_kill else empty_confirm_hits
+            if empty_hits < needed:
+                wait = switch_gap
+            else:
+                ctx.input.press(hwnd, switch_key, hold=key_hold)
+                empty_hits = 0
+                predicted_kill = False
+                last_attack = None
+                trend.reset()
+                wait = switch_settle
+        ctx.clock.sleep(wait)
+        elapsed += wait
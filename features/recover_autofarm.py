@@ -6,8 +6,10 @@ import cv2
 from dataclasses import dataclass
 from typing import Any
 
-from core.capture_win32 import grab_client
-from core.vision import find_template
+from core.frames import get_frame, get_rois
+from core.vision import find_template, to_bgr
+from core.recorder import maybe_record
+from core.templates import compile_template
 from core.clicker_human import HumanClicker, ForegroundBlock
 
 
@@ -21,7 +23,7 @@ class BotContext:
 
 
 def _load_tpl(path: str):
-    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    img = compile_template(path)
     if img is None:
         raise RuntimeError(f"模板加载失败: {path}")
     return img
@@ -40,7 +42,7 @@ def _save_debug_roi(img, roi, name="debug"):
     crop = img[y1:y2, x1:x2]
     ts = time.strftime("%Y%m%d_%H%M%S")
     path = f"debug/{name}_{ts}.png"
-    cv2.imwrite(path, crop)
+    cv2.imwrite(path, to_bgr(crop))
     print(f"[DEBUG] 保存 ROI 截图: {path}")
 
 
@@ -64,15 +66,15 @@ def _match_map_region(hwnd: int, tpl_map, threshold=0.85, roi=None):
     Returns:
         匹配结果对象 (包含 ok, score 等属性)
     """
-    # 截取游戏窗口
-    img = grab_client(hwnd)
-    
     # 如果没有指定ROI，使用默认的右上角地图区域
     if roi is None:
         roi = (867, 15, 955, 29)  # (x1, y1, x2, y2)
     
+    # 只截取地图 ROI
+    frame = get_rois(hwnd, [roi])[0]
+    
     # 执行模板匹配
-    m = find_template(img, tpl_map, threshold=threshold, roi=roi)
+    m = find_template(frame.img, tpl_map, threshold=threshold, roi=roi, offset=frame.offset)
     
     return m
 
@@ -297,10 +299,13 @@ def run(ctx: BotContext):
     target = cfg.get("target", {})
 
     # 人性化点击器（你也可以把这些参数搬到 yaml 里再读取）
-    clicker = HumanClicker(
-        hold_mean=float(cfg.get("hold_mean", 0.10)),
-        hold_jitter=float(cfg.get("hold_jitter", 0.02)),
-        hover=(float(cfg.get("hover_min", 0.04)), float(cfg.get("hover_max", 0.10))),
+    clicker = maybe_record(
+        HumanClicker(
+            hold_mean=float(cfg.get("hold_mean", 0.10)),
+            hold_jitter=float(cfg.get("hold_jitter", 0.02)),
+            hover=(float(cfg.get("hover_min", 0.04)), float(cfg.get("hover_max", 0.10))),
+        ),
+        "clicker",
     )
 
 
@@ -315,7 +320,7 @@ def run(ctx: BotContext):
         hwnd = ctx.binder.ensure()
 
         # ===== 1) 检测死亡弹窗 =====
-        img = grab_client(hwnd)
+        img = get_frame(hwnd)
 
         if "chuqiao" not in clicks:
             raise RuntimeError("配置缺少 clicks.chuqiao")
@@ -409,7 +414,7 @@ def run(ctx: BotContext):
             # 1. 先检测是否有出窍弹窗（刚被打死，还没回地府）
             print("[验证] 流程3前检测是否有出窍弹窗...")
             ctx.clock.sleep(1)
-            img = grab_client(hwnd)
+            img = get_frame(hwnd)
             roi = _roi_around_point(img)
             m_chuqiao = find_template(img, tpl_chuqiao, threshold=thr, roi=roi)
             
@@ -1,10 +1,21 @@
 import argparse
+import time
+
 import yaml
 
 from core.window import WindowBinder
 from core.input_win32 import InputController
 from core.timing import HumanClock
 from core.hotkeys import RunControl, install_hotkeys
+from core.color_mask import configure_color_masks
+from core.frames import configure_frames
+from core.hotspots import configure_hotspots, save_hotspots
+from core.recorder import maybe_record, start_recording, stop_recording
+from core.roi_cache import configure_roi_cache
+from core.template_scheduler import configure_template_scheduler, save_template_scheduler
+from core.orchestrator import ClientSpec, Orchestrator
+from core.templates import template_stats
+from core.vision_pool import close_vision_pool, configure_vision_pool
 
 from features.macro_combat import BotContext
 import features.macro_combat as macro_combat
@@ -31,33 +42,145 @@ def load_profiles(path: str) -> dict:
         return yaml.safe_load(f) or {}
 
 
+def _get_profile(profiles: dict, name: str, scene: str | None) -> dict:
+    if name not in profiles:
+        raise RuntimeError(f"找不到 profile: {name}，可用: {list(profiles.keys())}")
+    profile = dict(profiles[name])
+    if scene:
+        profile["scene"] = scene
+    return profile
+
+
+# 录制时默认保存的整帧区域：各检测器实际读取的 ROI（未配置的跳过）
+_RECORD_ROI_KEYS = ("scene_roi", "current_coord_roi", "instance_kill_roi", "npc_label_roi", "monster_hp_roi")
+
+
+def _record_rois(profile: dict) -> list:
+    configured = profile.get("record_rois")
+    if configured:
+        return configured
+    rois = [profile[key] for key in _RECORD_ROI_KEYS if profile.get(key)]
+    if not profile.get("npc_label_roi") and profile.get("npc_roi"):
+        rois.append(profile["npc_roi"])
+    return rois
+
+
+def _run_multi(args, profiles: dict, input_ctl, control):
+    titles = [t.strip() for t in args.titles.split(",") if t.strip()]
+    names = [p.strip() for p in args.profiles.split(",")] if args.profiles else [args.profile] * len(titles)
+    if len(names) != len(titles):
+        raise RuntimeError(f"--profiles 数量({len(names)})与 --titles 数量({len(titles)})不一致")
+
+    clients = []
+    for title, name in zip(titles, names):
+        profile = _get_profile(profiles, name, args.scene)
+        clients.append(
+            ClientSpec(
+                title=title,
+                mode=args.mode,
+                profile_name=name,
+                profile=profile,
+                run=FEATURES[args.mode],
+                binder=WindowBinder(title),
+                clock=HumanClock(jitter=float(profile.get("jitter", 0.10))),
+            )
+        )
+
+    def make_ctx(spec: ClientSpec, clock):
+        return BotContext(binder=spec.binder, input=input_ctl, clock=clock, control=control, config=spec.profile)
+
+    print(f"[*] multi-client | mode={args.mode} | " + " | ".join(f"{c.title}:{c.profile_name}" for c in clients))
+    print("[*] 按 F8 或 Pause 开始/暂停，按 F9 退出")
+    Orchestrator(clients, make_ctx).run()
+    print(f"[*] {template_stats()}")
+
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--title", required=True, help="目标窗口标题（完全一致）")
+    parser.add_argument("--title", default=None, help="目标窗口标题（完全一致）")
+    parser.add_argument("--titles", default=None, help="多开：逗号分隔的窗口标题，一个进程轮流驱动")
+    parser.add_argument("--profiles", default=None, help="多开：逗号分隔的 profile，与 --titles 一一对应（缺省都用 --profile）")
     parser.add_argument("--mode", default="macro_basic", choices=FEATURES.keys())
     parser.add_argument("--profile", default="default", help="profiles.yaml 里的 profile 名称")
     parser.add_argument("--config", default="config/profiles.yaml", help="配置文件路径")
     parser.add_argument("--scene", default=None, choices=["xueyuan", "huanglong"], help="世界地图目标场景")
+    parser.add_argument("--record", default=None, help="录制本次会话（帧 ROI + 输入）到该文件，供离线回放")
     args = parser.parse_args()
+    if not args.title and not args.titles:
+        parser.error("需要 --title 或 --titles")
 
     profiles = load_profiles(args.config)
-    if args.profile not in profiles:
-        raise RuntimeError(f"找不到 profile: {args.profile}，可用: {list(profiles.keys())}")
+    # 多开时全局设置（截图缓存/录制等）取第一个客户端的 profile
+    first_name = args.profiles.split(",")[0].strip() if args.titles and args.profiles else args.profile
+    profile = _get_profile(profiles, first_name, args.scene)
 
-    profile = profiles[args.profile]
-
-    if args.scene:
-        profile["scene"] = args.scene
-
-    binder = WindowBinder(args.title)
     input_ctl = InputController()
     clock = HumanClock(jitter=float(profile.get("jitter", 0.10)))
+    # 同一轮循环内多个检测器共享截图（秒）；0 表示每次都重新截图
+    # capture_worker_fps > 0：后台线程按该帧率采集，检测器直接取最新帧
+    provider = configure_frames(
+        max_age=float(profile.get("frame_cache_max_age", 0.05)),
+        worker_fps=float(profile.get("capture_worker_fps", 0)) if profile.get("capture_worker_enabled", False) else 0.0,
+        worker_slots=int(profile.get("capture_worker_slots", 3)),
+    )
+    # ROI 像素未变化时复用上次的匹配结果（默认整块 ROI 完全一致；tolerance>0 时为缩小灰度图的平均绝对差）
+    configure_roi_cache(
+        step=int(profile.get("roi_dirty_step", 2)),
+        tolerance=float(profile.get("roi_dirty_tolerance", 0.0)),
+        enabled=bool(profile.get("roi_dirty_enabled", True)),
+    )
+    # HSV 颜色掩码预编译成 BGR 查找表：默认只用于多段掩码（怪物血条红色）；
+    # color_lut_bits=8 与 cvtColor+inRange 完全一致，更小的 bits 表更小但有损
+    configure_color_masks(
+        enabled=bool(profile.get("color_lut_enabled", False)),
+        multi_range=bool(profile.get("color_lut_multi_range", True)),
+        bits=int(profile.get("color_lut_bits", 8)),
+    )
+    # vision_pool_workers > 0：NPC 多模板匹配交给子进程池（帧走共享内存）
+    configure_vision_pool(int(profile.get("vision_pool_workers", 0)))
+    # NPC 标签/场景/结束标记先在历史命中位置聚成的几个小窗口里找，没命中再扫完整 ROI；热点跨次运行保存
+    configure_hotspots(
+        path=profile.get("roi_hotspots_path", "debug/roi_hotspots.json"),
+        margin=int(profile.get("roi_hotspots_margin", 16)),
+        min_hits=int(profile.get("roi_hotspots_min_hits", 3)),
+        enabled=bool(profile.get("roi_hotspots_enabled", True)),
+        cluster_gap=int(profile.get("roi_hotspots_cluster_gap", 32)),
+        max_windows=int(profile.get("roi_hotspots_max_windows", 4)),
+    )
+    # NPC 模板按历史命中率排序、命中即停，只跳过从未命中的淘汰模板（轮转探索位照样会试）；
+    # npc_sched_max_active > 0 时另外限制每轮模板数；统计跨次运行保存
+    configure_template_scheduler(
+        path=profile.get("npc_sched_path", "debug/npc_template_stats.json"),
+        max_active=int(profile.get("npc_sched_max_active", 0)),
+        retire_after=int(profile.get("npc_sched_retire_after", 200)),
+        enabled=bool(profile.get("npc_sched_enabled", True)),
+    )
+
+    record_path = args.record or profile.get("record_session_path")
+    if record_path:
+        provider.recorder = start_recording(
+            time.strftime(str(record_path)),
+            rois=_record_rois(profile),
+            keyframe_every=int(profile.get("record_keyframe_every", 100)),
+        )
+        input_ctl = maybe_record(input_ctl, "input")
+        print(f"[*] recording session to {provider.recorder.path}")
 
     control = RunControl()
     install_hotkeys(control, start_pause_key="F8", stop_key="F9", alt_pause_key="pause")
 
+    if args.titles:
+        try:
+            _run_multi(args, profiles, input_ctl, control)
+        finally:
+            stop_recording()
+            close_vision_pool()
+            save_hotspots()
+            save_template_scheduler()
+        return
+
     ctx = BotContext(
-        binder=binder,
+        binder=WindowBinder(args.title),
         input=input_ctl,
         clock=clock,
         control=control,
@@ -66,7 +189,13 @@ def main():
 
     print(f"[*] title={args.title} | mode={args.mode} | profile={args.profile}")
     print("[*] 按 F8 或 Pause 开始/暂停，按 F9 退出")
-    FEATURES[args.mode](ctx)
+    try:
+        FEATURES[args.mode](ctx)
+    finally:
+        stop_recording()
+        close_vision_pool()
+        save_hotspots()
+        save_template_scheduler()
 
 
 if __name__ == "__main__":
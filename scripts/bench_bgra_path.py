@@ -0,0 +1,86 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.capture_session import CaptureSession, ReplayBackend
+from core.vision import find_template, find_template_masked, mask_hsv_range, to_gray
+
+COORD_ROI = (894, 33, 948, 46)
+KILL_ROI = (553, 97, 567, 110)
+SCENE_ROI = (867, 15, 955, 29)
+NPC_ROI = (50, 40, 974, 742)
+
+
+def _poll(img, npc_tpl, scene_tpl):
+    # 一次典型轮询：坐标灰度二值 + 击杀数蓝色掩码 + 场景匹配 + NPC 黄字掩码匹配
+    x1, y1, x2, y2 = COORD_ROI
+    cv2.threshold(to_gray(img[y1:y2, x1:x2]), 185, 255, cv2.THRESH_BINARY)
+    x1, y1, x2, y2 = KILL_ROI
+    mask_hsv_range(img[y1:y2, x1:x2], (90, 80, 80), (135, 255, 255))
+    find_template(img, scene_tpl, threshold=0.9, roi=SCENE_ROI)
+    find_template_masked(img, npc_tpl, threshold=0.82, roi=NPC_ROI, lower_hsv=(18, 100, 180), upper_hsv=(36, 255, 255))
+
+
+def _measure(fn, n: int) -> tuple[float, float]:
+    tracemalloc.start()
+    total = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        total += max(0, peak - before)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.stop()
+    return elapsed / n * 1000.0, total / n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Bytes allocated per poll: legacy BGR capture vs contiguous BGRA path")
+    ap.add_argument("--frame", default=None, help="a captured 1024x768 frame (PNG); default synthetic")
+    ap.add_argument("--npc-template", default="templates/cod_npc_1.png")
+    ap.add_argument("--scene-template", default="templates/map_taihu.png")
+    ap.add_argument("-n", type=int, default=50)
+    args = ap.parse_args()
+
+    if args.frame:
+        backend = ReplayBackend.from_paths([args.frame])
+    else:
+        rng = np.random.default_rng(0)
+        backend = ReplayBackend([rng.integers(0, 256, (768, 1024, 3), dtype=np.uint8)])
+    npc_tpl = cv2.imread(args.npc_template, cv2.IMREAD_COLOR)
+    scene_tpl = cv2.imread(args.scene_template, cv2.IMREAD_COLOR)
+    if npc_tpl is None or scene_tpl is None:
+        raise RuntimeError("template missing")
+
+    frame_bgra = backend.frames[0]
+
+    def legacy():
+        # 旧路径：GetBitmapBits -> bytes -> frombuffer -> [:, :, :3]（非连续）
+        img = np.frombuffer(frame_bgra.tobytes(), dtype=np.uint8).reshape(frame_bgra.shape)[:, :, :3]
+        _poll(img, npc_tpl, scene_tpl)
+
+    session = CaptureSession(0, backend)
+    session.grab()
+
+    def bgra():
+        _poll(session.grab(), npc_tpl, scene_tpl)
+
+    legacy_ms, legacy_bytes = _measure(legacy, args.n)
+    bgra_ms, bgra_bytes = _measure(bgra, args.n)
+    print(f"legacy BGR : {legacy_ms:.2f} ms/poll, {legacy_bytes / 1024:.1f} KiB allocated/poll")
+    print(f"BGRA path  : {bgra_ms:.2f} ms/poll, {bgra_bytes / 1024:.1f} KiB allocated/poll")
+
+
+if __name__ == "__main__":
+    main()
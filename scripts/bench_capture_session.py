@@ -0,0 +1,88 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.capture_session import CaptureSession, ReplayBackend
+
+
+def _legacy_grab(frame_bgra: np.ndarray) -> np.ndarray:
+    # 模拟旧 grab_client：GetBitmapBits -> bytes -> frombuffer -> [:, :, :3]
+    bmpstr = frame_bgra.tobytes()
+    img = np.frombuffer(bmpstr, dtype=np.uint8)
+    img = img.reshape(frame_bgra.shape)
+    return img[:, :, :3]
+
+
+def _measure(fn, n: int) -> tuple[float, float]:
+    tracemalloc.start()
+    total = 0
+    t0 = time.perf_counter()
+    for _ in range(n):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+        total += max(0, peak - before)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.stop()
+    return elapsed / n * 1000.0, total / n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark CaptureSession vs per-call allocation on replayed frames")
+    ap.add_argument("--frames", nargs="*", default=[], help="PNG frames to replay; default synthetic 1024x768")
+    ap.add_argument("--width", type=int, default=1024)
+    ap.add_argument("--height", type=int, default=768)
+    ap.add_argument("-n", type=int, default=200)
+    args = ap.parse_args()
+
+    if args.frames:
+        backend = ReplayBackend.from_paths(args.frames)
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, (args.height, args.width, 3), dtype=np.uint8) for _ in range(4)]
+        backend = ReplayBackend(frames)
+
+    legacy_frames = backend.frames
+    state = {"i": 0}
+
+    def legacy():
+        frame = legacy_frames[state["i"] % len(legacy_frames)]
+        state["i"] += 1
+        _legacy_grab(frame)
+
+    session = CaptureSession(0, backend)
+    session.grab()
+
+    legacy_ms, legacy_bytes = _measure(legacy, args.n)
+    session_ms, session_bytes = _measure(session.grab, args.n)
+
+    # 典型检测 ROI：坐标 / 击杀数 / 场景名
+    rois = [(894, 33, 948, 46), (553, 97, 567, 110), (867, 15, 955, 29)]
+
+    def full_then_crop():
+        img = session.grab()
+        for x1, y1, x2, y2 in rois:
+            img[y1:y2, x1:x2].copy()
+
+    crop_ms, crop_bytes = _measure(full_then_crop, args.n)
+    roi_ms, roi_bytes = _measure(lambda: session.grab_rois(rois), args.n)
+
+    print(f"frames={len(legacy_frames)} n={args.n}")
+    print(f"legacy : {legacy_ms:.3f} ms/grab, {legacy_bytes / 1024:.1f} KiB allocated/grab")
+    print(f"session: {session_ms:.3f} ms/grab, {session_bytes / 1024:.1f} KiB allocated/grab")
+    print(f"full+crop x{len(rois)}: {crop_ms:.3f} ms/poll, {crop_bytes / 1024:.1f} KiB allocated/poll")
+    print(f"grab_rois x{len(rois)}: {roi_ms:.3f} ms/poll, {roi_bytes / 1024:.1f} KiB allocated/poll")
+    print(f"session stats: {session.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+import time
+from glob import glob
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.capture_session import CaptureSession, SyntheticBackend
+from core.color_mask import ColorMask
+
+# (名称, HSV 段, ROI)：与 profiles_cod_v3 / kill_switch_combat 的默认值一致
+CASES = [
+    ("npc_yellow", [((18, 100, 180), (36, 255, 255))], (50, 40, 974, 742)),
+    ("kill_blue", [((90, 80, 80), (135, 255, 255))], (553, 97, 567, 110)),
+    ("monster_red", [((0, 80, 80), (12, 255, 255)), ((170, 80, 80), (179, 255, 255))], (276, 23, 404, 34)),
+]
+
+
+def _red_rule(b, g, r):
+    return (r >= 90) & (r > g + 35) & (r > b + 35)
+
+
+def _opencv_mask(img, ranges, rule):
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    mask = None
+    for lower, upper in ranges:
+        part = cv2.inRange(hsv, np.array(lower, dtype=np.uint8), np.array(upper, dtype=np.uint8))
+        mask = part if mask is None else mask | part
+    if rule is not None:
+        b, g, r = (img[:, :, i].astype(np.int16) for i in range(3))
+        mask |= rule(b, g, r).astype(np.uint8) * 255
+    return mask
+
+
+def _timeit(fn, iters: int) -> float:
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(iters):
+        fn()
+    return (time.perf_counter() - t0) * 1e6 / iters
+
+
+def main():
+    ap = argparse.ArgumentParser(description="HSV 颜色掩码：cvtColor+inRange 与预编译 BGR 查找表的速度/一致性对比")
+    ap.add_argument("--frames", default="debug/**/*_crop.png", help="调试保存的截图；没有时用合成帧")
+    ap.add_argument("--bits", default="6,7,8")
+    ap.add_argument("--iters", type=int, default=200)
+    args = ap.parse_args()
+
+    paths = sorted(glob(args.frames, recursive=True))
+    if paths:
+        # 截图本身就是 ROI：对每张图整张做掩码
+        images = [("file", cv2.cvtColor(cv2.imread(p, cv2.IMREAD_COLOR), cv2.COLOR_BGR2BGRA)) for p in paths[:50]]
+        print(f"images={len(images)} from {args.frames}")
+    else:
+        frame = CaptureSession(0, SyntheticBackend()).grab()
+        images = [("synthetic", frame)]
+        print(f"no files matched {args.frames}, using a synthetic frame {frame.shape}")
+
+    for bits in (int(v) for v in args.bits.split(",")):
+        for name, ranges, roi in CASES:
+            rule = _red_rule if name == "monster_red" else None
+            t0 = time.perf_counter()
+            lut = ColorMask(ranges, bits=bits, bgr_rule=rule)
+            build_ms = (time.perf_counter() - t0) * 1000
+
+            ref_us = lut_us = 0.0
+            agree = total = 0
+            for kind, img in images:
+                view = img
+                if kind == "synthetic":
+                    x1, y1, x2, y2 = roi
+                    view = img[y1:y2, x1:x2]
+                ref_us += _timeit(lambda: _opencv_mask(view, ranges, rule), args.iters)
+                lut_us += _timeit(lambda: lut.apply(view), args.iters)
+                agree += int(np.count_nonzero(_opencv_mask(view, ranges, rule) == lut.apply(view)))
+                total += view.shape[0] * view.shape[1]
+            n = len(images)
+            print(
+                f"bits={bits} {name:<12s} build={build_ms:6.1f}ms opencv={ref_us / n:8.1f}us "
+                f"lut={lut_us / n:8.1f}us speedup={ref_us / max(lut_us, 1e-9):4.2f}x "
+                f"pixel_agree={agree / max(total, 1):.4%} table={lut.lut.nbytes / 1e6:.0f}MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
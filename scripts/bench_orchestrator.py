@@ -0,0 +1,78 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.capture_session import SyntheticBackend
+from core.frames import frame_stats
+from core.orchestrator import ClientSpec, Orchestrator
+from core.replay import ActionLog, FakeBinder, FakeInput, ReplayControl, import_feature, replay_feature
+from core.templates import template_stats
+from core.timing import VirtualClock
+
+
+def main():
+    ap = argparse.ArgumentParser(description="在 Linux 上用假窗口（合成画面）压测多开 Orchestrator")
+    ap.add_argument("--config", default="config/profiles_cod_v3.yaml")
+    ap.add_argument("--profile", default="cod_instance_default")
+    ap.add_argument("--clients", type=int, default=3)
+    ap.add_argument("--duration", type=float, default=1800.0, help="虚拟时长（秒）")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        cfg = (yaml.safe_load(f) or {})[args.profile]
+    cfg["npc_confirm_mode"] = False
+    cfg["npc_score_log_enabled"] = False
+
+    random.seed(args.seed)
+    # 所有客户端共用一条虚拟时间线；Baton 保证同一时刻只有一个客户端在推进
+    clock = VirtualClock(jitter=float(cfg.get("jitter", 0.10)), seed=args.seed)
+    log = ActionLog(clock)
+    control = ReplayControl(clock, max_seconds=args.duration)
+    feature = import_feature("features.cod_instance_v2")
+
+    clients = [
+        ClientSpec(
+            title=f"fake-{i + 1}",
+            mode="cod_instance",
+            profile_name=args.profile,
+            profile=dict(cfg),
+            run=feature.run,
+            binder=FakeBinder(1000 + i),
+            clock=clock,
+        )
+        for i in range(args.clients)
+    ]
+
+    def make_ctx(spec: ClientSpec, baton_clock):
+        return feature.BotContext(binder=spec.binder, input=FakeInput(log), clock=baton_clock, control=control, config=spec.profile)
+
+    backends = {}
+
+    def backend_for(hwnd: int):
+        if hwnd not in backends:
+            backends[hwnd] = SyntheticBackend(seed=hwnd)
+        return backends[hwnd]
+
+    wall0 = time.perf_counter()
+    with replay_feature(feature, clock, log, backend_for, max_age=float(cfg.get("frame_cache_max_age", 0.05))):
+        orch = Orchestrator(clients, make_ctx)
+        orch.run()
+        stats = frame_stats()
+    wall = time.perf_counter() - wall0
+
+    print(f"[BENCH] clients={args.clients} virtual={clock.elapsed():.1f}s wall={wall:.2f}s actions={len(log.actions)}")
+    print(f"[BENCH] {stats}")
+    print(f"[BENCH] {template_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import argparse
+import os
+import sys
+import time
+from glob import glob
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.templates import compile_template
+from core.vision import match_many
+
+
+def _synthetic_frames(templates, count: int, size=(924, 702), seed: int = 0):
+    """没有录制帧时：噪声底图上随机贴一个模板，返回 (帧, 真值中心)。"""
+    rng = np.random.default_rng(seed)
+    w, h = size
+    frames = []
+    for i in range(count):
+        img = rng.integers(0, 96, (h, w, 3), dtype=np.uint8)
+        tpl = templates[i % len(templates)].bgr
+        th, tw = tpl.shape[:2]
+        x = int(rng.integers(0, w - tw))
+        y = int(rng.integers(0, h - th))
+        img[y:y + th, x:x + tw] = tpl
+        frames.append((img, (x + tw // 2, y + th // 2)))
+    return frames
+
+
+def main():
+    ap = argparse.ArgumentParser(description="全分辨率 vs 金字塔（1/2、1/4）NPC 模板匹配：速度与一致性")
+    ap.add_argument("--frames", default="debug/npc_search/*_crop.png", help="_save_npc_search_debug 保存的 ROI 截图")
+    ap.add_argument("--templates", default="templates/cod_npc*.png")
+    ap.add_argument("--threshold", type=float, default=0.82)
+    ap.add_argument("--masked", action="store_true", help="走黄色文字掩码匹配")
+    ap.add_argument("--lower", default="18,100,180")
+    ap.add_argument("--upper", default="36,255,255")
+    ap.add_argument("--scales", default="2,4")
+    ap.add_argument("--synthetic", type=int, default=20, help="没有录制帧时生成的合成帧数量")
+    args = ap.parse_args()
+
+    templates = [t for t in (compile_template(p) for p in sorted(glob(args.templates))) if t is not None]
+    if not templates:
+        raise RuntimeError(f"没有可用模板: {args.templates}")
+    lower = tuple(int(v) for v in args.lower.split(","))
+    upper = tuple(int(v) for v in args.upper.split(","))
+
+    paths = sorted(glob(args.frames))
+    if paths:
+        frames = [(cv2.imread(p, cv2.IMREAD_COLOR), None) for p in paths]
+        print(f"frames={len(frames)} from {args.frames}")
+    else:
+        frames = _synthetic_frames(templates, args.synthetic)
+        print(f"frames={len(frames)} synthetic (no files matched {args.frames})")
+
+    def run(scale: int):
+        out = []
+        t0 = time.perf_counter()
+        for img, _truth in frames:
+            out.append(
+                match_many(img, templates, threshold=args.threshold, masked=args.masked,
+                           lower_hsv=lower, upper_hsv=upper, pyramid=scale).best
+            )
+        return out, (time.perf_counter() - t0) * 1000 / len(frames)
+
+    base, base_ms = run(1)
+    hits = sum(m.ok for m in base)
+    print(f"full    {base_ms:7.2f}ms/frame hits={hits}/{len(frames)}")
+    for scale in (int(v) for v in args.scales.split(",")):
+        result, ms = run(scale)
+        agree = sum(a.ok == b.ok and (not a.ok or (abs(a.x - b.x) <= 2 and abs(a.y - b.y) <= 2)) for a, b in zip(base, result))
+        lost = sum(a.ok and not b.ok for a, b in zip(base, result))
+        drift = max((abs(a.score - b.score) for a, b in zip(base, result) if a.ok and b.ok), default=0.0)
+        print(
+            f"1/{scale:<6d}{ms:7.2f}ms/frame speedup={base_ms / max(ms, 1e-6):.1f}x "
+            f"agree={agree}/{len(frames)} lost_hits={lost} max_score_drift={drift:.4f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
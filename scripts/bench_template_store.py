@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+from glob import glob
+
+import cv2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.capture_session import CaptureSession, SyntheticBackend
+from core.templates import compile_template
+from core.vision import find_template, find_template_masked, match_many
+
+
+def _poll(img, templates, roi, masked: bool, lower, upper):
+    out = []
+    for tpl in templates:
+        if masked:
+            out.append(find_template_masked(img, tpl, threshold=0.8, roi=roi, lower_hsv=lower, upper_hsv=upper))
+        else:
+            out.append(find_template(img, tpl, threshold=0.8, roi=roi))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="每轮轮询：原始 ndarray 模板 vs 预编译模板 vs match_many（ROI 只预处理一次）")
+    ap.add_argument("--templates", default="templates/*.png")
+    ap.add_argument("--roi", default="300,200,700,500", help="x1,y1,x2,y2（NPC 标签区域大小）")
+    ap.add_argument("--iters", type=int, default=50)
+    ap.add_argument("--lower", default="15,80,140")
+    ap.add_argument("--upper", default="40,255,255")
+    args = ap.parse_args()
+
+    paths = sorted(glob(args.templates))
+    if not paths:
+        raise RuntimeError(f"没有匹配的模板: {args.templates}")
+    roi = tuple(int(v) for v in args.roi.split(","))
+    lower = tuple(int(v) for v in args.lower.split(","))
+    upper = tuple(int(v) for v in args.upper.split(","))
+
+    raw = [cv2.imread(p, cv2.IMREAD_COLOR) for p in paths]
+    compiled = [compile_template(p) for p in paths]
+    img = CaptureSession(0, SyntheticBackend()).grab()
+
+    print(f"templates={len(paths)} roi={roi}")
+    for masked in (False, True):
+        _poll(img, compiled, roi, masked, lower, upper)  # 预热掩码缓存
+        timings = {}
+        results = {}
+        for name, tpls in (("raw", raw), ("compiled", compiled)):
+            t0 = time.perf_counter()
+            for _ in range(args.iters):
+                results[name] = _poll(img, tpls, roi, masked, lower, upper)
+            timings[name] = (time.perf_counter() - t0) * 1000 / args.iters
+        t0 = time.perf_counter()
+        for _ in range(args.iters):
+            results["match_many"] = match_many(
+                img, compiled, threshold=0.8, roi=roi, masked=masked, lower_hsv=lower, upper_hsv=upper
+            ).matches
+        timings["match_many"] = (time.perf_counter() - t0) * 1000 / args.iters
+
+        same = all(
+            a.ok == b.ok == c.ok and (a.x, a.y) == (b.x, b.y) == (c.x, c.y) and abs(a.score - c.score) < 1e-6
+            for a, b, c in zip(results["raw"], results["compiled"], results["match_many"])
+        )
+        print(
+            f"{'masked' if masked else 'plain ':6s} raw={timings['raw']:.2f}ms/poll compiled={timings['compiled']:.2f}ms/poll "
+            f"match_many={timings['match_many']:.2f}ms/poll same_results={same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+import time
+from glob import glob
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.capture_session import CaptureSession, SyntheticBackend
+from core.templates import load_template
+from core.vision import find_template, find_template_masked
+from core.vision_pool import VisionJob, VisionPool
+
+
+def main():
+    ap = argparse.ArgumentParser(description="对比本地串行匹配与共享内存进程池匹配（NPC 多模板）")
+    ap.add_argument("--templates", default="templates/cod_npc*.png")
+    ap.add_argument("--roi", default="0,0,1024,768", help="x1,y1,x2,y2")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    ap.add_argument("--iters", type=int, default=20)
+    ap.add_argument("--masked", action="store_true")
+    args = ap.parse_args()
+
+    paths = sorted(glob(args.templates))
+    if not paths:
+        raise RuntimeError(f"没有匹配的模板: {args.templates}")
+    roi = tuple(int(v) for v in args.roi.split(","))
+    kind = "masked" if args.masked else "plain"
+    jobs = [VisionJob(p, kind, 0.8) for p in paths]
+
+    session = CaptureSession(0, SyntheticBackend())
+    img = session.grab()
+
+    t0 = time.perf_counter()
+    for _ in range(args.iters):
+        local = []
+        for job in jobs:
+            tpl = load_template(job.template)
+            if kind == "masked":
+                local.append(find_template_masked(img, tpl, threshold=job.threshold, roi=roi))
+            else:
+                local.append(find_template(img, tpl, threshold=job.threshold, roi=roi))
+    local_ms = (time.perf_counter() - t0) * 1000 / args.iters
+
+    pool = VisionPool(args.workers)
+    pool.warm_up()
+    try:
+        t0 = time.perf_counter()
+        for _ in range(args.iters):
+            remote = pool.match(img, jobs, roi=roi)
+        pool_ms = (time.perf_counter() - t0) * 1000 / args.iters
+        summary = pool.summary()
+    finally:
+        pool.close()
+
+    same = all(abs(a.score - b.score) < 1e-5 and (a.x, a.y) == (b.x, b.y) for a, b in zip(local, remote))
+    print(f"templates={len(jobs)} kind={kind} roi={roi}")
+    print(f"local={local_ms:.2f}ms/poll pool={pool_ms:.2f}ms/poll (workers={args.workers}) same_results={same}")
+    print(summary)
+
+
+if __name__ == "__main__":
+    main()
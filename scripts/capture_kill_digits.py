@@ -0,0 +1,116 @@
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import keyboard
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.capture_win32 import grab_client
+from core.vision import to_bgr
+from core.window import WindowBinder
+from features.cod_instance_v2 import _kill_glyph_boxes, _mask_blue_digits
+
+
+WINDOW_TITLE_DEFAULT = "《新天龙八部》 0.08.0207 (原始一区:江湖梦)"
+
+
+def load_profile(path: str, name: str) -> dict:
+    if not os.path.isfile(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return (yaml.safe_load(f) or {}).get(name, {}) or {}
+
+
+def save_digits(crop, value: str, cfg: dict, output_dir: Path, overwrite: bool) -> list[str]:
+    """按连通域把击杀数切成单个字符，按 value 的各位数字存成 <digit>.png；位数对不上时不保存。"""
+    mask = _mask_blue_digits(crop, cfg)
+    boxes = _kill_glyph_boxes(mask, cfg)
+    if len(boxes) != len(value):
+        print(f"[SKIP] found {len(boxes)} glyphs, expected {len(value)} for '{value}'")
+        return []
+    output_dir.mkdir(parents=True, exist_ok=True)
+    saved = []
+    for digit, (x, y, w, h) in zip(value, boxes):
+        path = output_dir / f"{digit}.png"
+        if path.exists() and not overwrite:
+            continue
+        cv2.imwrite(str(path), crop[y:y + h, x:x + w])
+        saved.append(digit)
+    return saved
+
+
+def report(output_dir: Path, saved: list[str]):
+    have = {p.stem for p in output_dir.glob("[0-9].png")}
+    missing = "".join(d for d in "0123456789" if d not in have)
+    print(f"[SAVE] digits={''.join(saved) or '-'} | missing={missing or 'none'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="制作副本击杀数字形样本 0-9.png（instance_kill_digit_dir），供 instance_kill_reader=glyph 使用"
+    )
+    parser.add_argument("--config", default="config/profiles_cod_v3.yaml")
+    parser.add_argument("--profile", default="cod_instance_default")
+    parser.add_argument("--title", default=WINDOW_TITLE_DEFAULT, help="游戏窗口标题")
+    parser.add_argument("--output-dir", default=None, help="默认 instance_kill_digit_dir（templates/kill_digits）")
+    parser.add_argument("--image", default=None, help="离线模式：从保存的击杀数截图（如 *_crop.png）切字符")
+    parser.add_argument("--value", default=None, help="离线模式：截图中显示的击杀数")
+    parser.add_argument("--hotkey", default="f6", help="截图热键")
+    parser.add_argument("--overwrite", action="store_true", help="覆盖已有的数字样本")
+    args = parser.parse_args()
+
+    cfg = load_profile(args.config, args.profile)
+    output_dir = Path(args.output_dir or cfg.get("instance_kill_digit_dir", "templates/kill_digits"))
+
+    if args.image:
+        if not args.value or not args.value.isdigit():
+            raise RuntimeError("--image requires --value (the kill count shown in the image)")
+        crop = cv2.imread(args.image, cv2.IMREAD_COLOR)
+        if crop is None:
+            raise RuntimeError(f"cannot read {args.image}")
+        report(output_dir, save_digits(crop, args.value, cfg, output_dir, args.overwrite))
+        return
+
+    roi = tuple(int(v) for v in cfg.get("instance_kill_roi", [553, 97, 567, 110]))
+    if len(roi) != 4:
+        raise RuntimeError("instance_kill_roi must be x1,y1,x2,y2")
+    binder = WindowBinder(args.title)
+    hwnd = binder.ensure()
+
+    print("=" * 60)
+    print("Instance Kill Digit Capture Tool")
+    print("=" * 60)
+    print(f"window: {args.title}")
+    print(f"roi: {roi}")
+    print(f"output: {output_dir.resolve()}")
+    print(f"{args.hotkey.upper()} save | ESC exit")
+    print("副本内击杀数显示稳定后按热键，再输入画面上的数字；直到 missing=none。")
+    print("=" * 60)
+
+    while True:
+        if keyboard.is_pressed("esc"):
+            print("[EXIT] user exit")
+            break
+
+        if keyboard.is_pressed(args.hotkey):
+            hwnd = binder.ensure()
+            img = grab_client(hwnd)
+            x1, y1, x2, y2 = roi
+            crop = to_bgr(img[y1:y2, x1:x2]).copy()
+            value = input("kill count shown: ").strip()
+            if value.isdigit():
+                report(output_dir, save_digits(crop, value, cfg, output_dir, args.overwrite))
+            else:
+                print("[SKIP] not a number")
+            time.sleep(0.35)
+
+        time.sleep(0.02)
+
+
+if __name__ == "__main__":
+    main()
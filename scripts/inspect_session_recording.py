@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+from collections import Counter
+
+import cv2
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.recorder import read_session
+from core.vision import to_bgr
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarize a recorded session and optionally dump ROI frames")
+    ap.add_argument("path")
+    ap.add_argument("--dump-dir", default=None, help="write every decoded ROI frame as PNG here")
+    ap.add_argument("--inputs", action="store_true", help="print every recorded input action")
+    args = ap.parse_args()
+
+    kinds = Counter()
+    encs = Counter()
+    rois = Counter()
+    t0 = None
+    t_last = 0.0
+    for index, (kind, meta, img) in enumerate(read_session(args.path)):
+        kinds[kind] += 1
+        t = float(meta.get("t", 0.0))
+        t0 = t if t0 is None else t0
+        t_last = t
+        if kind == "FRAM":
+            encs[meta["enc"]] += 1
+            rois[tuple(meta["roi"])] += 1
+            if args.dump_dir:
+                os.makedirs(args.dump_dir, exist_ok=True)
+                x1, y1, x2, y2 = meta["roi"]
+                name = f"{index:06d}_{t - t0:09.3f}_{x1}_{y1}_{x2}_{y2}.png"
+                cv2.imwrite(os.path.join(args.dump_dir, name), to_bgr(img))
+        elif kind == "INPT" and args.inputs:
+            print(f"[{t - t0:8.3f}s] {meta['target']}.{meta['action']} args={meta['args']} kwargs={meta['kwargs']}")
+
+    print(f"duration={t_last - (t0 or 0.0):.1f}s records={dict(kinds)} encodings={dict(encs)}")
+    for roi, n in rois.most_common():
+        print(f"  roi={roi} frames={n}")
+
+
+if __name__ == "__main__":
+    main()
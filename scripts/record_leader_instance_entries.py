@@ -16,7 +16,6 @@ if ROOT not in sys.path:
 
 from core.capture_win32 import grab_client
 from core.window import WindowBinder
-from core.vision import find_template
 import features.cod_instance_v2 as cod
 
 
@@ -38,17 +37,9 @@ def _detect_scene_from_image(
         roi = tuple(int(v) for v in roi)
     threshold = float(scene_threshold_override if scene_threshold_override is not None else cfg.get("scene_threshold", 0.85))
 
-    best_name = None
-    best_score = -1.0
-    for name, tpl in scene_templates.items():
-        m = find_template(img, tpl, threshold=threshold, roi=roi)
-        if float(m.score) > best_score:
-            best_score = float(m.score)
-            best_name = name if m.ok else best_name
-
-    if best_name is None:
-        return None, max(best_score, 0.0)
-    return best_name, best_score
+    classifier = cod._scene_classifier(scene_templates, {**cfg, "scene_threshold": threshold})
+    result = classifier.classify(img, roi=roi)
+    return result.scene, result.score
 
 
 def _append_row(path: str, row: dict[str, Any]):
@@ -0,0 +1,109 @@
+import argparse
+import os
+import random
+import sys
+import time
+from glob import glob
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.capture_session import ReplayBackend, SyntheticBackend
+from core.frames import frame_stats
+from core.replay import (
+    ActionLog,
+    FakeBinder,
+    FakeInput,
+    ReplayControl,
+    SessionReplayBackend,
+    import_feature,
+    replay_feature,
+)
+from core.timing import VirtualClock
+
+
+def load_profile(config_path: str, profile_name: str) -> dict:
+    with open(config_path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+    if profile_name not in data:
+        raise RuntimeError(f"找不到 profile: {profile_name}")
+    return data[profile_name]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="离线回放 cod_instance_v2：虚拟时钟 + 假输入，帧来自录制文件/PNG/合成画面")
+    ap.add_argument("--config", default="config/profiles_cod_v3.yaml")
+    ap.add_argument("--profile", default="cod_instance_default")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--recording", help="main.py --record 生成的会话文件")
+    src.add_argument("--frames", help="PNG 帧 glob，每次截图前进一帧")
+    src.add_argument("--synthetic", action="store_true", help="合成画面（只测循环开销）")
+    ap.add_argument("--duration", type=float, default=3600.0, help="虚拟时长上限（秒），0 表示直到录制结束")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--hwnd", type=int, default=1)
+    ap.add_argument("--size", default=None, help="回放画布尺寸 WxH（默认取录制 ROI 的外接范围）")
+    ap.add_argument("--set", action="append", default=[], metavar="KEY=VALUE", help="覆盖 profile 配置（值按 YAML 解析）")
+    ap.add_argument("--actions-out", default=None, help="把动作日志写成 TSV")
+    args = ap.parse_args()
+
+    cfg = load_profile(args.config, args.profile)
+    # 回放时没人按确认键
+    cfg["npc_confirm_mode"] = False
+    for item in args.set:
+        key, value = item.split("=", 1)
+        cfg[key] = yaml.safe_load(value)
+
+    random.seed(args.seed)
+    clock = VirtualClock(jitter=float(cfg.get("jitter", 0.10)), seed=args.seed)
+    log = ActionLog(clock)
+
+    if args.recording:
+        size = tuple(int(v) for v in args.size.lower().split("x")) if args.size else None
+        backend = SessionReplayBackend(args.recording, time_fn=clock.monotonic, size=size)
+        print(f"[REPLAY] recording {args.recording}: {len(backend.records)} frames, {backend.duration:.1f}s")
+    elif args.frames:
+        backend = ReplayBackend.from_paths(sorted(glob(args.frames)))
+        print(f"[REPLAY] {len(backend.frames)} png frames")
+    else:
+        backend = SyntheticBackend(seed=args.seed)
+
+    if args.duration <= 0 and not args.recording:
+        raise RuntimeError("PNG/合成帧源没有终点，请指定 --duration")
+
+    feature = import_feature("features.cod_instance_v2")
+    control = ReplayControl(clock, max_seconds=args.duration, backend=backend)
+    ctx = feature.BotContext(
+        binder=FakeBinder(args.hwnd),
+        input=FakeInput(log),
+        clock=clock,
+        control=control,
+        config=cfg,
+    )
+
+    wall0 = time.perf_counter()
+    with replay_feature(feature, clock, log, backend, max_age=float(cfg.get("frame_cache_max_age", 0.05))):
+        feature.run(ctx)
+        stats = frame_stats()
+    wall = time.perf_counter() - wall0
+
+    game = clock.elapsed()
+    print(f"[REPLAY] virtual={game:.1f}s wall={wall:.2f}s speedup={game / max(wall, 1e-6):.0f}x")
+    print(f"[REPLAY] actions={len(log.actions)} {log.counts()}")
+    print(f"[REPLAY] {stats}")
+
+    if args.actions_out:
+        out_dir = os.path.dirname(args.actions_out)
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+        with open(args.actions_out, "w", encoding="utf-8") as f:
+            f.write("t\ttarget\taction\targs\n")
+            for t, target, action, action_args in log.actions:
+                f.write(f"{t:.3f}\t{target}\t{action}\t{action_args}\n")
+        print(f"[REPLAY] actions -> {args.actions_out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import itertools
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+
+import cv2
+import numpy as np
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.templates import load_template
+
+
+def _ints(text: str) -> list[int]:
+    return [int(v) for v in text.split(",") if v.strip()]
+
+
+def _build_ranges(h_low, h_high, s_low, v_low) -> list[tuple[int, int, int, int]]:
+    """(h_low, h_high, s_low, v_low)，上界 S/V 固定 255（与 npc_text_hsv_upper 的用法一致）。"""
+    return [(hl, hh, sl, vl) for hl, hh, sl, vl in itertools.product(h_low, h_high, s_low, v_low) if hh > hl]
+
+
+class _RangeMasks:
+    """
+    一张图只做一次 HSV 转换；每个阈值的比较平面（H>=hl、H<=hh、S>=sl、V>=vl）各算一次，
+    任意范围的掩码只是 4 个平面按位与，不再逐范围 cvtColor + inRange。
+    """
+
+    def __init__(self, img_bgr: np.ndarray, ranges):
+        hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
+        h, s, v = hsv[:, :, 0], hsv[:, :, 1], hsv[:, :, 2]
+        self.h_ge = {hl: (h >= hl).view(np.uint8) * 255 for hl in {r[0] for r in ranges}}
+        self.h_le = {hh: (h <= hh).view(np.uint8) * 255 for hh in {r[1] for r in ranges}}
+        self.s_ge = {sl: (s >= sl).view(np.uint8) * 255 for sl in {r[2] for r in ranges}}
+        self.v_ge = {vl: (v >= vl).view(np.uint8) * 255 for vl in {r[3] for r in ranges}}
+
+    def mask(self, rng) -> np.ndarray:
+        hl, hh, sl, vl = rng
+        out = cv2.bitwise_and(self.h_ge[hl], self.h_le[hh])
+        cv2.bitwise_and(out, self.s_ge[sl], dst=out)
+        cv2.bitwise_and(out, self.v_ge[vl], dst=out)
+        return out
+
+
+# ---- 子进程侧：模板及其各范围掩码每个进程只算一次 ----
+
+_TEMPLATES: list[_RangeMasks] | None = None
+_TEMPLATE_MASKS: dict = {}
+
+
+def _init_worker(template_paths: list[str], ranges):
+    global _TEMPLATES
+    _TEMPLATES = []
+    for path in template_paths:
+        img = load_template(path)
+        if img is not None:
+            _TEMPLATES.append(_RangeMasks(img, ranges))
+    _TEMPLATE_MASKS.clear()
+
+
+def _score_frame(path: str, ranges) -> np.ndarray | None:
+    """返回 (len(ranges),)：每个范围下所有模板的最高掩码匹配分。"""
+    img = cv2.imread(path, cv2.IMREAD_COLOR)
+    if img is None:
+        return None
+    planes = _RangeMasks(img, ranges)
+    scores = np.zeros(len(ranges), dtype=np.float32)
+    for ri, rng in enumerate(ranges):
+        frame_mask = planes.mask(rng)
+        best = 0.0
+        for ti, tpl in enumerate(_TEMPLATES):
+            key = (ti, rng)
+            entry = _TEMPLATE_MASKS.get(key)
+            if entry is None:
+                tpl_mask = tpl.mask(rng)
+                entry = _TEMPLATE_MASKS[key] = (tpl_mask, cv2.countNonZero(tpl_mask))
+            tpl_mask, nonzero = entry
+            th, tw = tpl_mask.shape
+            if nonzero == 0 or th > frame_mask.shape[0] or tw > frame_mask.shape[1]:
+                continue
+            best = max(best, float(cv2.minMaxLoc(cv2.matchTemplate(frame_mask, tpl_mask, cv2.TM_CCOEFF_NORMED))[1]))
+        scores[ri] = best
+    return scores
+
+
+def _score_all(paths, ranges, template_paths, workers: int) -> np.ndarray:
+    if not paths:
+        return np.zeros((0, len(ranges)), dtype=np.float32)
+    if workers <= 1:
+        _init_worker(template_paths, ranges)
+        rows = [_score_frame(p, ranges) for p in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_paths, ranges)) as ex:
+            rows = list(ex.map(_score_frame, paths, itertools.repeat(ranges), chunksize=1))
+    rows = [r for r in rows if r is not None]
+    return np.stack(rows) if rows else np.zeros((0, len(ranges)), dtype=np.float32)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="NPC 黄字 HSV 范围调参：多张正/负样本并行评估，按 precision/recall 排序")
+    ap.add_argument("--config", default="config/profiles_cod_v3.yaml")
+    ap.add_argument("--profile", default="cod_instance_default")
+    ap.add_argument("--positives", default=None, help="含 NPC 标签的截图（默认 npc_candidate_dir/*.png）")
+    ap.add_argument("--negatives", default=None, help="不应命中的截图（默认 npc_rejected_debug_dir/*.png）")
+    ap.add_argument("--templates", default=None, help="默认 npc_template_dir/cod_npc*.png")
+    ap.add_argument("--threshold", type=float, default=None, help="命中阈值（默认 npc_threshold）")
+    ap.add_argument("--h-low", default="10,12,14,16,18,20")
+    ap.add_argument("--h-high", default="30,32,34,36,38,40")
+    ap.add_argument("--s-low", default="40,60,80,100,120,140")
+    ap.add_argument("--v-low", default="120,140,160,180,200")
+    ap.add_argument("--max-frames", type=int, default=200, help="正/负样本各自最多使用的张数")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--top", type=int, default=15)
+    args = ap.parse_args()
+
+    cfg = {}
+    if os.path.isfile(args.config):
+        with open(args.config, "r", encoding="utf-8") as f:
+            cfg = (yaml.safe_load(f) or {}).get(args.profile, {}) or {}
+    pos_glob = args.positives or os.path.join(cfg.get("npc_candidate_dir", "debug/npc_matches"), "*.png")
+    neg_glob = args.negatives or os.path.join(cfg.get("npc_rejected_debug_dir", "debug/npc_rejected"), "*.png")
+    tpl_glob = args.templates or os.path.join(cfg.get("npc_template_dir", "templates"), "cod_npc*.png")
+    threshold = float(args.threshold if args.threshold is not None else cfg.get("npc_threshold", 0.82))
+
+    template_paths = sorted(glob(tpl_glob))
+    if not template_paths:
+        raise RuntimeError(f"没有 NPC 模板: {tpl_glob}")
+    positives = sorted(glob(pos_glob))[: args.max_frames]
+    negatives = sorted(glob(neg_glob))[: args.max_frames]
+    if not positives and not negatives:
+        raise RuntimeError(f"没有样本: positives={pos_glob} negatives={neg_glob}")
+
+    ranges = _build_ranges(_ints(args.h_low), _ints(args.h_high), _ints(args.s_low), _ints(args.v_low))
+    print(
+        f"templates={len(template_paths)} positives={len(positives)} negatives={len(negatives)} "
+        f"ranges={len(ranges)} threshold={threshold:.2f} workers={args.workers}"
+    )
+
+    t0 = time.perf_counter()
+    pos = _score_all(positives, ranges, template_paths, args.workers)
+    neg = _score_all(negatives, ranges, template_paths, args.workers)
+    print(f"scored in {time.perf_counter() - t0:.1f}s")
+
+    tp = (pos >= threshold).sum(axis=0)
+    fp = (neg >= threshold).sum(axis=0)
+    recall = tp / max(len(pos), 1)
+    precision = np.divide(tp, tp + fp, out=np.zeros(len(ranges)), where=(tp + fp) > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(len(ranges)), where=(precision + recall) > 0)
+    # 分数间隔：正样本最低分 - 负样本最高分，越大阈值越好选
+    pos_min = pos.min(axis=0) if len(pos) else np.zeros(len(ranges))
+    neg_max = neg.max(axis=0) if len(neg) else np.zeros(len(ranges))
+    gap = pos_min - neg_max
+
+    order = np.lexsort((-gap, -f1))
+    for i in order[: args.top]:
+        hl, hh, sl, vl = ranges[i]
+        print(
+            f"lower=({hl},{sl},{vl}) upper=({hh},255,255) precision={precision[i]:.3f} recall={recall[i]:.3f} "
+            f"f1={f1[i]:.3f} tp={tp[i]} fp={fp[i]} pos_min={pos_min[i]:.3f} neg_max={neg_max[i]:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import argparse
+import os
+import sys
+import time
+from glob import glob
+
+import cv2
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from core.glyphs import GlyphClassifier, normalize_glyph
+
+
+def _mask(img, threshold: int):
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY)
+    return mask
+
+
+def _groups(mask):
+    """与 cod_instance_v2._extract_coord_groups 相同的连通域分组。"""
+    num_labels, _labels, stats, _ = cv2.connectedComponentsWithStats(mask, 8)
+    boxes = []
+    for idx in range(1, num_labels):
+        x, y, w, h, area = stats[idx]
+        if area < 3 or h < 5 or w < 1:
+            continue
+        boxes.append((x, y, w, h))
+    if not boxes:
+        return []
+    boxes.sort(key=lambda item: item[0])
+    groups = [[boxes[0]]]
+    for box in boxes[1:]:
+        prev = groups[-1][-1]
+        if box[0] - (prev[0] + prev[2]) >= 6:
+            groups.append([box])
+        else:
+            groups[-1].append(box)
+    return groups
+
+
+def _legacy_read(mask, boxes, tpl_masks: dict):
+    """旧实现：每个字符对每个模板重新归一化，逐对 bitwise/countNonZero/matchTemplate。"""
+    digits = []
+    for bx, by, bw, bh in sorted(boxes, key=lambda item: item[0]):
+        norm_char = normalize_glyph(mask[by:by + bh, bx:bx + bw])
+        if norm_char is None:
+            return None
+        best_digit, best_score = None, -1.0
+        for digit, tpl_mask in tpl_masks.items():
+            if cv2.countNonZero(tpl_mask) == 0:
+                continue
+            norm_tpl = normalize_glyph(tpl_mask)
+            if norm_tpl is None:
+                continue
+            inter = cv2.countNonZero(cv2.bitwise_and(norm_char, norm_tpl))
+            union = cv2.countNonZero(cv2.bitwise_or(norm_char, norm_tpl))
+            iou = (inter / union) if union else 0.0
+            corr = float(cv2.matchTemplate(norm_char, norm_tpl, cv2.TM_CCOEFF_NORMED)[0][0])
+            score = iou * 0.85 + corr * 0.15
+            if score > best_score:
+                best_score, best_digit = score, digit
+        if best_digit is None:
+            return None
+        digits.append(best_digit)
+    return "".join(digits)
+
+
+def _synthetic_masks(tpl_masks: dict, count: int, seed: int = 0):
+    """用数字模板拼出 "x y" 坐标条（组间距 >= 6px），返回 (掩码, 真值)。"""
+    rng = np.random.default_rng(seed)
+    digits = sorted(tpl_masks)
+    out = []
+    for _ in range(count):
+        x = "".join(rng.choice(digits, size=int(rng.integers(1, 4))))
+        y = "".join(rng.choice(digits, size=int(rng.integers(1, 4))))
+        h = max(m.shape[0] for m in tpl_masks.values())
+        parts = []
+        for text, gap in ((x, 8), (y, 0)):
+            for ch in text:
+                m = tpl_masks[ch]
+                parts.append(np.pad(m, ((0, h - m.shape[0]), (0, 2))))
+            if gap:
+                parts.append(np.zeros((h, gap), dtype=np.uint8))
+        out.append((np.pad(np.hstack(parts), 2), (x.lstrip("0") or "0", y.lstrip("0") or "0")))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="校验坐标数字 OCR：预编译 GlyphClassifier 与旧的逐对打分结果是否一致，并对比耗时")
+    ap.add_argument("--templates", default="templates/coord_digits")
+    ap.add_argument("--crops", default="debug/coord_read/*_crop.png", help="_save_coord_debug 保存的坐标截图")
+    ap.add_argument("--gray-threshold", type=int, default=185)
+    ap.add_argument("--synthetic", type=int, default=200, help="额外用模板拼出的坐标条数量")
+    args = ap.parse_args()
+
+    tpl_masks = {}
+    for digit in "0123456789":
+        img = cv2.imread(os.path.join(args.templates, f"{digit}.png"), cv2.IMREAD_COLOR)
+        if img is not None:
+            tpl_masks[digit] = _mask(img, args.gray_threshold)
+    if not tpl_masks:
+        raise RuntimeError(f"没有数字模板: {args.templates}")
+    classifier = GlyphClassifier.from_masks(tpl_masks)
+
+    # 1) 模板自检：每个模板应识别为自己
+    labels, scores = classifier.classify(classifier.glyphs)
+    self_ok = sum(a == b for a, b in zip(labels, classifier.labels))
+    print(f"templates={len(classifier)} self_check={self_ok}/{len(classifier)} min_score={scores.min():.3f}")
+
+    # 2) 录制截图 + 合成坐标条：新旧实现逐组对比
+    samples = [(_mask(cv2.imread(p, cv2.IMREAD_COLOR), args.gray_threshold), None) for p in sorted(glob(args.crops))]
+    recorded = len(samples)
+    samples += _synthetic_masks(tpl_masks, args.synthetic)
+    print(f"samples recorded={recorded} synthetic={len(samples) - recorded}")
+
+    agree = correct = labelled = 0
+    legacy_s = fast_s = 0.0
+    for mask, truth in samples:
+        groups = _groups(mask)[:2]
+        if len(groups) < 2:
+            continue
+        t0 = time.perf_counter()
+        old = [_legacy_read(mask, g, tpl_masks) for g in groups]
+        t1 = time.perf_counter()
+        new = [text for text, _scores in classifier.read_groups(mask, groups)]
+        t2 = time.perf_counter()
+        legacy_s += t1 - t0
+        fast_s += t2 - t1
+        agree += old == new
+        if truth is not None:
+            labelled += 1
+            correct += all(t is not None and str(int(t)) == want for t, want in zip(new, truth))
+
+    read = max(1, len(samples))
+    print(f"agree_with_legacy={agree}/{len(samples)} synthetic_accuracy={correct}/{labelled}")
+    print(
+        f"legacy={legacy_s * 1000 / read:.3f}ms/read classifier={fast_s * 1000 / read:.3f}ms/read "
+        f"speedup={legacy_s / max(fast_s, 1e-9):.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()